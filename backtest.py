@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# ============================================================
+#  backtest.py — BACKTEST ATAS PITA HARGA RAKAMAN
+#  Pita → penilai arbitrage → RiskManager → simulasi isian FOK
+#  (tolak, kaki separa, latency). Sapuan parameter selari:
+#    python backtest.py tapes/harga.tape
+#    python backtest.py tapes/harga.tape --threshold 0.02 0.03 0.05 \
+#        --trade-size 10 25 --max-exposure 100 250 --latency 0.2 1.0
+# ============================================================
+
+import time
+import heapq
+import random
+import logging
+import argparse
+import itertools
+from bisect import bisect_right
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+from config import (
+    MIN_PROFIT_THRESHOLD, TRADE_SIZE_USDC, MAX_TOTAL_EXPOSURE
+)
+from scanner import SCALE, ArbitrageOpportunity, to_ticks
+from risk_manager import RiskManager, Reservation
+from tape import TapeReader, replay
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DAY = 86400
+
+
+@dataclass(frozen=True)
+class BacktestParams:
+    threshold: float = MIN_PROFIT_THRESHOLD
+    trade_size: float = TRADE_SIZE_USDC
+    max_exposure: float = MAX_TOTAL_EXPOSURE
+    latency: float = 0.2             # saat dari pengesanan hingga order tiba di CLOB
+    reject_rate: float = 0.05        # kebarangkalian FOK satu kaki ditolak (kedalaman)
+    unwind_spread: float = 0.01      # kos keluar kaki yang terisi bila trade separa
+    seed: int = 1
+
+
+@dataclass
+class BacktestResult:
+    params: BacktestParams
+    signals: int = 0                 # peluang ≥ threshold
+    approved: int = 0
+    risk_rejected: int = 0
+    filled: int = 0                  # semua kaki diisi
+    partial: int = 0                 # sebahagian kaki sahaja → risiko kaki
+    missed: int = 0                  # tiada kaki diisi
+    legs_sent: int = 0
+    legs_filled: int = 0
+    pnl: float = 0.0
+    unwind_pnl: float = 0.0          # untung/rugi menutup kaki separa
+    worst_unwind: float = 0.0
+    max_drawdown: float = 0.0
+    halted: bool = False
+
+    @property
+    def fill_rate(self) -> float:
+        return self.filled / self.approved if self.approved else 0.0
+
+    @property
+    def leg_fill_rate(self) -> float:
+        return self.legs_filled / self.legs_sent if self.legs_sent else 0.0
+
+
+# ─── SEJARAH HARGA (HARGA TOKEN PADA MASA t) ───────────────
+
+class PriceHistory:
+    """Siri masa setiap token dari pita — harga pada sebarang masa dalam O(log n)."""
+
+    def __init__(self, path: str):
+        reader = TapeReader(path)
+        self.token_ids = [s.token_id for s in reader.symbols]
+        self.index     = {t: i for i, t in enumerate(self.token_ids)}
+        if NUMPY_AVAILABLE:
+            self._build_numpy(reader)
+        else:
+            self._build_python(reader)
+        reader.close()
+
+    def _build_numpy(self, reader: TapeReader):
+        blocks = list(reader.blocks())
+        if not blocks:
+            self.ts = np.empty(0)
+            self.px = np.empty(0, dtype=np.int32)
+            self.starts = np.zeros(len(self.token_ids) + 1, dtype=np.int64)
+            return
+        ts  = np.concatenate([np.frombuffer(b.ts, dtype=np.float64) for b in blocks])
+        tok = np.concatenate([np.frombuffer(b.token, dtype=np.uint32) for b in blocks])
+        px  = np.concatenate([np.frombuffer(b.price, dtype=np.int32) for b in blocks])
+        del blocks
+        order = np.lexsort((ts, tok))                       # ikut token, kemudian masa
+        self.ts, self.px = ts[order], px[order]
+        counts = np.bincount(tok, minlength=len(self.token_ids))
+        self.starts = np.concatenate(([0], np.cumsum(counts)))
+
+    def _build_python(self, reader: TapeReader):
+        self.series: Dict[int, Tuple[array, array]] = {}
+        for ts, ix, price, _ in reader:
+            t, p = self.series.setdefault(ix, (array("d"), array("i")))
+            t.append(ts)
+            p.append(to_ticks(price))
+
+    def price_at(self, token_id: str, t: float) -> Optional[float]:
+        ix = self.index.get(token_id)
+        if ix is None:
+            return None
+        if NUMPY_AVAILABLE:
+            lo, hi = self.starts[ix], self.starts[ix + 1]
+            pos = lo + np.searchsorted(self.ts[lo:hi], t, side="right")
+            return self.px[pos - 1] / SCALE if pos > lo else None
+        ts, px = self.series.get(ix, ((), ()))
+        pos = bisect_right(ts, t)
+        return px[pos - 1] / SCALE if pos else None
+
+
+def collect_signals(path: str, threshold: float) -> List[ArbitrageOpportunity]:
+    """Satu laluan penilai atas pita pada threshold terendah sapuan."""
+    signals: List[ArbitrageOpportunity] = []
+    stats = replay(path, 1.0, signals.append, threshold=threshold)
+    logger.info(f"📼 {stats['rows']:,} baris → {len(signals):,} isyarat "
+                f"dalam {stats['seconds']:.1f}s")
+    return signals
+
+
+# ─── SIMULASI ──────────────────────────────────────────────
+
+def _fill(opp: ArbitrageOpportunity, at: float, history: PriceHistory,
+          params: BacktestParams, rng: random.Random) -> Tuple[int, float]:
+    """
+    Isi setiap kaki FOK pada harga had: diisi jika harga pada `at` tidak
+    bergerak melepasi had dan kedalaman cukup (reject_rate).
+    Pulangkan (kaki diisi, P&L keluar kaki separa).
+    """
+    side = "BUY" if opp.arb_type == "LONG" else "SELL"
+    amount_each = opp.trade_size / len(opp.outcomes)
+    filled, unwind = [], 0.0
+    for o in opp.outcomes:
+        now = history.price_at(o.token_id, at)
+        now = o.yes_price if now is None else now
+        crossed = now > o.yes_price if side == "BUY" else now < o.yes_price
+        if not crossed and rng.random() >= params.reject_rate:
+            filled.append((o, now))
+
+    if 0 < len(filled) < len(opp.outcomes):
+        for o, now in filled:
+            if side == "BUY":      # jual semula saham yang dibeli
+                shares = amount_each / o.yes_price
+                unwind += shares * max(0.0, now - params.unwind_spread) - amount_each
+            else:                  # beli balik saham yang dijual
+                unwind += amount_each * (o.yes_price - min(1.0, now + params.unwind_spread))
+    return len(filled), unwind
+
+
+def simulate(signals: List[ArbitrageOpportunity], history: PriceHistory,
+             params: BacktestParams) -> BacktestResult:
+    """Main semula isyarat melalui RiskManager sebenar dan model isian."""
+    rng    = random.Random(params.seed)
+    risk   = RiskManager(max_exposure=params.max_exposure, notify=False)
+    result = BacktestResult(params)
+    pending: List[Tuple[float, int, ArbitrageOpportunity, Reservation]] = []
+    in_flight: Dict[str, int] = {}
+    peak, day, seq = 0.0, None, 0
+    total_pnl = 0.0
+
+    def _settle(until: float):
+        nonlocal peak, total_pnl
+        while pending and pending[0][0] <= until:
+            at, _, opp, reservation = heapq.heappop(pending)
+            in_flight[opp.market_id] -= 1
+            legs, unwind = _fill(opp, at, history, params, rng)
+            result.legs_sent   += len(opp.outcomes)
+            result.legs_filled += legs
+            if legs == len(opp.outcomes):
+                result.filled += 1
+                pnl = opp.expected_profit_usdc
+            elif legs:
+                result.partial += 1
+                result.unwind_pnl += unwind
+                result.worst_unwind = min(result.worst_unwind, unwind)
+                pnl = unwind
+            else:
+                result.missed += 1
+                pnl = 0.0
+            risk.commit(reservation, pnl, True)
+            total_pnl += pnl
+            peak = max(peak, total_pnl)
+            result.max_drawdown = max(result.max_drawdown, peak - total_pnl)
+
+    for signal in signals:
+        _settle(signal.detected_at)
+        if signal.expected_profit_pct < params.threshold:
+            continue
+        result.signals += 1
+        if in_flight.get(signal.market_id):
+            continue
+
+        # Had rugi harian RiskManager — mula semula setiap hari UTC
+        today = int(signal.detected_at // DAY)
+        if today != day:
+            day, risk.daily_pnl, risk.trades_today = today, 0.0, 0
+
+        opp = replace(signal, trade_size=params.trade_size,
+                      expected_profit_usdc=signal.expected_profit_pct * params.trade_size)
+        reservation, _ = risk.reserve(opp)
+        if reservation is None:
+            result.risk_rejected += 1
+            continue
+        result.approved += 1
+        in_flight[opp.market_id] = in_flight.get(opp.market_id, 0) + 1
+        seq += 1
+        heapq.heappush(pending, (opp.detected_at + params.latency, seq, opp, reservation))
+
+    _settle(float("inf"))
+    result.pnl    = total_pnl
+    result.halted = risk.is_halted
+    return result
+
+
+# ─── SAPUAN PARAMETER (SELARI) ─────────────────────────────
+
+_worker_state: dict = {}
+
+
+def _init_worker(path: str, signals: List[ArbitrageOpportunity]):
+    _worker_state["history"] = PriceHistory(path)
+    _worker_state["signals"] = signals
+
+
+def _run_worker(params: BacktestParams) -> BacktestResult:
+    return simulate(_worker_state["signals"], _worker_state["history"], params)
+
+
+def sweep(path: str, grid: List[BacktestParams], workers: int = 0) -> List[BacktestResult]:
+    """
+    Penilai dijalankan SEKALI pada threshold terendah; setiap gabungan
+    parameter hanya menapis isyarat & mensimulasi isian (murah), dalam
+    proses berasingan. Setiap proses mmap pita yang sama (kongsi page cache).
+    """
+    start   = time.perf_counter()
+    signals = collect_signals(path, min(p.threshold for p in grid))
+    if workers == 1 or len(grid) == 1:
+        _init_worker(path, signals)
+        results = [_run_worker(p) for p in grid]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or None, initializer=_init_worker,
+                                 initargs=(path, signals)) as pool:
+            results = list(pool.map(_run_worker, grid))
+    logger.info(f"✅ {len(grid)} gabungan parameter dalam {time.perf_counter() - start:.1f}s")
+    return results
+
+
+def report(results: List[BacktestResult]) -> str:
+    lines = [f"{'thr':>5} {'saiz':>6} {'had':>6} {'lat':>5} | {'isyarat':>7} {'lulus':>6} "
+             f"{'isi%':>5} {'kaki%':>5} {'separa':>6} | {'P&L':>9} {'keluar':>8} {'DD':>7}"]
+    for r in sorted(results, key=lambda r: r.pnl, reverse=True):
+        p = r.params
+        lines.append(
+            f"{p.threshold*100:4.1f}% {p.trade_size:6.0f} {p.max_exposure:6.0f} {p.latency:5.2f} | "
+            f"{r.signals:7d} {r.approved:6d} {r.fill_rate*100:5.1f} {r.leg_fill_rate*100:5.1f} "
+            f"{r.partial:6d} | {r.pnl:+9.2f} {r.unwind_pnl:+8.2f} {r.max_drawdown:7.2f}"
+            + ("  🚨" if r.halted else ""))
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Backtest arbitrage atas pita harga")
+    ap.add_argument("path")
+    ap.add_argument("--threshold", type=float, nargs="+", default=[MIN_PROFIT_THRESHOLD])
+    ap.add_argument("--trade-size", type=float, nargs="+", default=[TRADE_SIZE_USDC])
+    ap.add_argument("--max-exposure", type=float, nargs="+", default=[MAX_TOTAL_EXPOSURE])
+    ap.add_argument("--latency", type=float, nargs="+", default=[0.2])
+    ap.add_argument("--reject-rate", type=float, default=0.05)
+    ap.add_argument("--unwind-spread", type=float, default=0.01)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--workers", type=int, default=0, help="proses (0 = semua CPU)")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(message)s",
+                        datefmt="%H:%M:%S")
+
+    grid = [BacktestParams(thr, size, exp, lat, args.reject_rate, args.unwind_spread, args.seed)
+            for thr, size, exp, lat in itertools.product(
+                args.threshold, args.trade_size, args.max_exposure, args.latency)]
+    print(report(sweep(args.path, grid, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
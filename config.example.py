@@ -10,14 +10,78 @@ API_PASSPHRASE = "ISI_PASSPHRASE_ANDA"
 
 TELEGRAM_BOT_TOKEN = "ISI_TOKEN_BOT_TELEGRAM_ANDA"
 TELEGRAM_CHAT_ID   = "ISI_CHAT_ID_ANDA"
+TELEGRAM_QUEUE_SIZE       = 200
+TELEGRAM_MIN_INTERVAL     = 1.0
+TELEGRAM_COALESCE_SECONDS = 0.5
 
 TRADE_SIZE_USDC       = 10.0
 MIN_PROFIT_THRESHOLD  = 0.03
 MAX_TOTAL_EXPOSURE    = 100.0
+MAX_MARKET_EXPOSURE   = 30.0
+MAX_EVENT_EXPOSURE    = 50.0
 SCAN_INTERVAL_SECONDS = 30
+SCAN_CONCURRENCY      = 16
+BULK_EVALUATION       = True
+INCREMENTAL_SCAN      = True
+MARKET_CACHE_TTL_SECONDS = 600
+SCHEDULED_SCAN             = False
+SCHEDULER_BUDGET_RPS       = 2.0
+SCHEDULER_BATCH_TOKENS     = 100
+SCHEDULER_MIN_INTERVAL     = 2.0
+SCHEDULER_MAX_INTERVAL     = 300.0
+SCHEDULER_UNIVERSE_SECONDS = 300
+SHARD_WORKERS         = 0
+SHARD_ADDRESS         = ("127.0.0.1", 7450)
+SHARD_AUTHKEY         = "TUKAR_KUNCI_SHARD"
+SHARD_SPAWN_LOCAL     = True
+SHARD_TIMEOUT         = 30
+HTTP_POOL_SIZE        = 32
+HTTP_CONNECT_TIMEOUT  = 3.0
+HTTP_READ_TIMEOUT     = 10.0
+HTTP_RETRIES          = 3
+HTTP_BACKOFF_SECONDS  = 0.2
+RATE_LIMITS = {
+    "/markets": (20.0, 40),
+    "/books":   (15.0, 30),
+    "/order":   (30.0, 30),
+    "/orders":  (10.0, 10),
+}
+RATE_HIGH_RESERVE     = 0.25
+HTTP2_ENABLED         = False
+DEPTH_CHECK           = True
+VECTOR_EVAL           = True
+EVENT_ARBS            = True
+STREAM_MODE            = False
+STREAM_REFRESH_SECONDS = 600
 DRY_RUN               = True
+PARALLEL_LEGS         = True
+SIGNING_WORKERS       = 8
+TEMPLATE_WORKERS      = 4
+ORDER_TEMPLATE_TTL_SECONDS = 300
+REQUOTE_BEFORE_ORDER = True
+REQUOTE_TIMEOUT_SECONDS = 0.5
+# OPPORTUNITY_PIPELINE hanya berkesan bila INCREMENTAL_SCAN = False (scan penuh)
+OPPORTUNITY_PIPELINE    = False
+OPPORTUNITY_TTL_SECONDS = 5.0
+EXECUTION_WORKERS       = 2
+LEDGER_FILE           = "ledger.db"
+LEDGER_FLUSH_SECONDS  = 0.5
 REPORT_INTERVAL_MINUTES = 60
+LOG_FILE              = "bot.log"
+LOG_JSON              = False
+LOG_ASYNC             = True
+LOG_MAX_BYTES         = 10_000_000
+LOG_BACKUPS           = 5
+LOG_SAMPLE_BURST      = 20
+LOG_SAMPLE_SECONDS    = 10.0
+METRICS_PORT          = 9108
+METRICS_FILE          = ""
+METRICS_FILE_INTERVAL = 15
+TAPE_FILE             = ""
+TAPE_FLUSH_SECONDS    = 1.0
+TAPE_CHANGES_ONLY     = True
 
 POLYMARKET_HOST  = "https://clob.polymarket.com"
 GAMMA_API_URL    = "https://gamma-api.polymarket.com"
+CLOB_WS_URL      = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
 POLYGON_CHAIN_ID = 137
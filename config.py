@@ -14,22 +14,118 @@ API_PASSPHRASE = "ISI_PASSPHRASE_ANDA"
 TELEGRAM_BOT_TOKEN = "ISI_TOKEN_BOT_TELEGRAM_ANDA"
 # Cara dapat Chat ID: Cari @userinfobot di Telegram → /start
 TELEGRAM_CHAT_ID   = "ISI_CHAT_ID_ANDA"
+TELEGRAM_QUEUE_SIZE       = 200   # Mesej tertunda maksimum (mesej kecil dibuang bila penuh)
+TELEGRAM_MIN_INTERVAL     = 1.0   # Saat antara mesej (had kadar Telegram setiap chat)
+TELEGRAM_COALESCE_SECONDS = 0.5   # Gabung mesej yang tiba dalam tempoh ini
 
 # ─── TETAPAN TRADING ───────────────────────────────────────
 TRADE_SIZE_USDC       = 10.0    # USDC per trade (mula kecil!)
 MIN_PROFIT_THRESHOLD  = 0.03    # Minimum 3% profit
 MAX_TOTAL_EXPOSURE    = 100.0   # Maksimum USDC dalam trade aktif
+MAX_MARKET_EXPOSURE   = 30.0    # Maksimum USDC aktif dalam satu pasaran
+MAX_EVENT_EXPOSURE    = 50.0    # Maksimum USDC aktif dalam satu event NegRisk
 SCAN_INTERVAL_SECONDS = 30      # Scan setiap 30 saat
 
+# ─── PRESTASI SCAN ─────────────────────────────────────────
+SCAN_CONCURRENCY      = 16      # Request serentak ke Gamma API (1 = satu demi satu)
+BULK_EVALUATION       = True    # Nilai harga dari senarai /markets, ambil detail calon sahaja
+INCREMENTAL_SCAN      = True    # Nilai semula pasaran yang harganya berubah sahaja
+MARKET_CACHE_TTL_SECONDS = 600  # Buang pasaran dari cache jika tidak dilihat selama ini
+
+# ─── PENJADUAL KEUTAMAAN ───────────────────────────────────
+# True = setiap pasaran ada selang segar sendiri (ganti sapuan penuh setiap scan)
+SCHEDULED_SCAN             = False
+SCHEDULER_BUDGET_RPS       = 2.0    # Bajet request sesaat (termasuk sapuan universe)
+SCHEDULER_BATCH_TOKENS     = 100    # Token setiap request /books
+SCHEDULER_MIN_INTERVAL     = 2.0    # Selang tercepat pasaran panas (saat)
+SCHEDULER_MAX_INTERVAL     = 300.0  # Selang terlambat pasaran senyap (saat)
+SCHEDULER_UNIVERSE_SECONDS = 300    # Sapuan penuh /markets (pasaran baru/tutup)
+
+# ─── SCAN BERSHARD (BERBILANG PROSES / HOS) ────────────────
+# > 0 = universe dipecah ikut event kepada N pekerja; proses ini jadi penyelaras
+SHARD_WORKERS         = 0       # Bilangan shard (0 = tutup, scan dalam satu proses)
+SHARD_ADDRESS         = ("127.0.0.1", 7450)  # "0.0.0.0" jika pekerja di hos lain
+SHARD_AUTHKEY         = "TUKAR_KUNCI_SHARD"  # Kunci HMAC pekerja jauh (sama di semua hos; wajib ditukar
+                                             # jika bukan 127.0.0.1 — pekerja tempatan guna kunci rawak)
+SHARD_SPAWN_LOCAL     = True    # False = tunggu pekerja jauh (python shard.py worker ...)
+SHARD_TIMEOUT         = 30      # Saat tunggu pekerja bersambung / jawapan satu kitaran
+
+# ─── HTTP ──────────────────────────────────────────────────
+HTTP_POOL_SIZE        = 32      # Sambungan keep-alive setiap host (≥ SCAN_CONCURRENCY)
+HTTP_CONNECT_TIMEOUT  = 3.0     # Saat
+HTTP_READ_TIMEOUT     = 10.0    # Saat
+HTTP_RETRIES          = 3       # Cuba semula GET bila ralat sambungan / 429 / 5xx
+HTTP_BACKOFF_SECONDS  = 0.2     # Backoff asas (eksponen + jitter)
+
+# ─── HAD KADAR API ─────────────────────────────────────────
+# Bajet token bucket setiap endpoint: laluan → (request/saat, letusan). {} = tiada had
+RATE_LIMITS = {
+    "/markets": (20.0, 40),     # Gamma — senarai & butiran pasaran
+    "/books":   (15.0, 30),     # CLOB order book (scan + sebut harga semula)
+    "/order":   (30.0, 30),     # CLOB hantar satu order
+    "/orders":  (10.0, 10),     # CLOB hantar batch order
+}
+RATE_HIGH_RESERVE     = 0.25    # Pecahan letusan dikhaskan untuk lorong HIGH (order / sebut harga)
+HTTP2_ENABLED         = False   # Perlu: pip install httpx[http2]
+DEPTH_CHECK           = True    # Sahkan peluang dengan VWAP order book pada saiz trade
+VECTOR_EVAL           = True    # Nilai semua pasaran sekali jalan dengan NumPy (jika dipasang)
+EVENT_ARBS            = True    # Cari arbitrage merentas semua pasaran dalam satu event NegRisk
+
+# ─── MOD STREAM (WEBSOCKET) ────────────────────────────────
+# True = harga masa nyata dari WebSocket CLOB (ganti scan setiap 30 saat)
+STREAM_MODE            = False
+STREAM_REFRESH_SECONDS = 600    # Kemas kini senarai pasaran yang dilanggan
+
 # ─── MOD ───────────────────────────────────────────────────
 # True = Simulasi sahaja (SELAMAT, tiada duit sebenar)
 # False = LIVE trading (pastikan bot berfungsi dulu!)
 DRY_RUN = True
 
+# ─── PELAKSANAAN ORDER ─────────────────────────────────────
+# True = tandatangan semua kaki dulu, kemudian hantar serentak
+PARALLEL_LEGS = True
+SIGNING_WORKERS = 8                 # Thread untuk tandatangan order EIP-712
+TEMPLATE_WORKERS = 4                # Thread prefetch templat (berasingan — tidak melambatkan tandatangan)
+ORDER_TEMPLATE_TTL_SECONDS = 300    # Segarkan tick size / neg_risk / fee setiap token
+REQUOTE_BEFORE_ORDER = True         # Sebut harga semula semua kaki (satu /books) sebelum hantar order
+REQUOTE_TIMEOUT_SECONDS = 0.5       # Had masa sebut harga semula — lewat = order tidak dihantar
+
+# ─── SALURAN PELUANG ───────────────────────────────────────
+# True = setiap peluang ke baris gilir sebaik dijumpai (False = selepas scan penuh).
+# Hanya untuk scan penuh: INCREMENTAL_SCAN / SCHEDULED_SCAN / SHARD_WORKERS
+# didahulukan dan menolak semua peluang sekali gus selepas setiap kitaran.
+OPPORTUNITY_PIPELINE    = False
+OPPORTUNITY_TTL_SECONDS = 5.0     # Peluang lebih tua dari ini dibuang (harga lapuk)
+EXECUTION_WORKERS       = 2       # Tugasan pelaksana yang mengambil dari baris gilir
+
+# ─── LEJAR DAGANGAN ────────────────────────────────────────
+LEDGER_FILE           = "ledger.db"  # SQLite (WAL) — peluang, order, trade & P&L ("" = tutup)
+LEDGER_FLUSH_SECONDS  = 0.5     # Thread latar belakang tulis satu transaksi setiap N saat
+
 # ─── LAPORAN TELEGRAM ──────────────────────────────────────
 REPORT_INTERVAL_MINUTES = 60   # Hantar laporan profit setiap 60 minit
 
+# ─── LOG ───────────────────────────────────────────────────
+LOG_FILE              = "bot.log"  # Fail log ("" = konsol sahaja)
+LOG_JSON              = False   # True = fail log JSONL padat (satu objek JSON setiap baris)
+LOG_ASYNC             = True    # Baris gilir + thread pendengar — tiada I/O dalam laluan panas
+LOG_MAX_BYTES         = 10_000_000  # Putar fail log selepas saiz ini (0 = tiada putaran)
+LOG_BACKUPS           = 5       # Bilangan fail log lama disimpan (bot.log.1 ...)
+LOG_SAMPLE_BURST      = 20      # Baris per-pasaran maksimum setiap templat / tetingkap (0 = tiada had)
+LOG_SAMPLE_SECONDS    = 10.0    # Tetingkap sampel
+
+# ─── METRIK ────────────────────────────────────────────────
+METRICS_PORT          = 9108    # http://127.0.0.1:9108/metrics (0 = tutup)
+METRICS_FILE          = ""      # cth. "metrics.prom" — tulis metrik ke fail ("" = tutup)
+METRICS_FILE_INTERVAL = 15      # Saat antara tulisan fail
+
+# ─── RAKAMAN PITA HARGA ────────────────────────────────────
+TAPE_FILE             = ""      # cth. "tapes/harga.tape" — rakam semua harga ("" = tutup)
+TAPE_FLUSH_SECONDS    = 1.0     # Thread latar belakang tulis ke cakera setiap N saat
+TAPE_CHANGES_ONLY     = True    # Rakam token hanya bila harganya berubah
+
 # ─── URL API (JANGAN UBAH) ─────────────────────────────────
 POLYMARKET_HOST  = "https://clob.polymarket.com"
 GAMMA_API_URL    = "https://gamma-api.polymarket.com"
+CLOB_WS_URL      = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
 POLYGON_CHAIN_ID = 137
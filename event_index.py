@@ -0,0 +1,153 @@
+# ============================================================
+#  event_index.py — INDEKS EVENT NEGRISK (JUMLAH YES BERJALAN)
+#  Arbitrage NegRisk sebenar = jumlah harga YES semua pasaran
+#  dalam satu event. Jumlah dikemas kini O(1) setiap perubahan harga.
+# ============================================================
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from config import MIN_PROFIT_THRESHOLD
+from scanner import (
+    SCALE, ArbitrageOpportunity, Outcome, listing_tokens, negrisk_event_id,
+    negrisk_event_size, to_ticks
+)
+
+logger = logging.getLogger(__name__)
+
+# Harga disimpan sebagai tick (integer mikro-USDC, scanner.SCALE) supaya jumlah
+# berjalan tidak hanyut akibat pembundaran float selepas berjuta kemas kini
+
+
+@dataclass
+class EventGroup:
+    event_id: str
+    title: str
+    markets: Dict[str, str] = field(default_factory=dict)   # yes token → market id
+    names:   Dict[str, str] = field(default_factory=dict)   # yes token → nama outcome
+    prices:  Dict[str, int] = field(default_factory=dict)   # yes token → harga (mikro)
+    total:   int = 0                                         # Σ harga YES (mikro)
+    unpriced: int = 0                                        # token YES tanpa harga lagi
+    expected: int = 0                                        # ahli event menurut Gamma (0 = tidak diketahui)
+
+    @property
+    def yes_sum(self) -> float:
+        return self.total / SCALE
+
+
+class EventIndex:
+    """event id → pasaran & token YES, dengan jumlah YES berjalan setiap event."""
+
+    def __init__(self):
+        self.events:      Dict[str, EventGroup] = {}
+        self.token_event: Dict[str, EventGroup] = {}     # yes token → event
+        self.market_token: Dict[str, str]       = {}     # market id → yes token
+
+    @classmethod
+    def build(cls, markets: Iterable[dict]) -> "EventIndex":
+        index = cls()
+        for m in markets:
+            index.upsert_market(m)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def upsert_market(self, market: dict) -> Optional[EventGroup]:
+        """Tambah/kemas kini satu pasaran. Pulangkan event jika jumlahnya berubah."""
+        mid    = market.get("id", "")
+        tokens = listing_tokens(market)
+        if not mid or not tokens or not tokens[0].get("token_id"):
+            return None
+        yes = tokens[0]
+        token_id = yes["token_id"]
+
+        group = self.token_event.get(token_id)
+        if group is None:
+            event_id = negrisk_event_id(market)
+            group = self.events.get(event_id)
+            if group is None:
+                events = market.get("events") or [{}]
+                title  = events[0].get("title") or market.get("question", "")
+                group  = self.events[event_id] = EventGroup(event_id, title)
+            group.markets[token_id] = mid
+            group.names[token_id]   = (market.get("groupItemTitle")
+                                       or market.get("question", "?"))
+            group.prices[token_id]  = 0
+            group.unpriced += 1
+            self.token_event[token_id] = group
+            self.market_token[mid]     = token_id
+        group.expected = negrisk_event_size(market) or group.expected
+
+        return self.update(token_id, float(yes.get("price", 0)))
+
+    def remove_market(self, market_id: str):
+        token_id = self.market_token.pop(market_id, None)
+        group    = self.token_event.pop(token_id, None) if token_id else None
+        if group is None:
+            return
+        price = group.prices.pop(token_id)
+        group.total -= price
+        group.unpriced -= (price == 0)
+        group.markets.pop(token_id, None)
+        group.names.pop(token_id, None)
+        if not group.markets:
+            del self.events[group.event_id]
+
+    def update(self, token_id: str, price: float) -> Optional[EventGroup]:
+        """Kemas kini harga YES — O(1). Pulangkan event jika jumlahnya berubah."""
+        group = self.token_event.get(token_id)
+        if group is None:
+            return None
+        new = to_ticks(price)
+        old = group.prices[token_id]
+        if new == old:
+            return None
+        group.prices[token_id] = new
+        group.total    += new - old
+        group.unpriced += (new == 0) - (old == 0)
+        return group
+
+    def check(self, group: EventGroup, trade_size: float,
+              threshold: float = MIN_PROFIT_THRESHOLD) -> Optional[ArbitrageOpportunity]:
+        """Semak arbitrage pada satu event (semakan threshold O(1)).
+
+        Event yang tidak lengkap (halaman gagal, pasaran fee ditapis, saiz
+        tidak diketahui) dilangkau — jumlah separa bukan set penuh.
+        """
+        if (not group.expected or group.unpriced
+                or len(group.markets) < max(2, group.expected)):
+            return None
+        # Perbandingan integer (tick) — sama seperti MarketTable
+        total, limit = group.total, to_ticks(threshold)
+        if total < SCALE and SCALE - total >= limit:
+            arb_type, net_profit = "LONG", (SCALE - total) / SCALE
+        elif total > SCALE and total - SCALE >= limit:
+            arb_type, net_profit = "SHORT", (total - SCALE) / SCALE
+        else:
+            return None
+
+        outcomes = [Outcome(name=group.names[t], token_id=t,
+                            yes_price=p / SCALE, no_price=(SCALE - p) / SCALE)
+                    for t, p in group.prices.items()]
+        return ArbitrageOpportunity(
+            market_id=group.event_id,
+            market_question=group.title,
+            arb_type=arb_type,
+            outcomes=outcomes,
+            total_yes_sum=group.yes_sum,
+            expected_profit_pct=net_profit,
+            expected_profit_usdc=net_profit * trade_size,
+            trade_size=trade_size,
+            event_id=group.event_id
+        )
+
+    def event_of(self, market_id: str) -> str:
+        """Id event bagi pasaran yang diindeks ("" jika tiada)."""
+        group = self.token_event.get(self.market_token.get(market_id, ""))
+        return group.event_id if group else ""
+
+    def opportunities(self, trade_size: float) -> List[ArbitrageOpportunity]:
+        """Semak semua event — jumlah sudah tersedia, tiada penjumlahan semula."""
+        return [opp for opp in (self.check(g, trade_size) for g in self.events.values())
+                if opp]
@@ -2,15 +2,21 @@
 #  executor.py — PELAKSANA ORDER + NOTIFIKASI TELEGRAM
 # ============================================================
 
+import time
 import logging
-from typing import Optional
+import metrics
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
 from config import (
     PRIVATE_KEY, API_KEY, API_SECRET, API_PASSPHRASE,
-    POLYMARKET_HOST, POLYGON_CHAIN_ID, DRY_RUN
+    POLYMARKET_HOST, POLYGON_CHAIN_ID, DRY_RUN, PARALLEL_LEGS
 )
 from scanner import ArbitrageOpportunity
+from signer import OrderSigner
+from ledger import get_ledger
+from rate_limit import HIGH, get_limiter
 from telegram_notify import (
-    notify_order_executing, notify_limit_order_placed,
+    notify_order_executing, notify_limit_order_placed, notify_legs_placed,
     notify_trade_success, notify_trade_failed
 )
 
@@ -18,12 +24,19 @@ logger = logging.getLogger(__name__)
 
 try:
     from py_clob_client.client import ClobClient
-    from py_clob_client.clob_types import ApiCreds, MarketOrderArgs, OrderType, Side
+    from py_clob_client.clob_types import ApiCreds, MarketOrderArgs, OrderType
     CLOB_AVAILABLE = True
 except ImportError:
     CLOB_AVAILABLE = False
     logger.warning("⚠️  Jalankan: pip install py-clob-client")
 
+try:
+    # Versi py-clob-client lama tiada endpoint batch /orders
+    from py_clob_client.clob_types import PostOrdersArgs
+    BATCH_POST_AVAILABLE = True
+except ImportError:
+    BATCH_POST_AVAILABLE = False
+
 
 def get_client() -> Optional[object]:
     """Sambung ke Polymarket CLOB."""
@@ -44,6 +57,53 @@ def get_client() -> Optional[object]:
         return None
 
 
+_signer: Optional[OrderSigner] = None
+
+
+def get_signer(client) -> OrderSigner:
+    """Satu OrderSigner (kolam + templat) dikongsi untuk client semasa."""
+    global _signer
+    if _signer is None or _signer.client is not client:
+        _signer = OrderSigner(client)
+    return _signer
+
+
+def prepare_orders(client, token_ids: Iterable[str]):
+    """Sediakan templat order di latar belakang — panggil sebelum keputusan trade."""
+    if client is None or DRY_RUN:
+        return
+    get_signer(client).prepare(token_ids)
+
+
+def _post_limited(path: str, post):
+    """
+    Hantar order melalui bajet endpoint `path` (lorong HIGH). Klien CLOB
+    tidak melalui http_client, jadi token & 429 diurus di sini.
+    """
+    limiter = get_limiter()
+    bucket  = limiter.buckets.get(path)
+    if bucket is not None:
+        limiter.acquire(bucket, HIGH)
+    try:
+        resp = post()
+    except Exception as e:
+        if bucket is not None and getattr(e, "status_code", None) == 429:
+            limiter.throttled(bucket)
+        raise
+    if bucket is not None:
+        limiter.succeeded(bucket)
+    return resp
+
+
+def _record_leg(opp: ArbitrageOpportunity, outcome, side: str, amount: float,
+                resp: Optional[dict]):
+    """Kaki order ke lejar (tulis-belakang — tidak menyekat)."""
+    ledger = get_ledger()
+    if ledger:
+        ledger.record_order(opp, outcome.token_id, outcome.name, side,
+                            outcome.yes_price, amount, resp)
+
+
 def execute_opportunity(client, opp: ArbitrageOpportunity) -> bool:
     """Laksanakan arbitrage — LONG atau SHORT."""
 
@@ -61,6 +121,8 @@ def execute_opportunity(client, opp: ArbitrageOpportunity) -> bool:
 def _execute_long(client, opp: ArbitrageOpportunity) -> bool:
     """LONG ARB: Beli semua YES menggunakan limit orders."""
     logger.info(f"  🟢 LONG ARB: Beli {len(opp.outcomes)} outcomes")
+    if PARALLEL_LEGS:
+        return _execute_parallel(client, opp, "BUY")
 
     amount_each = opp.trade_size / len(opp.outcomes)
     success_count = 0
@@ -74,6 +136,7 @@ def _execute_long(client, opp: ArbitrageOpportunity) -> bool:
 
         if DRY_RUN:
             logger.info(f"  [SIM] BUY {outcome.name} @ ${outcome.yes_price:.4f} | ${amount_each:.2f}")
+            _record_leg(opp, outcome, "BUY", amount_each, None)
             success_count += 1
             continue
 
@@ -81,16 +144,14 @@ def _execute_long(client, opp: ArbitrageOpportunity) -> bool:
             notify_trade_failed(opp.market_question, "Tiada sambungan CLOB")
             return False
 
+        resp = None
         try:
-            # Guna LIMIT order (bukan market) — elak fee taker!
-            # Limit pada harga semasa = fill segera tapi sebagai maker
-            order_args = MarketOrderArgs(
-                token_id=outcome.token_id,
-                amount=amount_each,
-                side=Side.BUY
-            )
-            signed = client.create_market_order(order_args)
-            resp   = client.post_order(signed, OrderType.FOK)
+            # Had FOK = paras terburuk book yang perlu disapu (limit_price);
+            # tanpa semakan book, klien CLOB kira harga boleh-pasaran
+            signed = get_signer(client).sign(outcome.token_id, amount_each,
+                                             "BUY", outcome.limit_price or None)
+            with metrics.timer("order_post_seconds", mode="single"):
+                resp = _post_limited("/order", lambda: client.post_order(signed, OrderType.FOK))
 
             if resp and resp.get("status") == "matched":
                 logger.info(f"  ✅ BUY {outcome.name} berjaya!")
@@ -100,6 +161,7 @@ def _execute_long(client, opp: ArbitrageOpportunity) -> bool:
 
         except Exception as e:
             logger.error(f"  ❌ Gagal BUY {outcome.name}: {e}")
+        _record_leg(opp, outcome, "BUY", amount_each, resp)
 
     # Semak keputusan
     all_success = (success_count == len(opp.outcomes))
@@ -115,6 +177,8 @@ def _execute_long(client, opp: ArbitrageOpportunity) -> bool:
 def _execute_short(client, opp: ArbitrageOpportunity) -> bool:
     """SHORT ARB: Jual semua YES (mint full set dulu)."""
     logger.info(f"  🔴 SHORT ARB: Jual {len(opp.outcomes)} outcomes")
+    if PARALLEL_LEGS:
+        return _execute_parallel(client, opp, "SELL")
 
     amount_each   = opp.trade_size / len(opp.outcomes)
     success_count = 0
@@ -127,6 +191,7 @@ def _execute_short(client, opp: ArbitrageOpportunity) -> bool:
 
         if DRY_RUN:
             logger.info(f"  [SIM] SELL {outcome.name} @ ${outcome.yes_price:.4f} | ${amount_each:.2f}")
+            _record_leg(opp, outcome, "SELL", amount_each, None)
             success_count += 1
             continue
 
@@ -134,14 +199,12 @@ def _execute_short(client, opp: ArbitrageOpportunity) -> bool:
             notify_trade_failed(opp.market_question, "Tiada sambungan CLOB")
             return False
 
+        resp = None
         try:
-            order_args = MarketOrderArgs(
-                token_id=outcome.token_id,
-                amount=amount_each,
-                side=Side.SELL
-            )
-            signed = client.create_market_order(order_args)
-            resp   = client.post_order(signed, OrderType.FOK)
+            signed = get_signer(client).sign(outcome.token_id, amount_each,
+                                             "SELL", outcome.limit_price or None)
+            with metrics.timer("order_post_seconds", mode="single"):
+                resp = _post_limited("/order", lambda: client.post_order(signed, OrderType.FOK))
 
             if resp and resp.get("status") == "matched":
                 logger.info(f"  ✅ SELL {outcome.name} berjaya!")
@@ -151,6 +214,7 @@ def _execute_short(client, opp: ArbitrageOpportunity) -> bool:
 
         except Exception as e:
             logger.error(f"  ❌ Gagal SELL {outcome.name}: {e}")
+        _record_leg(opp, outcome, "SELL", amount_each, resp)
 
     all_success = (success_count == len(opp.outcomes))
     if all_success:
@@ -160,3 +224,92 @@ def _execute_short(client, opp: ArbitrageOpportunity) -> bool:
         notify_trade_failed(opp.market_question,
                             f"Hanya {success_count}/{len(opp.outcomes)} order berjaya")
     return all_success
+
+
+# ─── MOD SELARI: SEMUA KAKI SERENTAK ───────────────────────
+
+def _post_all(client, signed: list) -> Tuple[List[Optional[dict]], List[float]]:
+    """
+    Hantar semua order serentak — batch /orders jika ada, jika tidak thread pool.
+    Pulangkan (respons, masa ack setiap kaki).
+    """
+    if BATCH_POST_AVAILABLE and hasattr(client, "post_orders"):
+        resp = _post_limited("/orders", lambda: client.post_orders(
+            [PostOrdersArgs(order=o, orderType=OrderType.FOK) for o in signed]))
+        acked = time.perf_counter()
+        resp  = list(resp) if isinstance(resp, list) else [resp] * len(signed)
+        return resp, [acked] * len(signed)
+
+    def _post(order):
+        try:
+            resp = _post_limited("/order", lambda: client.post_order(order, OrderType.FOK))
+        except Exception as e:
+            logger.error(f"  ❌ Gagal hantar order: {e}")
+            resp = None
+        return resp, time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=len(signed)) as pool:
+        results = list(pool.map(_post, signed))
+    return [r for r, _ in results], [t for _, t in results]
+
+
+def _execute_parallel(client, opp: ArbitrageOpportunity, side: str) -> bool:
+    """Tandatangan semua kaki dulu, kemudian hantar serentak dan kumpul keputusan."""
+    amount_each = opp.trade_size / len(opp.outcomes)
+
+    # Satu notifikasi untuk semua kaki — bukan satu panggilan Telegram setiap kaki
+    notify_legs_placed(opp.market_question, side,
+                       [(o.name, o.yes_price) for o in opp.outcomes],
+                       amount_each, DRY_RUN)
+
+    if DRY_RUN:
+        for outcome in opp.outcomes:
+            logger.info(f"  [SIM] {side} {outcome.name} @ ${outcome.yes_price:.4f} | ${amount_each:.2f}")
+            _record_leg(opp, outcome, side, amount_each, None)
+        notify_trade_success(opp.market_question, opp.arb_type,
+                             opp.expected_profit_usdc, DRY_RUN)
+        return True
+
+    if client is None:
+        notify_trade_failed(opp.market_question, "Tiada sambungan CLOB")
+        return False
+
+    t0 = time.perf_counter()
+    try:
+        signed = get_signer(client).sign_all(
+            [(o.token_id, amount_each, side, o.limit_price or None) for o in opp.outcomes])
+    except Exception as e:
+        logger.error(f"  ❌ Gagal tandatangan order: {e}")
+        notify_trade_failed(opp.market_question, f"Gagal tandatangan: {e}")
+        return False
+
+    t1 = time.perf_counter()
+    try:
+        responses, acks = _post_all(client, signed)
+    except Exception as e:
+        logger.error(f"  ❌ Gagal hantar batch order: {e}")
+        responses, acks = [None] * len(signed), [time.perf_counter()]
+    t2 = time.perf_counter()
+    metrics.observe("order_post_seconds", t2 - t1, mode="parallel")
+
+    success_count = 0
+    for outcome, resp in zip(opp.outcomes, responses):
+        _record_leg(opp, outcome, side, amount_each, resp)
+        if resp and resp.get("status") == "matched":
+            logger.info(f"  ✅ {side} {outcome.name} berjaya!")
+            success_count += 1
+        else:
+            logger.warning(f"  ⚠️  {outcome.name} tidak diisi: {resp}")
+
+    logger.info(f"  ⏱️  Sign: {(t1-t0)*1000:.0f}ms | Hantar {len(signed)} kaki: "
+                f"{(t2-t1)*1000:.0f}ms | Kaki pertama→terakhir: "
+                f"{(max(acks)-min(acks))*1000:.0f}ms")
+
+    all_success = (success_count == len(opp.outcomes))
+    if all_success:
+        notify_trade_success(opp.market_question, opp.arb_type,
+                             opp.expected_profit_usdc, DRY_RUN)
+    else:
+        notify_trade_failed(opp.market_question,
+                            f"Hanya {success_count}/{len(opp.outcomes)} order berjaya")
+    return all_success
@@ -0,0 +1,180 @@
+# ============================================================
+#  http_client.py — LAPISAN HTTP BERSAMA (GAMMA, CLOB, TELEGRAM)
+#  Kolam sambungan setiap host, keep-alive, HTTP/2 pilihan,
+#  timeout boleh ditetapkan & cuba semula dengan backoff berjitter
+# ============================================================
+
+import time
+import random
+import logging
+import threading
+import metrics
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import RateLimiter, get_limiter, retry_after_seconds
+from config import (
+    HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+    HTTP_RETRIES, HTTP_BACKOFF_SECONDS, HTTP2_ENABLED
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    import h2  # noqa: F401 — httpx perlukan h2 untuk HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout) + (
+    (httpx.TransportError,) if HTTP2_AVAILABLE else ())
+IDEMPOTENT   = ("GET", "HEAD", "OPTIONS")
+
+
+def endpoint_label(url: str) -> str:
+    """/markets/12345 → /markets/{id} supaya label metrik tidak meletup."""
+    parts = urlsplit(url).path.split("/")
+    return "/".join("{id}" if p.isdigit() or len(p) > 24 else p for p in parts) or "/"
+
+
+class Transport:
+    """
+    Satu klien HTTP untuk seluruh bot. Setiap host ada Session/kolam
+    sendiri supaya sambungan TCP+TLS diguna semula antara request.
+
+    Request idempotent (GET) dicuba semula secara automatik bagi ralat
+    sambungan & status 429/5xx. POST hanya dicuba semula jika retry=True
+    (cth. /books yang baca sahaja) — order TIDAK PERNAH dihantar dua kali.
+
+    Setiap cubaan ambil token dari RateLimiter bersama dahulu (lorong
+    ikut rate_limit.high_priority()); 429 diserah kepada limiter yang
+    menahan baldi endpoint itu untuk semua pemanggil.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE,
+                 retries: int = HTTP_RETRIES,
+                 backoff: float = HTTP_BACKOFF_SECONDS,
+                 timeout: tuple = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                 http2: bool = HTTP2_ENABLED,
+                 limiter: Optional[RateLimiter] = None):
+        self.pool_size = pool_size
+        self.limiter   = limiter or get_limiter()
+        self.retries   = retries
+        self.backoff   = backoff
+        self.timeout   = timeout
+        self.http2     = http2 and HTTP2_AVAILABLE
+        self._clients: Dict[str, object] = {}
+        self._lock     = threading.Lock()
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("⚠️  HTTP/2 perlukan: pip install httpx[http2] — guna HTTP/1.1")
+
+    def _client(self, url: str):
+        host = urlsplit(url).netloc
+        client = self._clients.get(host)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(host)
+            if client is None:
+                client = self._clients[host] = self._new_client()
+        return client
+
+    def _new_client(self):
+        if self.http2:
+            limits = httpx.Limits(max_connections=self.pool_size,
+                                  max_keepalive_connections=self.pool_size)
+            return httpx.Client(http2=True, limits=limits)
+        session = requests.Session()
+        # pool_maxsize ≥ thread scan serentak — jika tidak urllib3 buang
+        # sambungan keep-alive dan buat handshake baru
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _delay(self, attempt: int, response=None) -> float:
+        """Backoff eksponen berjitter; patuhi Retry-After jika ada."""
+        if response is not None:
+            retry_after = retry_after_seconds(response.headers)
+            if retry_after is not None:
+                return retry_after
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def request(self, method: str, url: str, retry: Optional[bool] = None,
+                timeout=None, **kwargs):
+        method = method.upper()
+        retry  = (method in IDEMPOTENT) if retry is None else retry
+        client = self._client(url)
+        timeout = timeout or self.timeout
+        if self.http2 and isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+
+        labels   = {"host": urlsplit(url).netloc, "endpoint": endpoint_label(url)}
+        attempts = (self.retries + 1) if retry else 1
+        bucket   = self.limiter.bucket_for(url)
+        # Timeout request tunggal (cth. sebut harga semula) juga had menunggu bajet
+        budget_wait = timeout if isinstance(timeout, (int, float)) else None
+        for attempt in range(attempts):
+            if bucket is not None:
+                self.limiter.acquire(bucket, timeout=budget_wait)
+            if attempt:
+                metrics.inc("http_retries_total", **labels)
+            metrics.inc("http_requests_total", **labels)
+            start = time.perf_counter()
+            try:
+                response = client.request(method, url, timeout=timeout, **kwargs)
+            except RETRY_ERRORS as e:
+                metrics.inc("http_errors_total", **labels)
+                if attempt + 1 >= attempts:
+                    raise
+                delay = self._delay(attempt)
+                logger.debug(f"Cuba semula {method} {url} dalam {delay:.2f}s: {e}")
+            else:
+                metrics.observe("http_request_seconds", time.perf_counter() - start, **labels)
+                if response.status_code >= 400:
+                    metrics.inc("http_errors_total", **labels)
+                if bucket is not None:
+                    if response.status_code == 429:
+                        self.limiter.throttled(bucket, retry_after_seconds(response.headers))
+                    else:
+                        self.limiter.succeeded(bucket)
+                if response.status_code not in RETRY_STATUS or attempt + 1 >= attempts:
+                    return response
+                # 429 pada endpoint berbajet: acquire() seterusnya tunggu Retry-After
+                delay = (0.0 if bucket is not None and response.status_code == 429
+                         else self._delay(attempt, response))
+                logger.debug(f"Cuba semula {method} {url} (HTTP {response.status_code}) "
+                             f"dalam {delay:.2f}s")
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+_transport = Transport()
+
+
+def get_transport() -> Transport:
+    return _transport
+
+
+def get(url: str, **kwargs):
+    """GET melalui transport bersama (kolam + cuba semula)."""
+    return _transport.get(url, **kwargs)
+
+
+def post(url: str, **kwargs):
+    """POST melalui transport bersama (tiada cuba semula kecuali retry=True)."""
+    return _transport.post(url, **kwargs)
@@ -0,0 +1,211 @@
+# ============================================================
+#  ledger.py — LEJAR DAGANGAN KEKAL (SQLITE WAL, TULIS-BELAKANG)
+#  Peluang, order, isian & P&L direkod ke SQLite. Laluan trading
+#  hanya tambah ke deque; thread penulis tulis satu transaksi
+#  setiap LEDGER_FLUSH_SECONDS. Keadaan risiko & laporan sejam
+#  dibina semula dari lejar bila bot dimulakan semula.
+# ============================================================
+
+import os
+import time
+import atexit
+import logging
+import sqlite3
+import threading
+import metrics
+from collections import deque
+from typing import Dict, Optional
+from config import LEDGER_FILE, LEDGER_FLUSH_SECONDS, DRY_RUN
+from scanner import ArbitrageOpportunity
+
+logger = logging.getLogger(__name__)
+
+DAY = 86_400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS opportunities (
+    ts REAL, opp TEXT, market_id TEXT, event_id TEXT, question TEXT,
+    arb_type TEXT, total REAL, profit_pct REAL, profit_usdc REAL, size REAL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    ts REAL, opp TEXT, token_id TEXT, outcome TEXT, side TEXT,
+    price REAL, size REAL, status TEXT, order_id TEXT, dry_run INTEGER
+);
+CREATE TABLE IF NOT EXISTS trades (
+    ts REAL, opp TEXT, market_id TEXT, event_id TEXT, arb_type TEXT,
+    size REAL, status TEXT, pnl REAL, dry_run INTEGER
+);
+CREATE TABLE IF NOT EXISTS reports (ts REAL, dry_run INTEGER);
+CREATE INDEX IF NOT EXISTS opportunities_ts ON opportunities (ts);
+CREATE INDEX IF NOT EXISTS orders_opp ON orders (opp);
+CREATE INDEX IF NOT EXISTS trades_ts ON trades (dry_run, ts);
+"""
+
+INSERT = {
+    "opportunities": "INSERT INTO opportunities VALUES (?,?,?,?,?,?,?,?,?,?)",
+    "orders":        "INSERT INTO orders VALUES (?,?,?,?,?,?,?,?,?,?)",
+    "trades":        "INSERT INTO trades VALUES (?,?,?,?,?,?,?,?,?)",
+    "reports":       "INSERT INTO reports VALUES (?,?)",
+}
+
+# Status trade — "error" = tempahan dilepaskan (tidak dikira dalam trade harian)
+FILLED = "filled"
+FAILED = "failed"
+ERROR  = "error"
+
+
+def opportunity_key(opp: ArbitrageOpportunity) -> str:
+    """Kunci stabil satu peluang — sama selepas requote (dataclasses.replace)."""
+    return f"{opp.market_id}@{opp.detected_at:.6f}"
+
+
+class TradeLedger:
+    """
+    Lejar SQLite (journal WAL, synchronous=NORMAL).
+
+    record_*() hanya bina tuple & tambah ke deque (O(1), selamat thread) —
+    tiada I/O cakera dalam laluan trading. Thread penulis mengosongkan deque
+    setiap `flush_seconds` dalam SATU transaksi executemany.
+    Pembacaan (summary) menunggu tulisan tertunda dahulu supaya tepat.
+    """
+
+    def __init__(self, path: str, flush_seconds: float = LEDGER_FLUSH_SECONDS,
+                 dry_run: bool = DRY_RUN):
+        self.path          = path
+        self.flush_seconds = flush_seconds
+        self.dry_run       = int(dry_run)
+        self.rows          = 0
+        self._queue: deque = deque()
+        self._stop    = threading.Event()
+        self._io_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+        logger.info("📒 Lejar dagangan: %s", path)
+
+    # ─── LALUAN PANAS ──────────────────────────────────────
+
+    def record_opportunity(self, opp: ArbitrageOpportunity):
+        self._queue.append(("opportunities", (
+            opp.detected_at, opportunity_key(opp), opp.market_id, opp.event_id,
+            opp.market_question, opp.arb_type, opp.total_yes_sum,
+            opp.expected_profit_pct, opp.expected_profit_usdc, opp.trade_size)))
+
+    def record_order(self, opp: ArbitrageOpportunity, token_id: str, outcome: str,
+                     side: str, price: float, size: float, resp: Optional[dict]):
+        """Satu kaki order — status "matched" = diisi; "simulated" dalam DRY_RUN."""
+        if self.dry_run:
+            status, order_id = "simulated", ""
+        elif resp:
+            status, order_id = resp.get("status") or "unknown", resp.get("orderID") or ""
+        else:
+            status, order_id = "error", ""
+        self._queue.append(("orders", (
+            time.time(), opportunity_key(opp), token_id, outcome, side,
+            price, size, status, order_id, self.dry_run)))
+
+    def record_trade(self, opp: ArbitrageOpportunity, status: str, pnl: float):
+        self._queue.append(("trades", (
+            time.time(), opportunity_key(opp), opp.market_id,
+            opp.event_id or opp.market_id, opp.arb_type, opp.trade_size,
+            status, pnl, self.dry_run)))
+
+    def record_report(self):
+        """Laporan sejam dihantar — tetingkap laporan seterusnya bermula di sini."""
+        self._queue.append(("reports", (time.time(), self.dry_run)))
+
+    # ─── THREAD PENULIS ────────────────────────────────────
+
+    def flush(self):
+        with self._io_lock:
+            items = [self._queue.popleft() for _ in range(len(self._queue))]
+            if not items:
+                return
+            batches: Dict[str, list] = {}
+            for table, row in items:
+                batches.setdefault(table, []).append(row)
+            started = time.perf_counter()
+            try:
+                with self._db:
+                    self._db.execute("BEGIN")
+                    for table, rows in batches.items():
+                        self._db.executemany(INSERT[table], rows)
+            except Exception:
+                # Transaksi dibatalkan — pulangkan baris ke depan deque (susunan asal)
+                # supaya flush seterusnya cuba semula, tiada rekod hilang
+                self._queue.extendleft(reversed(items))
+                raise
+            metrics.observe("ledger_flush_seconds", time.perf_counter() - started)
+            metrics.inc("ledger_rows_total", len(items))
+            self.rows += len(items)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("❌ Gagal tulis lejar: %s", e)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        try:
+            self.flush()
+        finally:
+            self._db.close()
+
+    # ─── BINA SEMULA KEADAAN ───────────────────────────────
+
+    def summary(self, since: float) -> dict:
+        """Trade (mod semasa, LIVE/DRY_RUN) sejak `since` — guna indeks trades_ts."""
+        self.flush()
+        with self._io_lock:
+            trades, success, profit, pnl = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(status = ?), 0),"
+                " COALESCE(SUM(CASE WHEN status = ? THEN pnl END), 0),"
+                " COALESCE(SUM(pnl), 0)"
+                " FROM trades WHERE dry_run = ? AND ts >= ? AND status != ?",
+                (FILLED, FILLED, self.dry_run, since, ERROR)).fetchone()
+        return {"trades": trades, "success": success, "profit": profit, "pnl": pnl}
+
+    def last_report(self) -> float:
+        self.flush()
+        with self._io_lock:
+            row = self._db.execute("SELECT MAX(ts) FROM reports WHERE dry_run = ?",
+                                   (self.dry_run,)).fetchone()
+        return row[0] or 0.0
+
+    def restore(self, risk, report_seconds: float) -> dict:
+        """
+        Isi semula RiskManager (P&L & trade hari ini, UTC) dan pulangkan
+        ringkasan tetingkap laporan semasa (sejak laporan terakhir).
+        """
+        now   = time.time()
+        today = self.summary(now - now % DAY)
+        risk.restore(today["pnl"], today["trades"])
+        window = self.summary(max(self.last_report(), now - report_seconds))
+        logger.info("📒 Lejar: hari ini %d trade | P&L $%.4f | tetingkap laporan %d trade",
+                    today["trades"], today["pnl"], window["trades"])
+        return window
+
+
+_ledger: Optional[TradeLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> Optional[TradeLedger]:
+    """Lejar bersama jika LEDGER_FILE ditetapkan, jika tidak None."""
+    global _ledger
+    if not LEDGER_FILE:
+        return None
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = TradeLedger(LEDGER_FILE)
+            atexit.register(_ledger.close)
+    return _ledger
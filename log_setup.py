@@ -0,0 +1,144 @@
+# ============================================================
+#  log_setup.py — LOG TAK-MENYEKAT (BARIS GILIR + JSONL + PUTARAN)
+#  Thread pemanggil hanya masukkan LogRecord ke baris gilir;
+#  pemformatan & tulisan cakera berlaku di thread pendengar.
+#  Baris per-pasaran yang berulang disampel (had letusan).
+# ============================================================
+
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+from config import (
+    LOG_FILE, LOG_JSON, LOG_ASYNC, LOG_MAX_BYTES, LOG_BACKUPS,
+    LOG_SAMPLE_BURST, LOG_SAMPLE_SECONDS
+)
+
+# Tanda baris per-pasaran yang boleh disampel:
+#   logger.info("  🎯 [%s] %.50s...", opp.arb_type, q, extra=SAMPLED)
+SAMPLED = {"sampled": True}
+
+_listener: Optional[QueueListener] = None
+
+
+class SampleFilter(logging.Filter):
+    """
+    Had letusan setiap templat mesej: `burst` rekod setiap `window` saat,
+    lebihan dibuang sebelum diformat. Rekod pertama tetingkap seterusnya
+    membawa `skipped` = bilangan yang dibuang.
+    Hanya rekod dengan extra=SAMPLED; amaran/ralat tidak pernah disampel.
+    """
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST,
+                 window: float = LOG_SAMPLE_SECONDS):
+        super().__init__()
+        self.burst  = burst
+        self.window = window
+        self._windows: Dict[tuple, List[float]] = {}   # (logger, templat) → [mula, bilangan]
+        self._lock  = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.burst or not getattr(record, "sampled", False):
+            return True
+        keep = getattr(record, "sample_keep", None)
+        if keep is not None:                    # sudah diputuskan oleh handler lain
+            return keep
+        key = (record.name, record.msg)
+        with self._lock:
+            w = self._windows.get(key)
+            if w is None or record.created - w[0] >= self.window:
+                if w is not None and w[1] > self.burst:
+                    record.skipped = int(w[1] - self.burst)
+                w = self._windows[key] = [record.created, 0]
+            w[1] += 1
+            keep = w[1] <= self.burst
+        record.sample_keep = keep
+        return keep
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        skipped = getattr(record, "skipped", 0)
+        return f"{text}  (+{skipped} serupa dilangkau)" if skipped else text
+
+
+class JsonFormatter(logging.Formatter):
+    """Satu objek JSON padat setiap baris (JSONL)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": round(record.created, 3), "lvl": record.levelname,
+                 "log": record.name, "msg": record.getMessage().strip()}
+        skipped = getattr(record, "skipped", 0)
+        if skipped:
+            entry["skipped"] = skipped
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler standard memformat mesej dalam thread pemanggil (prepare()).
+    Baris gilir ini dalam proses yang sama, jadi rekod dihantar seadanya —
+    `msg % args` hanya dinilai oleh pendengar.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(path: str = LOG_FILE, json_file: bool = LOG_JSON,
+                  use_queue: bool = LOG_ASYNC, level: int = logging.INFO,
+                  tag: str = ""):
+    """
+    Konsol (teks) + fail (teks/JSONL, berputar ikut saiz), pilihan melalui baris gilir.
+
+    Satu fail untuk satu proses sahaja — RotatingFileHandler tidak selamat
+    dikongsi antara proses (pekerja shard guna fail sendiri, lihat shard.py).
+    `tag` ditambah pada setiap baris teks, cth. "[shard 2] ".
+    """
+    global _listener
+    sampler = SampleFilter()
+    text    = TextFormatter(f"%(asctime)s | {tag}%(message)s", datefmt="%H:%M:%S")
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(text)
+    handlers: List[logging.Handler] = [console]
+    if path:
+        if LOG_MAX_BYTES:
+            file = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES,
+                                       backupCount=LOG_BACKUPS, encoding="utf-8")
+        else:
+            file = logging.FileHandler(path, encoding="utf-8")
+        file.setFormatter(JsonFormatter() if json_file else text)
+        handlers.append(file)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+
+    if use_queue:
+        front = DeferredQueueHandler(queue.SimpleQueue())
+        front.addFilter(sampler)
+        root.addHandler(front)
+        _listener = QueueListener(front.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+    else:
+        for h in handlers:
+            h.addFilter(sampler)
+            root.addHandler(h)
+
+
+def stop_logging():
+    """Tulis semua rekod tertunda & henti thread pendengar."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -5,32 +5,38 @@
 # ============================================================
 
 import time
+import asyncio
 import logging
+import signal
+import threading
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Optional
 from config import (
     SCAN_INTERVAL_SECONDS, TRADE_SIZE_USDC,
     DRY_RUN, REPORT_INTERVAL_MINUTES,
-    PRIVATE_KEY
+    PRIVATE_KEY, INCREMENTAL_SCAN, STREAM_MODE,
+    STREAM_REFRESH_SECONDS, DEPTH_CHECK, SCHEDULED_SCAN, SHARD_WORKERS,
+    OPPORTUNITY_PIPELINE, REQUOTE_BEFORE_ORDER, EXECUTION_WORKERS, LOG_FILE
 )
-from scanner import scan_all
-from executor import get_client, execute_opportunity
+from scanner import ArbitrageOpportunity, scan_all, scan_iter, fetch_negrisk_markets
+from market_cache import IncrementalScanner
+from scheduler import MarketScheduler
+from shard import ShardCoordinator
+from stream import MarketStream
+from pipeline import OpportunityQueue, is_expired
+from orderbook import confirm_with_depth, requote
+from executor import get_client, execute_opportunity, prepare_orders
 from risk_manager import RiskManager
+from ledger import get_ledger, FILLED, FAILED, ERROR
+import metrics
+from log_setup import setup_logging
 from telegram_notify import (
     notify_bot_started, notify_opportunity_found,
-    notify_hourly_report, notify_bot_stopped
+    notify_hourly_report, notify_bot_stopped, flush_telegram
 )
 
-# ─── SETUP LOG ─────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(message)s",
-    datefmt="%H:%M:%S",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("bot.log", encoding="utf-8")
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
@@ -45,7 +51,73 @@ def banner():
     logger.info("=" * 50)
 
 
+def process_opportunity(client, risk: RiskManager, opp: ArbitrageOpportunity,
+                        notify: bool = True) -> Optional[bool]:
+    """Notifikasi → semak risiko → laksana. None = ditolak / luput.
+
+    notify=False — pemanggil sudah hantar notifikasi peluang (tugasan notifikasi).
+    """
+
+    # Notifikasi peluang ditemui ke Telegram
+    if notify:
+        notify_opportunity_found(
+            opp.market_question, opp.arb_type,
+            opp.total_yes_sum, opp.expected_profit_pct,
+            opp.expected_profit_usdc, opp.outcomes
+        )
+
+    # Harga sudah lapuk selepas notifikasi? Jangan hantar order
+    if is_expired(opp):
+        metrics.inc("opportunities_expired_total")
+        logger.info("  ⌛ Peluang luput — dilangkau")
+        return None
+
+    # Sebut harga semula semua kaki (satu request, had masa ketat) —
+    # harga yang dihantar ke FOK ialah harga saat ini, bukan masa scan
+    if REQUOTE_BEFORE_ORDER:
+        opp = requote(opp)
+        if opp is None:
+            return None
+
+    # Semak risiko & tempah modal (atomik — selamat untuk pelaksana serentak)
+    ledger = get_ledger()
+    with metrics.timer("risk_check_seconds"):
+        reservation, reason = risk.reserve(opp)
+    logger.info("  🛡️  Risk: %s", reason)
+
+    if reservation is None:
+        return None
+
+    # Laksana trade — tempahan SENTIASA dilepaskan jika tidak sempat commit
+    try:
+        success = execute_opportunity(client, opp)
+    except Exception:
+        risk.release(reservation)
+        if ledger:
+            ledger.record_trade(opp, ERROR, 0.0)
+        raise
+
+    if success:
+        pnl = risk.commit(reservation, opp.expected_profit_usdc, True)
+    else:
+        pnl = risk.commit(reservation, 0, False)
+    if ledger:
+        ledger.record_trade(opp, FILLED if success else FAILED, pnl)
+    if success:
+        metrics.observe("detection_to_fill_seconds", time.time() - opp.seen_at)
+        logger.info("  💰 +$%.4f USDC", opp.expected_profit_usdc)
+    return success
+
+
 def run():
+    """
+    Mod scan: runtime asyncio dengan tugasan berasingan yang dihubung baris gilir —
+      scan      → OpportunityQueue (paling untung dulu) + baris gilir notifikasi
+      laksana   → EXECUTION_WORKERS tugasan ambil dari OpportunityQueue
+      laporan   → laporan Telegram setiap REPORT_INTERVAL_MINUTES
+      notifikasi→ peluang ditemui ke Telegram (tidak melambatkan pelaksanaan)
+    Scan diteruskan semasa trade sedang berjalan; Ctrl+C = henti dengan teratur.
+    """
     banner()
 
     # Sambung ke Polymarket
@@ -54,114 +126,322 @@ def run():
         client = get_client()
 
     risk = RiskManager()
+    ledger = get_ledger()
+    metrics.start_exporters()
+    scheduler   = MarketScheduler() if SCHEDULED_SCAN else None
+    coordinator = ShardCoordinator().start() if SHARD_WORKERS and not scheduler else None
+    incremental = (IncrementalScanner() if INCREMENTAL_SCAN and not scheduler
+                   and not coordinator else None)
+    # OPPORTUNITY_PIPELINE: scan_iter — peluang ke baris gilir sebaik dijumpai.
+    # Scanner lain didahulukan (inkremental hanya nilai pasaran yang berubah)
+    streamed = OPPORTUNITY_PIPELINE and not (scheduler or coordinator or incremental)
+    if OPPORTUNITY_PIPELINE and not streamed:
+        logger.info("ℹ️  OPPORTUNITY_PIPELINE diabaikan — peluang ditolak selepas setiap kitaran scan")
+    # Penjadual (refresh) & pekerja shard sudah semak kedalaman dengan book sendiri;
+    # sapuan universe penjadual hanya mendahulukan calon, tiada peluang harga senarai
+    needs_depth = DEPTH_CHECK and not scheduler and not coordinator
 
-    # Kaunter statistik
-    scan_count     = 0
-    opps_found     = 0
-    trades_done    = 0
-    trades_success = 0
-    session_profit = 0.0
-    hour_profit    = 0.0
-    last_report    = time.time()
+    # Kaunter statistik (dikemas kini oleh tugasan scan & pelaksana)
+    stats      = {"scans": 0, "found": 0, "trades": 0, "success": 0,
+                  "profit": 0.0, "hour_profit": 0.0}
+    if ledger:
+        # Mula semula: P&L harian & profit tetingkap laporan semasa dari lejar
+        stats["hour_profit"] = ledger.restore(risk, REPORT_INTERVAL_MINUTES * 60)["profit"]
+    stats_lock = threading.Lock()
+    in_flight  = set()
+    published  = {}                 # market id → (arb_type, total_yes_sum) terakhir diterbitkan
+    pipeline   = OpportunityQueue()
+    # Scan berjalan dalam thread sendiri — tidak berebut dengan thread pelaksana
+    scan_pool  = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan")
 
-    # Hantar notifikasi bot dimulakan
-    notify_bot_started(DRY_RUN, TRADE_SIZE_USDC)
-    logger.info("\n🤖 Bot berjalan... (Ctrl+C untuk henti)\n")
+    def _trade(opp: ArbitrageOpportunity):
+        # Jangan ulang pasaran yang sedang ditrade oleh pelaksana lain
+        with stats_lock:
+            if risk.is_halted or opp.market_id in in_flight:
+                return
+            in_flight.add(opp.market_id)
+        try:
+            # Sebut harga semula dalam process_opportunity sudah semak kedalaman
+            if (needs_depth and streamed and not REQUOTE_BEFORE_ORDER
+                    and not confirm_with_depth([opp])):
+                return
+            success = process_opportunity(client, risk, opp, notify=False)
+        except Exception as e:
+            logger.error("❌ Ralat semasa trade %s: %s", opp.market_id, e)
+            return
+        finally:
+            in_flight.discard(opp.market_id)
+        if success is None:
+            return
+        with stats_lock:
+            stats["trades"] += 1
+            if success:
+                stats["success"]     += 1
+                stats["profit"]      += opp.expected_profit_usdc
+                stats["hour_profit"] += opp.expected_profit_usdc
 
-    try:
-        while True:
-            scan_count += 1
-            logger.info(f"\n{'─'*45}")
-            logger.info(f"  SCAN #{scan_count} | {datetime.now().strftime('%H:%M:%S')}")
-            logger.info(f"{'─'*45}")
-
-            # ── SCAN ─────────────────────────────────────
+    def _scan_once(publish) -> int:
+        """Satu kitaran scan (dalam thread). Setiap peluang terus ke publish()."""
+        if scheduler:
+            opportunities = scheduler.scan(TRADE_SIZE_USDC)
+        elif coordinator:
+            # Pekerja shard sudah semak kedalaman secara selari
+            opportunities = coordinator.scan(TRADE_SIZE_USDC)
+        elif incremental:
+            opportunities = incremental.scan(TRADE_SIZE_USDC)
+        elif streamed:
+            count = 0
+            for opp in scan_iter(TRADE_SIZE_USDC):
+                if pipeline.closed:
+                    break                       # bot sedang berhenti
+                publish(opp)
+                count += 1
+            return count
+        else:
             opportunities = scan_all(TRADE_SIZE_USDC)
-            opps_found += len(opportunities)
+        if needs_depth:
+            opportunities = confirm_with_depth(opportunities)
+        for opp in opportunities:
+            publish(opp)
+        return len(opportunities)
+
+    # ─── TUGASAN ───────────────────────────────────────────
+
+    async def _scan_task(publish):
+        loop = asyncio.get_running_loop()
+        while True:
+            stats["scans"] += 1
+            started = time.time()
+            if not scheduler:
+                logger.info("\n%s", "─" * 45)
+                logger.info("  SCAN #%d | %s", stats["scans"], datetime.now().strftime("%H:%M:%S"))
+                logger.info("─" * 45)
 
-            if not opportunities:
+            found = await loop.run_in_executor(scan_pool, _scan_once, publish)
+            stats["found"] += found
+            if not found and not scheduler:
                 logger.info("💤 Tiada peluang. Tunggu scan seterusnya...")
-            else:
-                # Susun ikut profit terbesar dulu
-                opportunities.sort(
-                    key=lambda x: x.expected_profit_pct, reverse=True
-                )
-
-                for opp in opportunities:
-                    if risk.is_halted:
-                        break
-
-                    # Notifikasi peluang ditemui ke Telegram
-                    notify_opportunity_found(
-                        opp.market_question, opp.arb_type,
-                        opp.total_yes_sum, opp.expected_profit_pct,
-                        opp.expected_profit_usdc, opp.outcomes
-                    )
-
-                    # Semak risiko
-                    approved, reason = risk.approve(opp)
-                    logger.info(f"  🛡️  Risk: {reason}")
-
-                    if not approved:
-                        continue
-
-                    # Laksana trade
-                    risk.record_start(opp.trade_size)
-                    trades_done += 1
-
-                    success = execute_opportunity(client, opp)
-
-                    if success:
-                        trades_success += 1
-                        session_profit += opp.expected_profit_usdc
-                        hour_profit    += opp.expected_profit_usdc
-                        risk.record_end(opp.trade_size,
-                                        opp.expected_profit_usdc, True)
-                        logger.info(f"  💰 +${opp.expected_profit_usdc:.4f} USDC")
-                    else:
-                        risk.record_end(opp.trade_size, 0, False)
-
-                    time.sleep(0.5)
-
-            # ── LAPORAN SEJAM ────────────────────────────
-            elapsed_min = (time.time() - last_report) / 60
-            if elapsed_min >= REPORT_INTERVAL_MINUTES:
+
+            # Selang dikira dari mula scan — scan yang lambat tidak ditambah tidur penuh
+            wait = (scheduler.sleep_time() if scheduler
+                    else max(0.0, SCAN_INTERVAL_SECONDS - (time.time() - started)))
+            if not scheduler or found:
                 status = risk.get_status()
-                notify_hourly_report(
-                    scan_count     = scan_count,
-                    opportunities_found = opps_found,
-                    trades_executed    = trades_done,
-                    trades_success     = trades_success,
-                    total_profit       = hour_profit,
-                    daily_pnl          = status["daily_pnl"],
-                    available_capital  = status["available"],
-                    dry_run            = DRY_RUN
-                )
-                logger.info(f"📊 Laporan sejam dihantar ke Telegram!")
-                hour_profit  = 0.0   # Reset pengira profit sejam
-                last_report  = time.time()
-
-            # ── STATUS RINGKAS ───────────────────────────
+                logger.info("\n  📈 Sesi: %d/%d trade berjaya", stats["success"], stats["trades"])
+                logger.info("  💰 Total profit: $%.4f USDC", stats["profit"])
+                logger.info("  💵 Modal tersedia: $%.2f USDC", status["available"])
+                logger.info("  📥 Baris gilir: %d | sedang ditrade: %d", len(pipeline), len(in_flight))
+                logger.info("\n  ⏳ Scan seterusnya dalam %.0fs...", wait)
+            await asyncio.sleep(wait)
+
+    async def _execute_task():
+        while True:
+            opp = await asyncio.to_thread(pipeline.get, 1.0)
+            if opp is None:
+                if pipeline.closed:
+                    return
+                continue
+            await asyncio.to_thread(_trade, opp)
+
+    async def _report_task():
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL_MINUTES * 60)
             status = risk.get_status()
-            logger.info(f"\n  📈 Sesi: {trades_success}/{trades_done} trade berjaya")
-            logger.info(f"  💰 Total profit: ${session_profit:.4f} USDC")
-            logger.info(f"  💵 Modal tersedia: ${status['available']:.2f} USDC")
-            logger.info(f"\n  ⏳ Scan seterusnya dalam {SCAN_INTERVAL_SECONDS}s...")
-            time.sleep(SCAN_INTERVAL_SECONDS)
+            notify_hourly_report(
+                scan_count          = stats["scans"],
+                opportunities_found = stats["found"],
+                trades_executed     = stats["trades"],
+                trades_success      = stats["success"],
+                total_profit        = stats["hour_profit"],
+                daily_pnl           = status["daily_pnl"],
+                available_capital   = status["available"],
+                dry_run             = DRY_RUN
+            )
+            logger.info("📊 Laporan sejam dihantar ke Telegram!")
+            with stats_lock:
+                stats["hour_profit"] = 0.0   # Reset pengira profit sejam
+            if ledger:
+                ledger.record_report()
+
+    async def _notify_task(notices: asyncio.Queue):
+        while True:
+            opp = await notices.get()
+            notify_opportunity_found(
+                opp.market_question, opp.arb_type,
+                opp.total_yes_sum, opp.expected_profit_pct,
+                opp.expected_profit_usdc, opp.outcomes
+            )
+
+    async def _main():
+        loop    = asyncio.get_running_loop()
+        stop    = asyncio.Event()
+        notices: asyncio.Queue = asyncio.Queue()
+        try:
+            loop.add_signal_handler(signal.SIGINT, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass                                # Windows — KeyboardInterrupt biasa
+
+        def publish(opp: ArbitrageOpportunity):
+            # Dipanggil dari thread scan: templat order disediakan sementara
+            # peluang menunggu pelaksana
+            if pipeline.closed:
+                return                          # bot sedang berhenti
+            prepare_orders(client, (o.token_id for o in opp.outcomes))
+            pipeline.put(opp)
+            # Peluang yang sama diterbitkan semula setiap scan (cache inkremental) —
+            # notifikasi & lejar hanya bila jenis / jumlah harga pasaran berubah
+            key = (opp.arb_type, opp.total_yes_sum)
+            if published.get(opp.market_id) == key:
+                return
+            published[opp.market_id] = key
+            if ledger:
+                ledger.record_opportunity(opp)
+            loop.call_soon_threadsafe(notices.put_nowait, opp)
+
+        workers = [asyncio.create_task(_execute_task()) for _ in range(max(1, EXECUTION_WORKERS))]
+        tasks   = [asyncio.create_task(_scan_task(publish)),
+                   asyncio.create_task(_report_task()),
+                   asyncio.create_task(_notify_task(notices))]
+        stopper = asyncio.create_task(stop.wait())
+        done, _ = await asyncio.wait(tasks + workers + [stopper],
+                                     return_when=asyncio.FIRST_COMPLETED)
 
+        # Henti dengan teratur: tiada scan / trade baru, trade yang sedang
+        # berjalan dibiar selesai supaya RiskManager kekal tepat
+        logger.info("\n\n👋 Bot dihentikan — tunggu trade yang sedang berjalan...")
+        for task in tasks + [stopper]:
+            task.cancel()
+        pipeline.close()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # Thread scan mungkin masih berjalan walaupun tugasannya dibatalkan —
+        # tunggu ia tamat sebelum loop ditutup (publish guna call_soon_threadsafe)
+        await asyncio.to_thread(scan_pool.shutdown, wait=True, cancel_futures=True)
+        for task in done:
+            if task is not stopper and not task.cancelled() and task.exception():
+                raise task.exception()
+
+    notify_bot_started(DRY_RUN, TRADE_SIZE_USDC)
+    logger.info("\n🤖 Bot berjalan... (Ctrl+C untuk henti)\n")
+
+    try:
+        asyncio.run(_main())
     except KeyboardInterrupt:
         logger.info("\n\n👋 Bot dihentikan (Ctrl+C)")
-        notify_bot_stopped(session_profit, trades_done, DRY_RUN)
-        logger.info(f"\n  Total Profit : ${session_profit:.4f} USDC")
-        logger.info(f"  Total Trade  : {trades_done}")
-        logger.info(f"  Log disimpan : bot.log")
-
     except Exception as e:
         logger.critical(f"\n🚨 RALAT KRITIKAL: {e}")
         logger.exception("Stack trace:")
         risk.emergency_stop(str(e))
         sys.exit(1)
+    finally:
+        scan_pool.shutdown(wait=False, cancel_futures=True)
+        pipeline.close()
+        if coordinator:
+            coordinator.stop()
+
+    notify_bot_stopped(stats["profit"], stats["trades"], DRY_RUN)
+    flush_telegram()
+    logger.info(f"\n  Total Profit : ${stats['profit']:.4f} USDC")
+    logger.info(f"  Total Trade  : {stats['trades']}")
+    logger.info(f"  Log disimpan : {LOG_FILE}")
+
+
+def run_stream():
+    """Mod stream: harga dari WebSocket CLOB, trade serta-merta bila ada peluang."""
+    banner()
+    logger.info("  ⚡ MOD STREAM (WebSocket CLOB)")
+
+    client = None
+    if "ISI" not in PRIVATE_KEY and not DRY_RUN:
+        client = get_client()
+
+    risk      = RiskManager()
+    ledger    = get_ledger()
+    if ledger:
+        ledger.restore(risk, REPORT_INTERVAL_MINUTES * 60)
+    metrics.start_exporters()
+    stats     = {"trades": 0, "success": 0, "profit": 0.0}
+    in_flight = set()
+    # RiskManager.reserve atomik — beberapa trade boleh berjalan serentak
+    trade_pool = ThreadPoolExecutor(max_workers=max(1, EXECUTION_WORKERS))
+
+    def _trade(opp: ArbitrageOpportunity):
+        try:
+            success = process_opportunity(client, risk, opp)
+            if success is not None:
+                stats["trades"] += 1
+            if success:
+                stats["success"] += 1
+                stats["profit"]  += opp.expected_profit_usdc
+        except Exception as e:
+            logger.error("❌ Ralat semasa trade %s: %s", opp.market_id, e)
+        finally:
+            in_flight.discard(opp.market_id)
+
+    def on_opportunity(opp: ArbitrageOpportunity):
+        # Jangan ulang pasaran yang sedang ditrade
+        if risk.is_halted or opp.market_id in in_flight:
+            return
+        in_flight.add(opp.market_id)
+        if ledger:
+            ledger.record_opportunity(opp)
+        trade_pool.submit(_trade, opp)
+
+    # SHARD_WORKERS > 0 → setiap pekerja langgan token shardnya sendiri;
+    # peluang sampai melalui bas penyelaras ke on_opportunity yang sama
+    coordinator = ShardCoordinator().start() if SHARD_WORKERS else None
+    stream = None if coordinator else MarketStream(TRADE_SIZE_USDC, on_opportunity)
+
+    def _set_markets(markets):
+        if coordinator:
+            coordinator.stream(markets, TRADE_SIZE_USDC)
+            prepare_orders(client, coordinator.asset_ids)
+        else:
+            stream.set_markets(markets)
+            prepare_orders(client, stream.asset_ids)
+
+    async def _refresh_universe():
+        # Pasaran baru/tutup → set_markets sambung semula dengan langganan baru
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(STREAM_REFRESH_SECONDS)
+            _set_markets(await loop.run_in_executor(None, fetch_negrisk_markets))
+
+    async def _main():
+        loop = asyncio.get_running_loop()
+        _set_markets(await loop.run_in_executor(None, fetch_negrisk_markets))
+        refresher = asyncio.ensure_future(_refresh_universe())
+        try:
+            if coordinator:
+                coordinator.dispatch(on_opportunity)
+                await refresher
+            else:
+                await stream.run()
+        finally:
+            refresher.cancel()
+
+    notify_bot_started(DRY_RUN, TRADE_SIZE_USDC)
+    logger.info("\n🤖 Bot berjalan... (Ctrl+C untuk henti)\n")
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        logger.info("\n\n👋 Bot dihentikan (Ctrl+C)")
+        if coordinator:
+            coordinator.stop()
+        trade_pool.shutdown(wait=True)
+        notify_bot_stopped(stats["profit"], stats["trades"], DRY_RUN)
+        flush_telegram()
+        logger.info(f"\n  Total Profit : ${stats['profit']:.4f} USDC")
+        logger.info(f"  Total Trade  : {stats['trades']}")
+        if stream:
+            logger.info(f"  Mesej stream : {stream.messages} | Sambung semula: {stream.reconnects}")
 
 
 if __name__ == "__main__":
-    run()
+    # Hanya dalam proses utama — pekerja shard (spawn) mengimport semula modul
+    # ini dan tidak boleh membuka/memutar bot.log yang sama
+    setup_logging()
+    if STREAM_MODE:
+        run_stream()
+    else:
+        run()
@@ -0,0 +1,229 @@
+# ============================================================
+#  market_cache.py — SCAN INKREMENTAL + CACHE METADATA PASARAN
+#  Hanya nilai semula pasaran yang harganya berubah sejak scan lepas
+# ============================================================
+
+import time
+import logging
+import http_client
+import metrics
+from log_setup import SAMPLED
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from config import (
+    GAMMA_API_URL, MIN_PROFIT_THRESHOLD, SCAN_CONCURRENCY,
+    MARKET_CACHE_TTL_SECONDS, EVENT_ARBS
+)
+from scanner import (
+    ArbitrageOpportunity, PAGE_SIZE, fetch_market_pages, is_fee_market,
+    listing_tokens, evaluate_tokens, scan_for_arbitrage
+)
+from event_index import EventIndex
+from tape import get_recorder
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedMarket:
+    question: str
+    is_fee: bool
+    signature: Optional[Tuple]          # (token_id, harga) … — None = tiada harga dalam senarai
+    opportunity: Optional[ArbitrageOpportunity]
+    trade_size: float
+    seen_at: float
+
+
+@dataclass
+class CachedPage:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    data: List[dict]
+
+
+def price_signature(tokens: Optional[List[dict]]) -> Optional[Tuple]:
+    """Tandatangan harga pasaran — berubah hanya bila harga token berubah."""
+    if tokens is None:
+        return None
+    return tuple((t.get("token_id", ""), str(t.get("price", ""))) for t in tokens)
+
+
+class IncrementalScanner:
+    """
+    Scanner berkeadaan: simpan harga & metadata terakhir bagi setiap
+    market id, dan hanya nilai semula pasaran yang berubah.
+
+    - Halaman /markets diambil dengan If-None-Match / If-Modified-Since;
+      halaman 304 terus dilangkau tanpa sebarang penilaian.
+    - Entri yang tidak dilihat dalam `ttl` saat dibuang (pasaran tutup/delist).
+    """
+
+    def __init__(self, ttl: float = MARKET_CACHE_TTL_SECONDS,
+                 concurrency: int = SCAN_CONCURRENCY):
+        self.ttl         = ttl
+        self.concurrency = concurrency
+        self.markets: Dict[str, CachedMarket] = {}
+        self.pages:   Dict[int, CachedPage]   = {}
+        self._unchanged_ids: Set[str] = set()
+        self.events = EventIndex()
+        self.event_opps: Dict[str, Optional[ArbitrageOpportunity]] = {}
+        self._event_trade_size: Optional[float] = None
+
+    # ─── AMBIL HALAMAN (CONDITIONAL) ───────────────────────
+
+    def _fetch_page(self, offset: int) -> List[dict]:
+        params = {
+            "active": "true",
+            "closed": "false",
+            "neg_risk": "true",
+            "order": "volumeNum",
+            "ascending": "false",
+            "offset": offset,
+            "limit": PAGE_SIZE
+        }
+        headers = {}
+        cached  = self.pages.get(offset)
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        r = http_client.get(f"{GAMMA_API_URL}/markets", params=params,
+                            headers=headers)
+        if r.status_code == 304 and cached:
+            self._unchanged_ids.update(m.get("id", "") for m in cached.data)
+            return cached.data
+
+        r.raise_for_status()
+        data = r.json() or []
+        etag, modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+        if etag or modified:
+            self.pages[offset] = CachedPage(etag, modified, data)
+        return data
+
+    # ─── SCAN ──────────────────────────────────────────────
+
+    def scan(self, trade_size: float) -> List[ArbitrageOpportunity]:
+        """Scan inkremental — pulangkan semua peluang semasa (baru + cache)."""
+        logger.info(f"\n🔍 MULA SCAN INKREMENTAL | Threshold: {MIN_PROFIT_THRESHOLD*100:.1f}% | Trade: ${trade_size}")
+        now = time.time()
+        scan_start = time.perf_counter()
+        self._unchanged_ids = set()
+        with metrics.timer("scan_fetch_seconds", mode="incremental"):
+            all_markets = fetch_market_pages(self.concurrency, self._fetch_page)
+        recorder = get_recorder()
+        if recorder:
+            recorder.record_markets(all_markets)
+        eval_start = time.perf_counter()
+
+        changed: List[Tuple[str, CachedMarket, Optional[List[dict]]]] = []
+        touched_events: Set[str] = set()
+        live_ids = []
+        for m in all_markets:
+            mid = m.get("id", "")
+            if not mid:
+                continue
+            entry = self.markets.get(mid)
+
+            # Halaman 304 → harga sama; cuma kemas kini masa dilihat
+            if (entry and mid in self._unchanged_ids
+                    and entry.trade_size == trade_size):
+                entry.seen_at = now
+                if not entry.is_fee:
+                    live_ids.append(mid)
+                continue
+
+            tokens    = listing_tokens(m)
+            signature = price_signature(tokens)
+            if entry is None:
+                question = m.get("question", "")
+                entry = CachedMarket(question, is_fee_market(question),
+                                     None, None, trade_size, now)
+                self.markets[mid] = entry
+            entry.seen_at = now
+            if entry.is_fee:
+                continue
+            live_ids.append(mid)
+
+            if (signature is not None and signature == entry.signature
+                    and entry.trade_size == trade_size):
+                continue
+            entry.signature  = signature
+            entry.trade_size = trade_size
+            changed.append((mid, entry, tokens))
+            group = self.events.upsert_market(m)
+            if group is not None:
+                touched_events.add(group.event_id)
+
+        # Nilai semula pasaran yang berubah sahaja; detail untuk calon
+        to_fetch = []
+        for mid, entry, tokens in changed:
+            entry.opportunity = None
+            if tokens is None or evaluate_tokens(mid, entry.question,
+                                                 tokens, trade_size):
+                to_fetch.append((mid, entry))
+        metrics.observe("scan_evaluate_seconds", time.perf_counter() - eval_start,
+                        mode="incremental")
+
+        def _confirm(item):
+            mid, entry = item
+            opp = scan_for_arbitrage(mid, entry.question, trade_size)
+            if opp:
+                opp.event_id = self.events.event_of(mid)
+            return opp
+
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            for (mid, entry), opp in zip(to_fetch, pool.map(_confirm, to_fetch)):
+                entry.opportunity = opp
+                if opp:
+                    logger.info("  🎯 [%s] %.50s... | Spread: %.2f%% | +$%.4f",
+                                opp.arb_type, opp.market_question,
+                                opp.expected_profit_pct * 100, opp.expected_profit_usdc,
+                                extra=SAMPLED)
+
+        evicted = self.evict(now)
+        found = [self.markets[mid].opportunity for mid in live_ids
+                 if self.markets[mid].opportunity]
+        if EVENT_ARBS:
+            found.extend(self._check_events(touched_events, trade_size))
+        metrics.observe("scan_total_seconds", time.perf_counter() - scan_start,
+                        mode="incremental")
+        logger.info(f"✅ Scan selesai: {len(found)} peluang | "
+                    f"{len(changed)} berubah / {len(live_ids)} pasaran | "
+                    f"{len(to_fetch)} detail | {evicted} dibuang dari cache")
+        return found
+
+    def _check_events(self, touched: Set[str],
+                      trade_size: float) -> List[ArbitrageOpportunity]:
+        """Semak semula event yang jumlah YES-nya berubah; selebihnya dari cache."""
+        if trade_size != self._event_trade_size:
+            touched = set(self.events.events)
+            self._event_trade_size = trade_size
+        for event_id in touched:
+            group = self.events.events.get(event_id)
+            self.event_opps[event_id] = group and self.events.check(group, trade_size)
+        return [opp for opp in self.event_opps.values() if opp]
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Buang entri yang tidak dilihat dalam tempoh TTL."""
+        now = now or time.time()
+        stale = [mid for mid, e in self.markets.items()
+                 if now - e.seen_at > self.ttl]
+        for mid in stale:
+            del self.markets[mid]
+            event_id = self._event_of(mid)
+            self.events.remove_market(mid)
+            group = self.events.events.get(event_id) if event_id else None
+            if group is not None:
+                self.event_opps[event_id] = self.events.check(
+                    group, self._event_trade_size or 0.0)
+            elif event_id:
+                self.event_opps.pop(event_id, None)
+        return len(stale)
+
+    def _event_of(self, market_id: str) -> Optional[str]:
+        token_id = self.events.market_token.get(market_id)
+        group    = self.events.token_event.get(token_id) if token_id else None
+        return group.event_id if group else None
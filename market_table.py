@@ -0,0 +1,389 @@
+# ============================================================
+#  market_table.py — JADUAL PASARAN PADAT (STRUCT-OF-ARRAYS)
+#  Senarai /markets disimpan sebagai array bersebelahan: token id
+#  (32 bait), harga integer mikro-USDC, offset pasaran & event.
+#  Dict JSON mentah dibuang sebaik setiap halaman dimuat.
+# ============================================================
+
+import logging
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from config import MIN_PROFIT_THRESHOLD, SCAN_CONCURRENCY, VECTOR_EVAL
+from scanner import (
+    SCALE, ArbitrageOpportunity, Outcome, fetch_market_pages, is_fee_market,
+    listing_tokens, negrisk_event_id, negrisk_event_size, to_ticks
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Tick = harga dalam mikro-USDC (scanner.SCALE) — jumlah integer tepat
+PRICE_MIN = 10_000           # 0.01 — sama dengan penapis evaluate_tokens
+PRICE_MAX = 990_000          # 0.99
+TOKEN_BYTES = 32             # token id CLOB = integer 256-bit
+NO_TOKEN    = bytes(TOKEN_BYTES)
+
+
+class StringColumn:
+    """Rentetan UTF-8 bersambung dalam satu bytearray + offset (tiada objek str setiap baris)."""
+
+    __slots__ = ("data", "ends")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array("I")
+
+    def append(self, value: str):
+        self.data += value.encode()
+        self.ends.append(len(self.data))
+
+    def __getitem__(self, i: int) -> str:
+        start = self.ends[i - 1] if i else 0
+        return self.data[start:self.ends[i]].decode()
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+
+class MarketTable:
+    """
+    Universe pasaran dalam bentuk lajur:
+      market_starts[m]  → indeks token pertama pasaran m (+ satu penanda akhir)
+      market_event[m]   → indeks event pasaran m
+      ticks[t]          → harga token t (mikro-USDC, int32)
+      token_ids         → token t di bait [32t, 32t+32)
+      priced[m]         → 0 jika senarai tiada harga (perlu ambil /markets/{id})
+    Objek Outcome/ArbitrageOpportunity (__slots__) hanya dibina untuk
+    pasaran yang lepas threshold.
+
+    Mod stream: update() ubah satu tick di tempat (O(1)) dan evaluate(markets=...)
+    nilai semula pasaran yang tersentuh sahaja — tiada dict token setiap pasaran.
+    """
+
+    def __init__(self):
+        self.market_ids    = StringColumn()
+        self.questions     = StringColumn()
+        self.labels        = StringColumn()      # groupItemTitle (nama dalam event)
+        self.market_starts = array("I", [0])
+        self.market_event  = array("I")
+        self.priced        = bytearray()
+        self.ticks         = array("i")
+        self.token_ids     = bytearray()
+        self.name_ix       = array("H")
+        self.names:        List[str] = []        # "Yes", "No", ... (dikongsi)
+        self.event_ids:    List[str] = []
+        self.event_titles: List[str] = []
+        self.event_sizes  = array("I")           # ahli event menurut Gamma (0 = tidak diketahui)
+        self._name_pos:  Dict[str, int] = {}
+        self._event_pos: Dict[str, int] = {}
+        self._token_pos: Optional[Dict[str, int]] = None   # token id → t (dibina bila perlu)
+
+    @classmethod
+    def from_markets(cls, markets: Iterable[dict]) -> "MarketTable":
+        table = cls()
+        table.extend(markets)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.market_event)
+
+    # ─── MUAT ──────────────────────────────────────────────
+
+    def extend(self, markets: Iterable[dict]):
+        for m in markets:
+            self.append(m)
+
+    def append(self, market: dict):
+        mid = market.get("id")
+        if not mid:
+            return
+        tokens = listing_tokens(market)
+        packed = [_pack_token(t.get("token_id", "")) for t in tokens or []]
+        if None in packed:
+            # Token id rosak tidak boleh diorder — langkau seluruh pasaran
+            logger.warning(f"⚠️  Pasaran {mid} dilangkau: token id bukan integer 256-bit")
+            return
+        self.market_ids.append(str(mid))
+        self.questions.append(market.get("question", ""))
+        self.labels.append(market.get("groupItemTitle") or "")
+        self.priced.append(tokens is not None)
+
+        event_id = negrisk_event_id(market)
+        e = self._event_pos.get(event_id)
+        if e is None:
+            e = self._event_pos[event_id] = len(self.event_ids)
+            events = market.get("events") or [{}]
+            self.event_ids.append(event_id)
+            self.event_titles.append(events[0].get("title") or market.get("question", ""))
+            self.event_sizes.append(0)
+        self.event_sizes[e] = negrisk_event_size(market) or self.event_sizes[e]
+        self.market_event.append(e)
+
+        for t, token in zip(tokens or [], packed):
+            name = t.get("outcome", "?")
+            n = self._name_pos.get(name)
+            if n is None:
+                n = self._name_pos[name] = len(self.names)
+                self.names.append(name)
+            self.name_ix.append(n)
+            self.ticks.append(to_ticks(t.get("price")))
+            self.token_ids += token
+        self.market_starts.append(len(self.ticks))
+        self._token_pos = None
+
+    @property
+    def nbytes(self) -> int:
+        """Saiz lajur (anggaran, tidak termasuk senarai nama/event)."""
+        return (len(self.market_ids.data) + len(self.questions.data) + len(self.labels.data)
+                + len(self.token_ids) + len(self.priced)
+                + sum(a.itemsize * len(a) for a in (
+                    self.market_ids.ends, self.questions.ends, self.labels.ends,
+                    self.market_starts, self.market_event, self.ticks, self.name_ix)))
+
+    # ─── AKSES ─────────────────────────────────────────────
+
+    def token_id(self, t: int) -> str:
+        return _unpack_token(self.token_ids, t)
+
+    def has_token(self, t: int) -> bool:
+        return self.token_ids[t * TOKEN_BYTES:(t + 1) * TOKEN_BYTES] != NO_TOKEN
+
+    def token_range(self, m: int) -> range:
+        return range(self.market_starts[m], self.market_starts[m + 1])
+
+    def market_of(self, t: int) -> int:
+        """Pasaran yang memiliki token t (carian binari pada market_starts)."""
+        return bisect_right(self.market_starts, t) - 1
+
+    def token_index(self) -> Dict[str, int]:
+        """token id → indeks token. Dibina sekali (laluan tick stream sahaja)."""
+        if self._token_pos is None:
+            self._token_pos = {self.token_id(t): t for t in range(len(self.ticks))
+                               if self.has_token(t)}
+        return self._token_pos
+
+    # ─── KEMAS KINI ────────────────────────────────────────
+
+    def update(self, token_id: str, price: float) -> Optional[int]:
+        """Ubah harga satu token di tempat — O(1). Pulangkan pasaran jika tick berubah."""
+        t = self.token_index().get(token_id)
+        if t is None:
+            return None
+        tick = to_ticks(price)
+        if self.ticks[t] == tick:
+            return None
+        self.ticks[t] = tick
+        return self.market_of(t)
+
+    def rows(self) -> Iterator[dict]:
+        """Dict minimum setiap pasaran (format listing_tokens) — untuk pita & pekerja shard."""
+        for m in range(len(self)):
+            e   = self.market_event[m]
+            row = {"id": self.market_ids[m], "question": self.questions[m],
+                   "negRiskMarketID": self.event_ids[e],
+                   "negRiskEventSize": self.event_sizes[e]}
+            if self.priced[m]:
+                row["tokens"] = [{"outcome": self.names[self.name_ix[t]],
+                                  "token_id": self.token_id(t),
+                                  "price": self.ticks[t] / SCALE}
+                                 for t in self.token_range(m)]
+            yield row
+
+    def unpriced(self) -> List[int]:
+        return [m for m in range(len(self)) if not self.priced[m]]
+
+    # ─── PENILAIAN ─────────────────────────────────────────
+
+    def market_sums(self, start: int = 0):
+        """Σ tick token sah (0.01 < p < 0.99) & bilangannya bagi pasaran start.. akhir.
+        Array numpy bila VECTOR_EVAL (penimbal dibaca tanpa salinan), jika tidak senarai."""
+        if VECTOR_EVAL and NUMPY_AVAILABLE:
+            # Jumlah segmen = beza jumlah kumulatif (pasaran tanpa token pun betul)
+            ticks  = np.frombuffer(self.ticks, dtype=np.int32) if self.ticks \
+                else np.zeros(0, dtype=np.int32)
+            starts = np.frombuffer(self.market_starts, dtype=np.uint32)[start:].astype(np.intp)
+            valid  = (ticks > PRICE_MIN) & (ticks < PRICE_MAX)
+            sums   = np.concatenate(([0], np.cumsum(np.where(valid, ticks, 0), dtype=np.int64)))
+            counts = np.concatenate(([0], np.cumsum(valid, dtype=np.int64)))
+            return (sums[starts[1:]] - sums[starts[:-1]],
+                    counts[starts[1:]] - counts[starts[:-1]])
+
+        sums, counts = [], []
+        for m in range(start, len(self)):
+            total, count = self._market_sum(m)
+            sums.append(total)
+            counts.append(count)
+        return sums, counts
+
+    def _market_sum(self, m: int) -> Tuple[int, int]:
+        total = count = 0
+        for t in self.token_range(m):
+            p = self.ticks[t]
+            if PRICE_MIN < p < PRICE_MAX:
+                total += p
+                count += 1
+        return total, count
+
+    def _market_hits(self, limit: int, start: int,
+                     markets: Optional[Iterable[int]]) -> Iterator[Tuple[int, int, str]]:
+        """(pasaran, jumlah tick, jenis) bagi setiap pasaran yang lepas threshold."""
+        if markets is None and VECTOR_EVAL and NUMPY_AVAILABLE:
+            # Topeng LONG/SHORT sekali jalan; objek hanya dibina untuk indeks yang lepas
+            sums, counts = self.market_sums(start)
+            ok    = counts >= 2
+            long  = ok & (sums < SCALE) & (SCALE - sums >= limit)
+            short = ok & (sums > SCALE) & (sums - SCALE >= limit)
+            hits = np.flatnonzero(long | short)
+            for i, total, is_long in zip(hits.tolist(), sums[hits].tolist(), long[hits].tolist()):
+                yield start + i, total, "LONG" if is_long else "SHORT"
+            return
+
+        # Subset kecil (pasaran tersentuh satu tick) atau tanpa numpy
+        for m in (range(start, len(self)) if markets is None else markets):
+            total, count = self._market_sum(m)
+            if count < 2:
+                continue
+            if total < SCALE and SCALE - total >= limit:
+                yield m, total, "LONG"
+            elif total > SCALE and total - SCALE >= limit:
+                yield m, total, "SHORT"
+
+    def evaluate(self, trade_size: float, threshold: float = MIN_PROFIT_THRESHOLD,
+                 start: int = 0,
+                 markets: Optional[Iterable[int]] = None) -> List[ArbitrageOpportunity]:
+        """Peluang LONG/SHORT setiap pasaran (dari indeks `start`, atau hanya `markets`)
+        — perbandingan integer sahaja."""
+        found = []
+        for m, total, arb_type in self._market_hits(to_ticks(threshold), start, markets):
+            outcomes = [self._outcome(t, self.names[self.name_ix[t]])
+                        for t in self.token_range(m)
+                        if PRICE_MIN < self.ticks[t] < PRICE_MAX]
+            found.append(_opportunity(self.market_ids[m], self.questions[m], arb_type,
+                                      outcomes, total, trade_size,
+                                      self.event_ids[self.market_event[m]]))
+        return found
+
+    def _event_hits(self, limit: int) -> Iterator[Tuple[int, int, str, List[int]]]:
+        """
+        (event, Σ tick YES, jenis, pasaran ahli) bagi setiap event lengkap yang
+        lepas threshold. YES = token pertama setiap pasaran yang ada token id.
+        """
+        n_events = len(self.event_ids)
+        if VECTOR_EVAL and NUMPY_AVAILABLE and self.ticks:
+            ticks  = np.frombuffer(self.ticks, dtype=np.int32)
+            starts = np.frombuffer(self.market_starts, dtype=np.uint32).astype(np.intp)
+            events = np.frombuffer(self.market_event, dtype=np.uint32).astype(np.intp)
+            first  = starts[:-1]
+            member = starts[1:] > first
+            tokens = np.frombuffer(self.token_ids, dtype=np.uint8).reshape(-1, TOKEN_BYTES)
+            member[member] = tokens[first[member]].any(axis=1)
+            yes    = ticks[first[member]].astype(np.int64)
+            ev     = events[member]
+            # Pengurangan segmen ikut event (bincount) — jumlah integer tepat
+            totals   = np.zeros(n_events, dtype=np.int64)
+            np.add.at(totals, ev, yes)
+            counts   = np.bincount(ev, minlength=n_events)
+            unpriced = np.bincount(ev[yes == 0], minlength=n_events) > 0
+            sizes    = np.frombuffer(self.event_sizes, dtype=np.uint32).astype(np.int64)
+            ok    = (sizes > 0) & ~unpriced & (counts >= np.maximum(2, sizes))
+            long  = ok & (totals < SCALE) & (SCALE - totals >= limit)
+            short = ok & (totals > SCALE) & (totals - SCALE >= limit)
+            hits  = np.flatnonzero(long | short)
+            if len(hits):
+                owners = np.flatnonzero(member)
+                for e, total, is_long in zip(hits.tolist(), totals[hits].tolist(),
+                                             long[hits].tolist()):
+                    yield e, total, "LONG" if is_long else "SHORT", owners[ev == e].tolist()
+            return
+
+        totals = [0] * n_events
+        members: List[List[int]] = [[] for _ in range(n_events)]
+        unpriced = bytearray(n_events)
+        for m in range(len(self)):
+            start = self.market_starts[m]
+            if start == self.market_starts[m + 1] or not self.has_token(start):
+                continue
+            e = self.market_event[m]
+            members[e].append(m)
+            totals[e] += self.ticks[start]
+            unpriced[e] |= self.ticks[start] == 0
+        for e, total in enumerate(totals):
+            if (not self.event_sizes[e] or unpriced[e]
+                    or len(members[e]) < max(2, self.event_sizes[e])):
+                continue
+            if total < SCALE and SCALE - total >= limit:
+                yield e, total, "LONG", members[e]
+            elif total > SCALE and total - SCALE >= limit:
+                yield e, total, "SHORT", members[e]
+
+    def evaluate_events(self, trade_size: float,
+                        threshold: float = MIN_PROFIT_THRESHOLD) -> List[ArbitrageOpportunity]:
+        """Arbitrage event NegRisk: Σ harga YES (token pertama) semua pasaran event.
+        Event yang ahlinya tidak lengkap dalam jadual dilangkau."""
+        found = []
+        for e, total, arb_type, members in self._event_hits(to_ticks(threshold)):
+            outcomes = [self._outcome(self.market_starts[m],
+                                      self.labels[m] or self.questions[m])
+                        for m in members]
+            found.append(_opportunity(self.event_ids[e], self.event_titles[e], arb_type,
+                                      outcomes, total, trade_size, self.event_ids[e]))
+        return found
+
+    def _outcome(self, t: int, name: str) -> Outcome:
+        tick = self.ticks[t]
+        return Outcome(name=name, token_id=self.token_id(t),
+                       yes_price=tick / SCALE, no_price=(SCALE - tick) / SCALE)
+
+
+def _pack_token(token_id: str) -> Optional[bytes]:
+    """Token id → 32 bait (kosong = NO_TOKEN); None jika bukan integer 256-bit."""
+    try:
+        return int(token_id or 0).to_bytes(TOKEN_BYTES, "big")
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def _unpack_token(data: bytearray, t: int) -> str:
+    value = int.from_bytes(data[t * TOKEN_BYTES:(t + 1) * TOKEN_BYTES], "big")
+    return str(value) if value else ""
+
+
+def _opportunity(market_id: str, question: str, arb_type: str, outcomes: List[Outcome],
+                 total: int, trade_size: float, event_id: str) -> ArbitrageOpportunity:
+    net_profit = (SCALE - total if arb_type == "LONG" else total - SCALE) / SCALE
+    return ArbitrageOpportunity(
+        market_id=market_id,
+        market_question=question,
+        arb_type=arb_type,
+        outcomes=outcomes,
+        total_yes_sum=total / SCALE,
+        expected_profit_pct=net_profit,
+        expected_profit_usdc=net_profit * trade_size,
+        trade_size=trade_size,
+        event_id=event_id
+    )
+
+
+def fetch_market_table(concurrency: int = SCAN_CONCURRENCY,
+                       start: int = 0, stride: int = 1) -> MarketTable:
+    """Seperti fetch_negrisk_markets, tetapi setiap halaman terus dimuat ke jadual
+    (start/stride = hanya halaman milik satu pekerja shard)."""
+    logger.info("📡 Mengambil pasaran NegRisk dari Gamma API...")
+    table = MarketTable()
+    seen  = 0
+
+    def _load(page: List[dict]):
+        nonlocal seen
+        seen += len(page)
+        table.extend(m for m in page if not is_fee_market(m.get("question", "")))
+
+    fetch_market_pages(concurrency, on_page=_load, start=start, stride=stride)
+    logger.info(f"✅ {len(table)} pasaran fee-free dijumpai (dari {seen} jumlah) | "
+                f"jadual {table.nbytes / 1e6:.1f}MB")
+    return table
@@ -0,0 +1,190 @@
+# ============================================================
+#  metrics.py — METRIK LATENCY SETIAP PERINGKAT + EKSPORT
+#  Histogram & kaunter dalam memori; dieksport sebagai teks
+#  Prometheus melalui HTTP tempatan dan/atau fail berkala
+# ============================================================
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from config import METRICS_PORT, METRICS_FILE, METRICS_FILE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Sempadan bucket (saat) — dari 1ms hingga 30s
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+           0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "http_request_seconds":   "Masa request HTTP setiap endpoint",
+    "http_requests_total":    "Bilangan request HTTP setiap endpoint",
+    "http_errors_total":      "Bilangan ralat HTTP (sambungan / status >= 400)",
+    "http_retries_total":     "Bilangan cubaan semula HTTP",
+    "scan_fetch_seconds":     "Masa ambil senarai pasaran",
+    "scan_evaluate_seconds":  "Masa nilai arbitrage",
+    "scan_total_seconds":     "Masa satu scan penuh",
+    "risk_check_seconds":     "Masa semakan RiskManager.reserve",
+    "order_sign_seconds":     "Masa tandatangan satu order",
+    "order_post_seconds":     "Masa hantar order (satu kaki atau satu batch)",
+    "detection_to_fill_seconds": "Masa dari peluang dikesan hingga semua kaki diisi",
+    "ratelimit_wait_seconds": "Masa menunggu bajet had kadar (setiap endpoint & lorong)",
+    "ratelimit_throttled_total": "Bilangan respons 429 setiap bajet",
+    "ratelimit_rejected_total": "Request dibatalkan — bajet tidak tersedia dalam masa",
+    "ledger_flush_seconds":   "Masa satu transaksi tulis lejar SQLite",
+    "ledger_rows_total":      "Bilangan baris ditulis ke lejar",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total  = 0.0
+        self.count  = 0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(BUCKETS) and value > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters:   Dict[Tuple[str, Labels], float]     = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def render(self) -> str:
+        """Format teks Prometheus (exposition format 0.0.4)."""
+        lines, seen = [], set()
+
+        def _header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        def _labels(labels: Labels, extra: str = "") -> str:
+            parts = [f'{k}="{v}"' for k, v in labels]
+            if extra:
+                parts.append(extra)
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                _header(name, "counter")
+                lines.append(f"{name}{_labels(labels)} {value}")
+            for (name, labels), hist in sorted(self.histograms.items()):
+                _header(name, "histogram")
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    cumulative += n
+                    le = _labels(labels, 'le="%s"' % bound)
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                le = _labels(labels, 'le="+Inf"')
+                lines.append(f"{name}_bucket{le} {hist.count}")
+                lines.append(f"{name}_sum{_labels(labels)} {hist.total:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def observe(name: str, value: float, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+def inc(name: str, amount: float = 1, **labels):
+    REGISTRY.inc(name, amount, **labels)
+
+
+@contextmanager
+def timer(name: str, **labels):
+    """with timer("scan_fetch_seconds"): ... — rekod masa blok ke histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - start, **labels)
+
+
+# ─── EKSPORT ───────────────────────────────────────────────
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port: int = METRICS_PORT) -> ThreadingHTTPServer:
+    """Endpoint /metrics pada 127.0.0.1:port (thread latar belakang)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http",
+                     daemon=True).start()
+    logger.info(f"📈 Metrik: http://127.0.0.1:{port}/metrics")
+    return server
+
+
+def start_file_writer(path: str = METRICS_FILE,
+                      interval: float = METRICS_FILE_INTERVAL) -> threading.Thread:
+    """Tulis metrik ke fail setiap `interval` saat (tulis-ganti secara atomik)."""
+    def _loop():
+        while True:
+            time.sleep(interval)
+            tmp = f"{path}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(REGISTRY.render())
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.warning(f"Gagal tulis metrik: {e}")
+
+    thread = threading.Thread(target=_loop, name="metrics-file", daemon=True)
+    thread.start()
+    logger.info(f"📈 Metrik ditulis ke {path} setiap {interval:.0f}s")
+    return thread
+
+
+def start_exporters():
+    """Mulakan eksport yang diaktifkan dalam config.py."""
+    if METRICS_PORT:
+        try:
+            start_http_server(METRICS_PORT)
+        except OSError as e:
+            logger.warning(f"⚠️  Gagal buka port metrik {METRICS_PORT}: {e}")
+    if METRICS_FILE:
+        start_file_writer(METRICS_FILE, METRICS_FILE_INTERVAL)
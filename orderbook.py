@@ -0,0 +1,208 @@
+# ============================================================
+#  orderbook.py — CERMIN ORDER BOOK L2 + SEMAKAN KEDALAMAN
+#  Kira VWAP sebenar setiap kaki pada saiz trade sebelum hantar FOK
+# ============================================================
+
+import time
+import logging
+import http_client
+import metrics
+from dataclasses import replace
+from typing import Dict, Iterable, List, Optional, Tuple
+from rate_limit import high_priority
+from config import POLYMARKET_HOST, MIN_PROFIT_THRESHOLD, REQUOTE_TIMEOUT_SECONDS
+from scanner import ArbitrageOpportunity, Outcome
+
+logger = logging.getLogger(__name__)
+
+
+class OrderBook:
+    """Order book L2 satu token: {harga: saiz} bagi setiap sisi."""
+
+    __slots__ = ("token_id", "bids", "asks")
+
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+
+    def apply_snapshot(self, bids: Iterable[dict], asks: Iterable[dict]):
+        self.bids = {float(b["price"]): float(b["size"]) for b in bids}
+        self.asks = {float(a["price"]): float(a["size"]) for a in asks}
+
+    def apply_delta(self, side: str, price: float, size: float):
+        """side BUY = bid, SELL = ask. size 0 = paras dibuang."""
+        levels = self.bids if side.upper() == "BUY" else self.asks
+        if size <= 0:
+            levels.pop(price, None)
+        else:
+            levels[price] = size
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return max(self.bids) if self.bids else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return min(self.asks) if self.asks else None
+
+    def sweep_buy(self, usdc: float) -> Optional[Tuple[float, float]]:
+        """BELI bernilai `usdc` (FOK) → (VWAP, harga paras terburuk). None = kedalaman tak cukup."""
+        remaining, shares = usdc, 0.0
+        for price in sorted(self.asks):
+            cost = price * self.asks[price]
+            if cost >= remaining:
+                shares += remaining / price
+                return usdc / shares, price
+            remaining -= cost
+            shares    += self.asks[price]
+        return None
+
+    def sweep_sell(self, shares: float) -> Optional[Tuple[float, float]]:
+        """JUAL `shares` saham (FOK) → (VWAP, harga paras terburuk). None = kedalaman tak cukup."""
+        remaining, proceeds = shares, 0.0
+        for price in sorted(self.bids, reverse=True):
+            size = self.bids[price]
+            if size >= remaining:
+                proceeds += remaining * price
+                return proceeds / shares, price
+            remaining -= size
+            proceeds  += size * price
+        return None
+
+    def vwap_buy(self, usdc: float) -> Optional[float]:
+        """Harga purata untuk BELI bernilai `usdc` (FOK). None = kedalaman tak cukup."""
+        sweep = self.sweep_buy(usdc)
+        return sweep and sweep[0]
+
+    def vwap_sell(self, shares: float) -> Optional[float]:
+        """Harga purata untuk JUAL `shares` saham (FOK). None = kedalaman tak cukup."""
+        sweep = self.sweep_sell(shares)
+        return sweep and sweep[0]
+
+
+class BookStore:
+    """Semua order book yang dicermin, dikemas kini dari snapshot + delta."""
+
+    def __init__(self):
+        self.books: Dict[str, OrderBook] = {}
+
+    def get(self, token_id: str) -> Optional[OrderBook]:
+        return self.books.get(token_id)
+
+    def _book(self, token_id: str) -> OrderBook:
+        book = self.books.get(token_id)
+        if book is None:
+            book = self.books[token_id] = OrderBook(token_id)
+        return book
+
+    def apply_snapshot(self, token_id: str, bids: Iterable[dict], asks: Iterable[dict]):
+        self._book(token_id).apply_snapshot(bids, asks)
+
+    def apply_delta(self, token_id: str, side: str, price: float, size: float):
+        self._book(token_id).apply_delta(side, price, size)
+
+    def fetch(self, token_ids: List[str], timeout=None, retry: bool = True):
+        """Ambil snapshot untuk banyak token dalam SATU request CLOB /books."""
+        if not token_ids:
+            return
+        # /books hanya membaca — selamat dicuba semula
+        r = http_client.post(f"{POLYMARKET_HOST}/books",
+                             json=[{"token_id": t} for t in token_ids],
+                             retry=retry, timeout=timeout)
+        r.raise_for_status()
+        for b in r.json() or []:
+            self.apply_snapshot(b.get("asset_id", ""), b.get("bids", []), b.get("asks", []))
+
+
+def evaluate_depth(opp: ArbitrageOpportunity,
+                   books: BookStore) -> Optional[ArbitrageOpportunity]:
+    """
+    Nilai semula peluang guna VWAP order book pada saiz yang executor akan hantar
+    (LONG: beli trade_size/n USDC setiap kaki, SHORT: jual trade_size/n saham).
+    Pulangkan peluang dengan harga VWAP (untuk semakan profit) dan limit_price =
+    paras terburuk yang perlu disapu (had order FOK), atau None jika tak cukup
+    kedalaman / spread.
+    """
+    amount_each = opp.trade_size / len(opp.outcomes)
+    outcomes = []
+    for o in opp.outcomes:
+        book = books.get(o.token_id)
+        if book is None:
+            return None
+        if opp.arb_type == "LONG":
+            sweep = book.sweep_buy(amount_each)
+        else:
+            sweep = book.sweep_sell(amount_each)
+        if sweep is None:
+            logger.debug("Kedalaman tak cukup: %s (%s)", o.name, opp.market_id)
+            return None
+        price, worst = sweep
+        outcomes.append(Outcome(name=o.name, token_id=o.token_id,
+                                yes_price=round(price, 6),
+                                no_price=round(1.0 - price, 6),
+                                limit_price=worst))
+
+    total = sum(o.yes_price for o in outcomes)
+    net_profit = (1.0 - total) if opp.arb_type == "LONG" else (total - 1.0)
+    if net_profit < MIN_PROFIT_THRESHOLD:
+        return None
+
+    return replace(opp, outcomes=outcomes,
+                   total_yes_sum=round(total, 6),
+                   expected_profit_pct=net_profit,
+                   expected_profit_usdc=net_profit * opp.trade_size)
+
+
+def confirm_with_depth(opps: List[ArbitrageOpportunity],
+                       books: Optional[BookStore] = None) -> List[ArbitrageOpportunity]:
+    """Ambil book semua kaki calon (satu request) dan buang peluang palsu."""
+    if not opps:
+        return opps
+    books = books or BookStore()
+    try:
+        books.fetch(list({o.token_id for opp in opps for o in opp.outcomes}))
+    except Exception as e:
+        logger.warning(f"⚠️  Gagal ambil order book: {e}")
+        return []
+
+    confirmed = [c for c in (evaluate_depth(opp, books) for opp in opps) if c]
+    logger.info(f"  📚 Semakan kedalaman: {len(confirmed)}/{len(opps)} peluang boleh diisi")
+    return confirmed
+
+
+def requote(opp: ArbitrageOpportunity,
+            timeout: float = REQUOTE_TIMEOUT_SECONDS) -> Optional[ArbitrageOpportunity]:
+    """
+    Sebut harga semula semua kaki sejurus sebelum order: satu request /books
+    tanpa cuba semula, had masa `timeout`. Pulangkan peluang dengan harga
+    VWAP terkini, atau None jika spread hilang / request lewat atau gagal
+    (lebih murah daripada order FOK yang pasti gagal).
+    """
+    start = time.perf_counter()
+    books = BookStore()
+    try:
+        # Lorong HIGH: didahulukan berbanding scan; menunggu bajet juga dalam `timeout`
+        with high_priority():
+            books.fetch(list({o.token_id for o in opp.outcomes}),
+                        timeout=timeout, retry=False)
+    except Exception as e:
+        metrics.inc("requote_total", result="error")
+        logger.warning(f"⚠️  Sebut harga semula gagal: {e}")
+        return None
+
+    elapsed = time.perf_counter() - start
+    metrics.observe("requote_seconds", elapsed)
+    if elapsed > timeout:
+        metrics.inc("requote_total", result="late")
+        logger.info(f"  🔁 Sebut harga semula lewat ({elapsed*1000:.0f}ms) — dilangkau")
+        return None
+
+    fresh = evaluate_depth(opp, books)
+    metrics.inc("requote_total", result="ok" if fresh else "rejected")
+    if fresh is None:
+        logger.info(f"  🔁 Spread hilang selepas sebut harga semula — order tidak dihantar")
+    else:
+        logger.info(f"  🔁 Sebut harga semula: {opp.expected_profit_pct*100:.2f}% → "
+                    f"{fresh.expected_profit_pct*100:.2f}% ({elapsed*1000:.0f}ms)")
+    return fresh
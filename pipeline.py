@@ -0,0 +1,97 @@
+# ============================================================
+#  pipeline.py — BARIS GILIR PELUANG (KEUTAMAAN PROFIT + TARIKH LUPUT)
+#  Scanner tolak peluang sebaik dijumpai; tugasan pelaksana ambil
+#  yang paling untung dulu dan buang yang sudah lapuk
+# ============================================================
+
+import time
+import heapq
+import logging
+import threading
+import metrics
+from dataclasses import replace
+from log_setup import SAMPLED
+from typing import Dict, List, Optional, Tuple
+from config import OPPORTUNITY_TTL_SECONDS
+from scanner import ArbitrageOpportunity
+
+logger = logging.getLogger(__name__)
+
+
+def is_expired(opp: ArbitrageOpportunity, now: Optional[float] = None) -> bool:
+    return bool(opp.expires_at) and (now or time.time()) > opp.expires_at
+
+
+class OpportunityQueue:
+    """
+    Heap ikut expected_profit_pct (terbesar dulu), selamat untuk banyak thread.
+
+    put() simpan SALINAN dengan published_at = masa put dan expires_at =
+    published_at + ttl (jika belum ada) — objek peluang yang dicache
+    (IncrementalScanner) diterbitkan semula setiap scan dengan detected_at
+    scan pertama. detected_at kekal sebagai identiti (kunci lejar); masa
+    menunggu & latency diukur dari published_at.
+    Peluang baru bagi pasaran yang masih menunggu menggantikan yang lama
+    (harga lebih segar). get() buang entri lapuk/diganti tanpa memulangkannya.
+    """
+
+    def __init__(self, ttl: float = OPPORTUNITY_TTL_SECONDS):
+        self.ttl      = ttl
+        self.expired  = 0
+        self._heap: List[Tuple[float, int, ArbitrageOpportunity]] = []
+        self._latest: Dict[str, int] = {}        # market id → seq entri terkini
+        self._seq     = 0
+        self._closed  = False
+        self._cond    = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, opp: ArbitrageOpportunity):
+        now = time.time()
+        opp = replace(opp, published_at=now, expires_at=opp.expires_at or now + self.ttl)
+        with self._cond:
+            if self._closed:
+                return
+            self._seq += 1
+            self._latest[opp.market_id] = self._seq
+            heapq.heappush(self._heap, (-opp.expected_profit_pct, self._seq, opp))
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[ArbitrageOpportunity]:
+        """Peluang terbaik yang belum luput. None = tamat masa atau baris gilir ditutup."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, seq, opp = heapq.heappop(self._heap)
+                    if self._latest.get(opp.market_id) != seq:
+                        continue                            # diganti peluang lebih baru
+                    del self._latest[opp.market_id]
+                    if is_expired(opp):
+                        self.expired += 1
+                        metrics.inc("opportunities_expired_total")
+                        logger.info("  ⌛ Luput sebelum dilaksana: %.50s",
+                                    opp.market_question, extra=SAMPLED)
+                        continue
+                    metrics.observe("queue_wait_seconds", time.time() - opp.published_at)
+                    return opp
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def close(self):
+        """Tutup baris gilir — peluang yang masih menunggu dibuang (tiada trade baru)."""
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._latest.clear()
+            self._cond.notify_all()
+
@@ -0,0 +1,166 @@
+# ============================================================
+#  rate_limit.py — PENJADUAL HAD KADAR BERSAMA (TOKEN BUCKET)
+#  Satu baldi setiap endpoint API; lorong HIGH (order, sebut
+#  harga semula) didahulukan, scan (LOW) guna baki bajet.
+#  HTTP 429 / Retry-After → baldi ditahan & kadar diperlahankan.
+# ============================================================
+
+import time
+import logging
+import threading
+import contextvars
+import metrics
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from config import RATE_LIMITS, RATE_HIGH_RESERVE
+
+logger = logging.getLogger(__name__)
+
+# Lorong keutamaan
+HIGH = 0
+LOW  = 1
+
+RECOVER_STEP = 0.05      # Pemulihan kadar selepas setiap respons OK (pecahan kadar asal)
+MIN_RATE     = 0.1       # Kadar tidak turun bawah 10% kadar asal
+
+_lane: contextvars.ContextVar = contextvars.ContextVar("rate_lane", default=LOW)
+
+
+class RateLimited(Exception):
+    """Bajet tidak tersedia dalam masa yang dibenarkan."""
+
+
+@contextmanager
+def high_priority():
+    """Semua request dalam blok ini (thread / tugasan semasa) guna lorong HIGH."""
+    token = _lane.set(HIGH)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class Bucket:
+    __slots__ = ("name", "base_rate", "rate", "burst", "tokens", "updated",
+                 "blocked_until", "high_waiting")
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name          = name
+        self.base_rate     = rate
+        self.rate          = rate
+        self.burst         = max(1.0, burst)
+        self.tokens        = self.burst
+        self.updated       = time.monotonic()
+        self.blocked_until = 0.0
+        self.high_waiting  = 0
+
+    def refill(self, now: float):
+        self.tokens  = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    Token bucket setiap endpoint (segmen laluan pertama: /markets, /books, /order...).
+
+    HIGH boleh guna baldi hingga kosong; LOW hanya bila baki melebihi
+    `high_reserve` × letusan DAN tiada request HIGH sedang menunggu —
+    jadi scan pukal tidak pernah menghabiskan bajet yang diperlukan order.
+    Respons 429 tahan baldi hingga Retry-After tamat dan separuhkan kadar;
+    setiap respons OK memulihkan kadar sedikit demi sedikit (AIMD).
+    """
+
+    def __init__(self, limits: Dict[str, tuple] = RATE_LIMITS,
+                 high_reserve: float = RATE_HIGH_RESERVE):
+        self.high_reserve = high_reserve
+        self.limits       = dict(limits)
+        self.buckets: Dict[str, Bucket] = {
+            path: Bucket(path, rate, burst) for path, (rate, burst) in limits.items()}
+        self._cond = threading.Condition()
+
+    def share(self, fraction: float):
+        """Proses ini satu daripada beberapa pengguna bajet API yang sama
+        (cth. pekerja shard) — guna pecahan kadar & letusan sahaja."""
+        with self._cond:
+            for path, (rate, burst) in self.limits.items():
+                bucket = self.buckets[path]
+                bucket.base_rate = rate * fraction
+                bucket.rate      = min(bucket.rate, bucket.base_rate)
+                bucket.burst     = max(1.0, burst * fraction)
+                bucket.tokens    = min(bucket.tokens, bucket.burst)
+
+    def bucket_for(self, url: str) -> Optional[Bucket]:
+        """Baldi bagi URL (None = tiada had, cth. Telegram)."""
+        path = urlsplit(url).path
+        return self.buckets.get("/" + path.split("/")[1] if path else "/")
+
+    def acquire(self, bucket: Bucket, lane: Optional[int] = None,
+                timeout: Optional[float] = None) -> float:
+        """Ambil satu token (menyekat). Pulangkan masa menunggu; RateLimited jika tamat masa."""
+        lane     = _lane.get() if lane is None else lane
+        start    = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        floor    = 0.0 if lane == HIGH else self.high_reserve * bucket.burst
+        with self._cond:
+            if lane == HIGH:
+                bucket.high_waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    blocked = bucket.blocked_until - now
+                    if (blocked <= 0 and bucket.tokens >= floor + 1
+                            and (lane == HIGH or not bucket.high_waiting)):
+                        bucket.tokens -= 1
+                        break
+                    wait = max(blocked, (floor + 1 - bucket.tokens) / bucket.rate, 0.001)
+                    if deadline is not None:
+                        if now + wait > deadline:
+                            metrics.inc("ratelimit_rejected_total", budget=bucket.name,
+                                        lane="high" if lane == HIGH else "low")
+                            raise RateLimited(f"Bajet {bucket.name} habis ({wait:.2f}s)")
+                    self._cond.wait(wait)
+            finally:
+                if lane == HIGH:
+                    bucket.high_waiting -= 1
+                    self._cond.notify_all()       # LOW yang menunggu boleh cuba semula
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            metrics.observe("ratelimit_wait_seconds", waited, budget=bucket.name,
+                            lane="high" if lane == HIGH else "low")
+        return waited
+
+    def throttled(self, bucket: Bucket, retry_after: Optional[float] = None):
+        """HTTP 429 — tahan baldi & separuhkan kadar."""
+        with self._cond:
+            now = time.monotonic()
+            bucket.blocked_until = max(bucket.blocked_until, now + (retry_after or 1.0 / bucket.rate))
+            bucket.rate   = max(bucket.base_rate * MIN_RATE, bucket.rate / 2)
+            bucket.tokens = 0.0
+            bucket.updated = now
+        metrics.inc("ratelimit_throttled_total", budget=bucket.name)
+        logger.warning(f"⚠️  Had kadar {bucket.name} (429) — kadar kini "
+                       f"{bucket.rate:.1f} req/s, tunggu {retry_after or 0:.1f}s")
+
+    def succeeded(self, bucket: Bucket):
+        if bucket.rate < bucket.base_rate:
+            with self._cond:
+                bucket.rate = min(bucket.base_rate,
+                                  bucket.rate + bucket.base_rate * RECOVER_STEP)
+
+
+_limiter = RateLimiter()
+
+
+def get_limiter() -> RateLimiter:
+    return _limiter
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Nilai Retry-After (saat) dari header respons, jika ada."""
+    value = (headers or {}).get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
@@ -1,75 +1,200 @@
 # ============================================================
 #  risk_manager.py — PENGURUS RISIKO + TELEGRAM ALERT
+#  Tempahan modal atomik (reserve → commit / release) dengan had
+#  exposure keseluruhan, setiap pasaran & setiap event NegRisk
 # ============================================================
 
+import time
 import logging
-from config import MAX_TOTAL_EXPOSURE
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from config import MAX_TOTAL_EXPOSURE, MAX_MARKET_EXPOSURE, MAX_EVENT_EXPOSURE
 from scanner import ArbitrageOpportunity
 from telegram_notify import notify_risk_rejected, notify_emergency_stop
 
 logger = logging.getLogger(__name__)
 
+# Tindakan bila peluang ditolak
+QUIET  = 0          # log sahaja
+NOTIFY = 1          # + Telegram
+STOP   = 2          # kill switch
 
-class RiskManager:
 
-    def __init__(self):
+@dataclass(slots=True)
+class Reservation:
+    """Modal yang ditempah untuk satu trade sehingga commit() / release()."""
+    market_id: str
+    event_id: str
+    size: float
+    reserved_at: float = field(default_factory=time.time)
+    open: bool = True
+
+
+class RiskManager:
+    """
+    Selamat dipanggil serentak dari banyak pelaksana.
+
+    reserve() semak semua had dan tempah modal dalam SATU bahagian kritikal,
+    jadi dua kelulusan serentak tidak boleh sama-sama melepasi had. Bahagian
+    kritikal hanya aritmetik O(1) pada dict indeks pasaran/event — semakan
+    tanpa keadaan kongsi, log & Telegram berlaku di luar kunci.
+    """
+
+    def __init__(self, max_exposure: float = MAX_TOTAL_EXPOSURE,
+                 notify: bool = True,
+                 max_market_exposure: float = MAX_MARKET_EXPOSURE,
+                 max_event_exposure: float = MAX_EVENT_EXPOSURE):
+        self.max_exposure  = max_exposure
+        self.max_market_exposure = max_market_exposure
+        self.max_event_exposure  = max_event_exposure
+        self.notify        = notify          # False = tiada Telegram (cth. backtest)
         self.deployed      = 0.0
         self.trades_today  = 0
         self.daily_pnl     = 0.0
-        self.max_daily_loss = MAX_TOTAL_EXPOSURE * 0.10
+        self.max_daily_loss = max_exposure * 0.10
         self.is_halted     = False
+        self.market_exposure: Dict[str, float] = {}
+        self.event_exposure:  Dict[str, float] = {}
+        self._lock = threading.Lock()
 
-    def approve(self, opp: ArbitrageOpportunity) -> tuple[bool, str]:
-        """Semak sama ada trade boleh dilaksanakan."""
+    # ─── SEMAKAN ───────────────────────────────────────────
+    # Setiap semakan pulangkan (sebab, tindakan) — tindakan: QUIET / NOTIFY / STOP
 
-        if self.is_halted:
-            reason = "Bot dihentikan — kill switch aktif"
-            return False, reason
+    def _check_opportunity(self, opp: ArbitrageOpportunity) -> Tuple[Optional[str], int]:
+        """Semakan yang hanya bergantung pada peluang itu sendiri (tanpa kunci)."""
+        if opp.expected_profit_usdc < 0.01:
+            return "Keuntungan terlalu kecil", QUIET
+        if len(opp.outcomes) > 8:
+            return f"Terlalu banyak outcomes ({len(opp.outcomes)})", NOTIFY
+        for o in opp.outcomes:
+            if o.yes_price < 0.02:
+                return f"'{o.name}' terlalu murah — tidak liquid", NOTIFY
+        return None, QUIET
 
+    def _check_limits(self, market_id: str, event_id: str,
+                      size: float) -> Tuple[Optional[str], int]:
+        """Semakan had modal — O(1). Mesti dipanggil dengan kunci dipegang."""
+        if self.is_halted:
+            return "Bot dihentikan — kill switch aktif", QUIET
         if self.daily_pnl < -self.max_daily_loss:
-            reason = f"Rugi harian melebihi ${self.max_daily_loss:.2f}"
+            return f"Rugi harian melebihi ${self.max_daily_loss:.2f}", STOP
+        if self.deployed + size > self.max_exposure:
+            return f"Melebihi had exposure ${self.max_exposure} USDC", NOTIFY
+        if self.market_exposure.get(market_id, 0.0) + size > self.max_market_exposure:
+            return f"Melebihi had exposure pasaran ${self.max_market_exposure} USDC", NOTIFY
+        if self.event_exposure.get(event_id, 0.0) + size > self.max_event_exposure:
+            return f"Melebihi had exposure event ${self.max_event_exposure} USDC", NOTIFY
+        return None, QUIET
+
+    def _refuse(self, opp: ArbitrageOpportunity, reason: str, action: int):
+        if action == STOP:
             self.emergency_stop(reason)
-            return False, reason
+        elif action == NOTIFY:
+            self._rejected(opp, reason)
 
-        if self.deployed + opp.trade_size > MAX_TOTAL_EXPOSURE:
-            reason = f"Melebihi had exposure ${MAX_TOTAL_EXPOSURE} USDC"
-            notify_risk_rejected(opp.market_question, reason)
+    def approve(self, opp: ArbitrageOpportunity) -> tuple[bool, str]:
+        """Semak sama ada trade boleh dilaksanakan (tanpa tempah modal)."""
+        reason, action = self._check_opportunity(opp)
+        if reason is None:
+            with self._lock:
+                reason, action = self._check_limits(opp.market_id,
+                                                    opp.event_id or opp.market_id,
+                                                    opp.trade_size)
+        if reason:
+            self._refuse(opp, reason, action)
             return False, reason
+        return True, "✅ Diluluskan"
 
-        if opp.expected_profit_usdc < 0.01:
-            return False, "Keuntungan terlalu kecil"
+    # ─── TEMPAHAN MODAL ────────────────────────────────────
+
+    def reserve(self, opp: ArbitrageOpportunity) -> Tuple[Optional[Reservation], str]:
+        """Semak had & tempah modal secara atomik. (None, sebab) jika ditolak."""
+        reason, action = self._check_opportunity(opp)
+        res = None
+        if reason is None:
+            event_id = opp.event_id or opp.market_id
+            with self._lock:
+                reason, action = self._check_limits(opp.market_id, event_id, opp.trade_size)
+                if reason is None:
+                    res = Reservation(opp.market_id, event_id, opp.trade_size)
+                    self._book(res, +1)
+                    self.trades_today += 1
+        if reason:
+            self._refuse(opp, reason, action)
+            return None, reason
+        return res, "✅ Diluluskan"
+
+    def commit(self, res: Reservation, profit: float, success: bool) -> float:
+        """Trade selesai — lepaskan modal & rekod P&L (sekali sahaja setiap tempahan).
+        Pulangkan P&L yang direkod."""
+        pnl = profit if success else -(res.size * 0.005)
+        with self._lock:
+            if not res.open:
+                return 0.0
+            res.open = False
+            self._book(res, -1)
+            self.daily_pnl += pnl
+        return pnl
+
+    def release(self, res: Reservation):
+        """Batal tempahan tanpa P&L (cth. order tidak dihantar)."""
+        with self._lock:
+            if not res.open:
+                return
+            res.open = False
+            self._book(res, -1)
+            self.trades_today -= 1
+
+    def _book(self, res: Reservation, sign: int):
+        delta = sign * res.size
+        self.deployed += delta
+        for index, key in ((self.market_exposure, res.market_id),
+                           (self.event_exposure, res.event_id)):
+            value = index.get(key, 0.0) + delta
+            if value > 1e-9:
+                index[key] = value
+            else:
+                index.pop(key, None)
+
+    # ─── ANTARA MUKA LAMA (tanpa indeks pasaran/event) ─────
 
-        if len(opp.outcomes) > 8:
-            reason = f"Terlalu banyak outcomes ({len(opp.outcomes)})"
-            notify_risk_rejected(opp.market_question, reason)
-            return False, reason
+    def record_start(self, size: float):
+        with self._lock:
+            self.deployed     += size
+            self.trades_today += 1
 
-        for o in opp.outcomes:
-            if o.yes_price < 0.02:
-                reason = f"'{o.name}' terlalu murah — tidak liquid"
-                notify_risk_rejected(opp.market_question, reason)
-                return False, reason
+    def record_end(self, size: float, profit: float, success: bool):
+        with self._lock:
+            self.deployed -= size
+            self.daily_pnl += profit if success else -(size * 0.005)
 
-        return True, "✅ Diluluskan"
+    def restore(self, daily_pnl: float, trades_today: int):
+        """Keadaan harian dari lejar selepas bot dimulakan semula."""
+        with self._lock:
+            self.daily_pnl    = daily_pnl
+            self.trades_today = trades_today
 
-    def record_start(self, size: float):
-        self.deployed     += size
-        self.trades_today += 1
+    # ─── KAWALAN ───────────────────────────────────────────
 
-    def record_end(self, size: float, profit: float, success: bool):
-        self.deployed -= size
-        self.daily_pnl += profit if success else -(size * 0.005)
+    def _rejected(self, opp: ArbitrageOpportunity, reason: str):
+        if self.notify:
+            notify_risk_rejected(opp.market_question, reason)
 
     def emergency_stop(self, reason: str):
         self.is_halted = True
-        notify_emergency_stop(reason)
+        if self.notify:
+            notify_emergency_stop(reason)
         logger.critical(f"🚨 EMERGENCY STOP: {reason}")
 
     def get_status(self) -> dict:
-        return {
-            "halted":    self.is_halted,
-            "deployed":  self.deployed,
-            "trades":    self.trades_today,
-            "daily_pnl": self.daily_pnl,
-            "available": MAX_TOTAL_EXPOSURE - self.deployed
-        }
+        with self._lock:
+            return {
+                "halted":    self.is_halted,
+                "deployed":  self.deployed,
+                "trades":    self.trades_today,
+                "daily_pnl": self.daily_pnl,
+                "available": self.max_exposure - self.deployed,
+                "markets":   len(self.market_exposure),
+                "events":    len(self.event_exposure)
+            }
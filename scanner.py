@@ -3,24 +3,36 @@
 #  Hanya scan pasaran politik, sukan jangka panjang — tiada fee!
 # ============================================================
 
-import requests
+import json
+import time
+import queue
 import logging
+import threading
+import http_client
+import metrics
+from log_setup import SAMPLED
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Optional
-from config import GAMMA_API_URL, MIN_PROFIT_THRESHOLD
+from typing import Callable, Iterator, List, Optional
+from config import (
+    GAMMA_API_URL, MIN_PROFIT_THRESHOLD, SCAN_CONCURRENCY, BULK_EVALUATION,
+    EVENT_ARBS
+)
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+# slots=True — beribu objek ini dibina setiap scan; tiada __dict__ setiap objek
+@dataclass(slots=True)
 class Outcome:
     name: str
     token_id: str
     yes_price: float
     no_price: float
+    limit_price: float = 0.0         # Paras terburuk yang disapu kaki FOK (0 = belum disemak book)
 
 
-@dataclass
+@dataclass(slots=True)
 class ArbitrageOpportunity:
     market_id: str
     market_question: str
@@ -30,6 +42,15 @@ class ArbitrageOpportunity:
     expected_profit_pct: float
     expected_profit_usdc: float
     trade_size: float
+    detected_at: float = field(default_factory=time.time)   # Identiti (kunci lejar) — tidak berubah
+    expires_at: float = 0.0          # 0 = tiada had; ditetapkan oleh OpportunityQueue
+    event_id: str = ""               # Event NegRisk ("" = tidak diketahui → guna market_id)
+    published_at: float = 0.0        # Masa masuk baris gilir (cache inkremental diterbit semula setiap scan)
+
+    @property
+    def seen_at(self) -> float:
+        """Masa harga terakhir disahkan — asas metrik latency (bukan identiti)."""
+        return self.published_at or self.detected_at
 
 
 # ─── KATEGORI PASARAN FEE-FREE ─────────────────────────────
@@ -49,128 +70,370 @@ def is_fee_market(question: str) -> bool:
     return any(kw in question_lower for kw in FEE_MARKET_KEYWORDS)
 
 
-def fetch_negrisk_markets() -> List[dict]:
-    """Ambil semua pasaran NegRisk aktif."""
-    logger.info("📡 Mengambil pasaran NegRisk dari Gamma API...")
+PAGE_SIZE = 100
+
+# Harga → integer mikro-USDC: jumlah & perbandingan threshold tepat, tiada
+# hanyut float. Satu-satunya takrif — market_table, event_index & tape guna ini
+SCALE     = 1_000_000
+
+
+def to_ticks(price) -> int:
+    """Harga (float / string Gamma) → integer mikro-USDC."""
+    return int(round(float(price or 0) * SCALE))
+
+
+def _fetch_page(offset: int) -> List[dict]:
+    """Ambil satu halaman pasaran NegRisk dari Gamma API."""
+    params = {
+        "active": "true",
+        "closed": "false",
+        "neg_risk": "true",
+        "order": "volumeNum",
+        "ascending": "false",
+        "offset": offset,
+        "limit": PAGE_SIZE
+    }
+    r = http_client.get(f"{GAMMA_API_URL}/markets", params=params)
+    r.raise_for_status()
+    return r.json() or []
+
+
+def fetch_market_pages(concurrency: int = SCAN_CONCURRENCY,
+                       fetch_page: Callable[[int], List[dict]] = _fetch_page,
+                       on_page: Optional[Callable[[List[dict]], None]] = None,
+                       start: int = 0, stride: int = 1) -> List[dict]:
+    """Ambil semua halaman /markets (belum ditapis).
+
+    concurrency > 1 = ambil beberapa halaman serentak (satu gelombang
+    `concurrency` halaman) sehingga jumpa halaman yang tidak penuh.
+    on_page       = terima setiap halaman mengikut susunan dan jangan
+                    kumpul (cth. MarketTable) — senarai kosong dipulangkan.
+    start, stride = ambil halaman start, start+stride, ... sahaja (pekerja
+                    shard ke-`start` daripada `stride`).
+    """
     all_markets = []
-    offset = 0
+    page   = start
+    wave   = max(1, concurrency)
+    stride = max(1, stride)
 
-    while True:
-        try:
-            params = {
-                "active": "true",
-                "closed": "false",
-                "neg_risk": "true",
-                "order": "volumeNum",
-                "ascending": "false",
-                "offset": offset,
-                "limit": 100
-            }
-            r = requests.get(f"{GAMMA_API_URL}/markets", params=params, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            if not data:
-                break
-            all_markets.extend(data)
-            if len(data) < 100:
-                break
-            offset += 100
-        except Exception as e:
-            logger.error(f"❌ Gagal ambil pasaran: {e}")
-            break
+    with ThreadPoolExecutor(max_workers=wave) as pool:
+        done = False
+        while not done:
+            futures = [pool.submit(fetch_page, (page + i * stride) * PAGE_SIZE)
+                       for i in range(wave)]
+
+            # Kekalkan susunan halaman — berhenti pada halaman pertama
+            # yang gagal atau tidak penuh
+            for fut in futures:
+                try:
+                    data = fut.result()
+                except Exception as e:
+                    logger.error("❌ Gagal ambil pasaran: %s", e)
+                    done = True
+                    break
+                if on_page:
+                    on_page(data)
+                else:
+                    all_markets.extend(data)
+                if len(data) < PAGE_SIZE:
+                    done = True
+                    break
+            page += wave * stride
+
+    return all_markets
+
+
+def fetch_negrisk_markets(concurrency: int = SCAN_CONCURRENCY) -> List[dict]:
+    """Ambil semua pasaran NegRisk aktif."""
+    logger.info("📡 Mengambil pasaran NegRisk dari Gamma API...")
+    all_markets = fetch_market_pages(concurrency)
 
     # Tapis keluar pasaran crypto berbayar
     fee_free = [m for m in all_markets if not is_fee_market(m.get("question", ""))]
-    logger.info(f"✅ {len(fee_free)} pasaran fee-free dijumpai (dari {len(all_markets)} jumlah)")
+    logger.info("✅ %d pasaran fee-free dijumpai (dari %d jumlah)", len(fee_free), len(all_markets))
     return fee_free
 
 
+def _parse_list(value) -> list:
+    """Gamma hantar sesetengah medan senarai sebagai string JSON."""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return []
+    return value or []
+
+
+def listing_tokens(market: dict) -> Optional[List[dict]]:
+    """Bina senarai token (outcome, token_id, price) dari payload senarai /markets.
+
+    Pulangkan None jika payload tiada data harga — pasaran itu perlu
+    diambil secara individu.
+    """
+    if market.get("tokens"):
+        return market["tokens"]
+
+    names  = _parse_list(market.get("outcomes"))
+    prices = _parse_list(market.get("outcomePrices"))
+    ids    = _parse_list(market.get("clobTokenIds"))
+    if not prices or len(names) != len(prices):
+        return None
+
+    ids = ids if len(ids) == len(prices) else [""] * len(prices)
+    return [{"outcome": n, "token_id": t, "price": p}
+            for n, t, p in zip(names, ids, prices)]
+
+
+def negrisk_event_id(market: dict) -> str:
+    """Id event NegRisk bagi pasaran (semua pasaran satu event berkongsi id ini)."""
+    events = market.get("events") or [{}]
+    return str(market.get("negRiskMarketID") or events[0].get("id")
+               or market.get("id", ""))
+
+
+def negrisk_event_size(market: dict) -> int:
+    """Bilangan pasaran aktif dalam event NegRisk (0 = tidak diketahui).
+
+    Dari Gamma events[0].markets; baris dalaman (pita, MarketTable.rows)
+    bawa kiraan siap dalam "negRiskEventSize". Arbitrage event hanya sah
+    bila SEMUA ahli event ada — set tidak lengkap bukan arbitrage.
+    """
+    if market.get("negRiskEventSize"):
+        return int(market["negRiskEventSize"])
+    members = (market.get("events") or [{}])[0].get("markets") or []
+    return sum(1 for m in members
+               if isinstance(m, dict) and m.get("active", True) and not m.get("closed"))
+
+
+def evaluate_tokens(market_id: str, question: str, tokens: List[dict],
+                    trade_size: float,
+                    threshold: float = MIN_PROFIT_THRESHOLD) -> Optional[ArbitrageOpportunity]:
+    """Kira peluang LONG/SHORT dari senarai token satu pasaran."""
+    if len(tokens) < 2:
+        return None
+
+    outcomes = []
+    for t in tokens:
+        price = float(t.get("price", 0))
+        if price <= 0.01 or price >= 0.99:
+            continue
+        outcomes.append(Outcome(
+            name=t.get("outcome", "?"),
+            token_id=t.get("token_id", ""),
+            yes_price=price,
+            no_price=round(1.0 - price, 6)
+        ))
+
+    if len(outcomes) < 2:
+        return None
+
+    # Jumlah & threshold dalam integer mikro — tiada ralat pembundaran float
+    total = sum(to_ticks(o.yes_price) for o in outcomes)
+    limit = to_ticks(threshold)
+
+    # LONG ARB → jumlah < $1.00 (beli semua YES)
+    if total < SCALE:
+        net_profit = (SCALE - total) / SCALE      # Fee-free = tiada tolak fee!
+        if SCALE - total >= limit:
+            return ArbitrageOpportunity(
+                market_id=market_id,
+                market_question=question,
+                arb_type="LONG",
+                outcomes=outcomes,
+                total_yes_sum=total / SCALE,
+                expected_profit_pct=net_profit,
+                expected_profit_usdc=net_profit * trade_size,
+                trade_size=trade_size
+            )
+
+    # SHORT ARB → jumlah > $1.00 (jual semua YES)
+    elif total > SCALE:
+        net_profit = (total - SCALE) / SCALE
+        if total - SCALE >= limit:
+            return ArbitrageOpportunity(
+                market_id=market_id,
+                market_question=question,
+                arb_type="SHORT",
+                outcomes=outcomes,
+                total_yes_sum=total / SCALE,
+                expected_profit_pct=net_profit,
+                expected_profit_usdc=net_profit * trade_size,
+                trade_size=trade_size
+            )
+
+    return None
+
+
 def scan_for_arbitrage(market_id: str, question: str,
                         trade_size: float) -> Optional[ArbitrageOpportunity]:
     """Semak satu pasaran untuk peluang arbitrage."""
     try:
-        r = requests.get(f"{GAMMA_API_URL}/markets/{market_id}", timeout=10)
+        r = http_client.get(f"{GAMMA_API_URL}/markets/{market_id}")
         r.raise_for_status()
         data = r.json()
-
-        tokens = data.get("tokens", [])
-        if len(tokens) < 2:
-            return None
-
-        outcomes = []
-        for t in tokens:
-            price = float(t.get("price", 0))
-            if price <= 0.01 or price >= 0.99:
-                continue
-            outcomes.append(Outcome(
-                name=t.get("outcome", "?"),
-                token_id=t.get("token_id", ""),
-                yes_price=price,
-                no_price=round(1.0 - price, 6)
-            ))
-
-        if len(outcomes) < 2:
-            return None
-
-        total = sum(o.yes_price for o in outcomes)
-
-        # LONG ARB → jumlah < $1.00 (beli semua YES)
-        if total < 1.0:
-            net_profit = (1.0 - total)      # Fee-free = tiada tolak fee!
-            if net_profit >= MIN_PROFIT_THRESHOLD:
-                return ArbitrageOpportunity(
-                    market_id=market_id,
-                    market_question=question,
-                    arb_type="LONG",
-                    outcomes=outcomes,
-                    total_yes_sum=round(total, 6),
-                    expected_profit_pct=net_profit,
-                    expected_profit_usdc=net_profit * trade_size,
-                    trade_size=trade_size
-                )
-
-        # SHORT ARB → jumlah > $1.00 (jual semua YES)
-        elif total > 1.0:
-            net_profit = total - 1.0
-            if net_profit >= MIN_PROFIT_THRESHOLD:
-                return ArbitrageOpportunity(
-                    market_id=market_id,
-                    market_question=question,
-                    arb_type="SHORT",
-                    outcomes=outcomes,
-                    total_yes_sum=round(total, 6),
-                    expected_profit_pct=net_profit,
-                    expected_profit_usdc=net_profit * trade_size,
-                    trade_size=trade_size
-                )
+        # /markets/{id} sama format dengan senarai (clobTokenIds/outcomePrices
+        # sebagai string JSON) — bukan medan "tokens"
+        return evaluate_tokens(market_id, question,
+                               listing_tokens(data) or [], trade_size)
 
     except Exception as e:
-        logger.debug(f"Skip {market_id}: {e}")
+        logger.debug("Skip %s: %s", market_id, e)
 
     return None
 
 
-def scan_all(trade_size: float) -> List[ArbitrageOpportunity]:
-    """Scan semua pasaran fee-free dan kembalikan peluang."""
-    logger.info(f"\n🔍 MULA SCAN | Threshold: {MIN_PROFIT_THRESHOLD*100:.1f}% | Trade: ${trade_size}")
-    markets = fetch_negrisk_markets()
-    found   = []
+def scan_all(trade_size: float,
+             concurrency: int = SCAN_CONCURRENCY,
+             bulk: bool = BULK_EVALUATION) -> List[ArbitrageOpportunity]:
+    """Scan semua pasaran fee-free dan kembalikan peluang.
+
+    concurrency = had request serentak ke Gamma API (1 = satu demi satu).
+    bulk=True   = nilai harga terus dari payload senarai /markets; hanya
+                  calon yang lepas threshold (atau pasaran tanpa harga dalam
+                  senarai) diambil semula dari /markets/{id} untuk pengesahan.
+    Keputusan dikembalikan mengikut susunan pasaran, sama seperti scan berjujukan.
+    """
+    # Import lewat — market_table & tape bergantung pada modul ini
+    from market_table import fetch_market_table
+    from tape import get_recorder
+
+    logger.info("\n🔍 MULA SCAN | Threshold: %.1f%% | Trade: $%s", MIN_PROFIT_THRESHOLD * 100, trade_size)
+    scan_start = time.perf_counter()
+    with metrics.timer("scan_fetch_seconds", mode="full"):
+        table = fetch_market_table(concurrency)
+
+    recorder = get_recorder()
+    if recorder:
+        recorder.record_markets(table.rows())     # dihurai di thread penulis pita
+
+    found = evaluate_markets(table, trade_size, concurrency, bulk)
+    metrics.observe("scan_total_seconds", time.perf_counter() - scan_start, mode="full")
+    logger.info("✅ Scan selesai: %d peluang dari %d pasaran", len(found), len(table))
+    return found
 
-    for i, m in enumerate(markets):
-        mid      = m.get("id", "")
-        question = m.get("question", "")
-        if not mid:
-            continue
 
-        opp = scan_for_arbitrage(mid, question, trade_size)
+def scan_iter(trade_size: float,
+              concurrency: int = SCAN_CONCURRENCY,
+              bulk: bool = BULK_EVALUATION) -> Iterator[ArbitrageOpportunity]:
+    """Seperti scan_all, tetapi peluang dipulangkan sebaik dijumpai.
+
+    Setiap halaman /markets dinilai sebaik tiba (thread latar belakang);
+    calon terus dihantar untuk pengesahan /markets/{id} dan setiap yang
+    lulus di-yield serta-merta — tidak menunggu halaman lain. Arbitrage
+    event (perlukan semua pasaran event) di-yield di hujung.
+    """
+    from market_table import MarketTable
+    from tape import get_recorder
+
+    logger.info("\n🔍 MULA SCAN (saluran) | Threshold: %.1f%% | Trade: $%s",
+                MIN_PROFIT_THRESHOLD * 100, trade_size)
+    scan_start = time.perf_counter()
+    recorder   = get_recorder()
+    table      = MarketTable()
+    out: "queue.Queue[Optional[ArbitrageOpportunity]]" = queue.Queue()
+    pool       = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    pending    = []
+
+    def _confirm(market_id: str, question: str, event_id: str):
+        opp = scan_for_arbitrage(market_id, question, trade_size)
         if opp:
-            found.append(opp)
-            logger.info(f"  🎯 [{opp.arb_type}] {question[:50]}... | "
-                        f"Spread: {opp.expected_profit_pct*100:.2f}% | "
-                        f"+${opp.expected_profit_usdc:.4f}")
+            opp.event_id = event_id
+            out.put(opp)
+
+    def _page(page: List[dict]):
+        page  = [m for m in page if not is_fee_market(m.get("question", ""))]
+        start = len(table)
+        table.extend(page)
+        if recorder:
+            recorder.record_markets(page)
+        wanted = ({opp.market_id for opp in table.evaluate(trade_size, start=start)}
+                  if bulk else None)
+        for m in range(start, len(table)):
+            mid = table.market_ids[m]
+            if wanted is None or not table.priced[m] or mid in wanted:
+                pending.append(pool.submit(_confirm, mid, table.questions[m],
+                                           table.event_ids[table.market_event[m]]))
+
+    def _produce():
+        try:
+            fetch_market_pages(concurrency, on_page=_page)
+            for fut in pending:
+                fut.result()
+            if EVENT_ARBS:
+                for opp in table.evaluate_events(trade_size):
+                    out.put(opp)
+        except Exception as e:
+            logger.error("❌ Saluran scan gagal: %s", e)
+        finally:
+            pool.shutdown(wait=False)
+            out.put(None)
+
+    threading.Thread(target=_produce, name="scan-iter", daemon=True).start()
+    count = 0
+    while True:
+        opp = out.get()
+        if opp is None:
+            break
+        count += 1
+        if count == 1:
+            metrics.observe("scan_first_opportunity_seconds", time.perf_counter() - scan_start)
+        logger.info("  🎯 [%s] %.50s... | Spread: %.2f%% | +$%.4f",
+                    opp.arb_type, opp.market_question, opp.expected_profit_pct * 100,
+                    opp.expected_profit_usdc, extra=SAMPLED)
+        yield opp
+
+    metrics.observe("scan_total_seconds", time.perf_counter() - scan_start, mode="pipeline")
+    logger.info("✅ Scan selesai: %d peluang dari %d pasaran (%d disahkan)",
+                count, len(table), len(pending))
+
+
+def evaluate_markets(markets, trade_size: float,
+                     concurrency: int = SCAN_CONCURRENCY,
+                     bulk: bool = BULK_EVALUATION) -> List[ArbitrageOpportunity]:
+    """Nilai MarketTable / payload senarai /markets (juga dipanggil pekerja shard)."""
+    from market_table import MarketTable
+    table = markets if isinstance(markets, MarketTable) else MarketTable.from_markets(markets)
+
+    found    = []
+    to_fetch = range(len(table))
+    eval_start = time.perf_counter()
+    if bulk:
+        candidates = {opp.market_id for opp in table.evaluate(trade_size)}
+        to_fetch   = [m for m in to_fetch
+                      if not table.priced[m] or table.market_ids[m] in candidates]
+        logger.info("  📦 Penilaian pukal: %d calon dari %d pasaran", len(to_fetch), len(table))
+        metrics.observe("scan_evaluate_seconds", time.perf_counter() - eval_start, mode="bulk")
+
+    def _scan(m: int) -> Optional[ArbitrageOpportunity]:
+        opp = scan_for_arbitrage(table.market_ids[m], table.questions[m], trade_size)
+        if opp:
+            opp.event_id = table.event_ids[table.market_event[m]]
+        return opp
+
+    # pool.map menghadkan request serentak kepada `concurrency` thread
+    # dan memulangkan keputusan ikut susunan input
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for i, opp in enumerate(pool.map(_scan, to_fetch)):
+            if opp:
+                found.append(opp)
+                logger.info("  🎯 [%s] %.50s... | Spread: %.2f%% | +$%.4f",
+                            opp.arb_type, opp.market_question,
+                            opp.expected_profit_pct * 100, opp.expected_profit_usdc,
+                            extra=SAMPLED)
 
-        if (i + 1) % 50 == 0:
-            logger.info(f"  ... {i+1}/{len(markets)} pasaran diimbas")
+            if (i + 1) % 50 == 0:
+                logger.info("  ... %d/%d pasaran diimbas", i + 1, len(to_fetch),
+                            extra=SAMPLED)
+    if not bulk:
+        # Tanpa penilaian pukal, setiap pasaran dinilai dari orderbook sendiri
+        metrics.observe("scan_evaluate_seconds", time.perf_counter() - eval_start,
+                        mode="per_market")
 
-    logger.info(f"✅ Scan selesai: {len(found)} peluang dari {len(markets)} pasaran")
+    if EVENT_ARBS:
+        events = table.evaluate_events(trade_size)
+        for opp in events:
+            logger.info("  🎯 [EVENT %s] %.50s... | %d pasaran | Spread: %.2f%%",
+                        opp.arb_type, opp.market_question, len(opp.outcomes),
+                        opp.expected_profit_pct * 100, extra=SAMPLED)
+        found.extend(events)
     return found
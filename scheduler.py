@@ -0,0 +1,264 @@
+# ============================================================
+#  scheduler.py — PENJADUAL KEUTAMAAN SETIAP PASARAN
+#  Setiap pasaran ada selang segar sendiri (turun naik, volum,
+#  jarak ke threshold); bajet request dibelanja pada pasaran panas
+# ============================================================
+
+import math
+import time
+import heapq
+import logging
+import metrics
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from config import (
+    MIN_PROFIT_THRESHOLD, DEPTH_CHECK, EVENT_ARBS,
+    SCHEDULER_BUDGET_RPS, SCHEDULER_BATCH_TOKENS,
+    SCHEDULER_MIN_INTERVAL, SCHEDULER_MAX_INTERVAL, SCHEDULER_UNIVERSE_SECONDS
+)
+from scanner import (
+    ArbitrageOpportunity, PAGE_SIZE, fetch_negrisk_markets, listing_tokens,
+    evaluate_tokens
+)
+from orderbook import BookStore, evaluate_depth
+from event_index import EventIndex
+
+logger = logging.getLogger(__name__)
+
+VOL_ALPHA = 0.3          # Pemberat EWMA turun naik
+VOL_FLOOR = 1e-3         # Turun naik minimum (per √saat) — pasaran senyap tetap disemak
+SAFETY    = 0.5          # Segar sebelum jurang dijangka tertutup (separuh masa anggaran)
+
+
+@dataclass
+class MarketState:
+    market_id: str
+    question: str
+    tokens: List[dict]            # [{"outcome", "token_id", "price"}]
+    volume: float
+    price_sum: float = 0.0
+    volatility: float = VOL_FLOOR # EWMA |Δ jumlah harga| / √Δt
+    interval: float = SCHEDULER_MAX_INTERVAL
+    due: float = 0.0
+    updated: float = 0.0
+
+
+class MarketScheduler:
+    """
+    Baris gilir keutamaan (heapq, ikut masa "due") untuk semua pasaran.
+
+    Selang setiap pasaran ≈ masa anggaran untuk jumlah harganya bergerak
+    ke threshold. Harga dianggap jalan rawak, jadi masa ≈ (jurang / σ)²;
+    dipendekkan untuk pasaran volum tinggi dan dihadkan [min, max].
+
+    Bajet request = token bucket (budget_rps); setiap request /books
+    menyegarkan hingga `batch_tokens` token. Sapuan penuh /markets
+    (universe) juga dibayar dari bajet yang sama.
+    """
+
+    def __init__(self, budget_rps: float = SCHEDULER_BUDGET_RPS,
+                 batch_tokens: int = SCHEDULER_BATCH_TOKENS,
+                 min_interval: float = SCHEDULER_MIN_INTERVAL,
+                 max_interval: float = SCHEDULER_MAX_INTERVAL,
+                 universe_seconds: float = SCHEDULER_UNIVERSE_SECONDS,
+                 threshold: float = MIN_PROFIT_THRESHOLD):
+        self.budget_rps       = budget_rps
+        self.batch_tokens     = batch_tokens
+        self.min_interval     = min_interval
+        self.max_interval     = max_interval
+        self.universe_seconds = universe_seconds
+        self.threshold        = threshold
+        self.states: Dict[str, MarketState] = {}
+        self.books   = BookStore()
+        self.events  = EventIndex()
+        self.requests = 0
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq    = 0
+        self._budget = 1.0
+        self._budget_at = time.time()
+        self._universe_at = 0.0
+
+    # ─── SELANG & BARIS GILIR ──────────────────────────────
+
+    def interval_for(self, state: MarketState) -> float:
+        """Selang segar: pasaran dekat threshold / bergerak laju / volum tinggi = kerap."""
+        gap   = max(0.0, self.threshold - abs(1.0 - state.price_sum))
+        eta   = (gap / max(state.volatility, VOL_FLOOR)) ** 2
+        boost = 1.0 + math.log10(1.0 + state.volume / 1000.0)
+        return min(self.max_interval, max(self.min_interval, SAFETY * eta / boost))
+
+    def _schedule(self, state: MarketState, now: float):
+        state.interval = self.interval_for(state)
+        state.due      = now + state.interval
+        self._seq     += 1
+        heapq.heappush(self._heap, (state.due, self._seq, state.market_id))
+
+    def _prioritise(self, market_id: str):
+        """Calon dari harga senarai → segar pada detik seterusnya (depan baris gilir)."""
+        state = self.states.get(market_id)
+        if state is not None:
+            state.due  = 0.0
+            self._seq += 1
+            heapq.heappush(self._heap, (0.0, self._seq, market_id))
+
+    def _pop_due(self, now: float, max_tokens: int) -> List[MarketState]:
+        """Ambil pasaran yang paling lama tertunggak, sehingga had token."""
+        due, count = [], 0
+        while self._heap and self._heap[0][0] <= now:
+            when, _, mid = self._heap[0]
+            state = self.states.get(mid)
+            if state is None or state.due != when:       # entri lapuk
+                heapq.heappop(self._heap)
+                continue
+            if due and count + len(state.tokens) > max_tokens:
+                break
+            heapq.heappop(self._heap)
+            due.append(state)
+            count += len(state.tokens)
+        return due
+
+    def _refill(self, now: float):
+        self._budget = min(max(1.0, self.budget_rps * 2),
+                           self._budget + (now - self._budget_at) * self.budget_rps)
+        self._budget_at = now
+
+    # ─── UNIVERSE ──────────────────────────────────────────
+
+    def load_universe(self, markets: List[dict], trade_size: float,
+                      now: Optional[float] = None) -> int:
+        """
+        Muat/kemas kini semua pasaran dari sapuan /markets. Harga senarai hanya
+        petunjuk: pasaran calon (dan semua ahli event calon) didahulukan dalam
+        baris gilir, dan peluang boleh-trade datang dari refresh() (book + kedalaman).
+        Pulangkan bilangan pasaran yang didahulukan.
+        """
+        now  = now or time.time()
+        seen = set()
+        hints = set()
+        for m in markets:
+            mid    = m.get("id", "")
+            tokens = listing_tokens(m)
+            if not mid or not tokens or not all(t.get("token_id") for t in tokens):
+                continue
+            seen.add(mid)
+            volume = float(m.get("volume24hr") or m.get("volumeNum") or 0)
+            state  = self.states.get(mid)
+            if state is None or len(state.tokens) != len(tokens):
+                state = self.states[mid] = MarketState(
+                    mid, m.get("question", ""), [dict(t) for t in tokens], volume)
+            state.volume = volume
+            self._observe(state, [float(t.get("price") or 0) for t in tokens], now)
+            self._schedule(state, now)
+            self.events.upsert_market(m)
+            if evaluate_tokens(mid, state.question, tokens, trade_size, self.threshold):
+                hints.add(mid)
+
+        for mid in [mid for mid in self.states if mid not in seen]:
+            del self.states[mid]
+            self.events.remove_market(mid)
+        if EVENT_ARBS:
+            for opp in self.events.opportunities(trade_size):
+                hints.update(self.events.events[opp.event_id].markets.values())
+        for mid in hints:
+            self._prioritise(mid)
+        self._universe_at = now
+        return len(hints)
+
+    # ─── SEGAR ─────────────────────────────────────────────
+
+    def _observe(self, state: MarketState, prices: List[float], now: float):
+        new_sum = sum(prices)
+        if state.updated:
+            rate = abs(new_sum - state.price_sum) / math.sqrt(max(now - state.updated, 1e-3))
+            state.volatility = VOL_ALPHA * rate + (1 - VOL_ALPHA) * state.volatility
+        for t, p in zip(state.tokens, prices):
+            t["price"] = p
+        state.price_sum = new_sum
+        state.updated   = now
+
+    def refresh(self, due: List[MarketState], trade_size: float,
+                now: float) -> List[ArbitrageOpportunity]:
+        """Satu request /books untuk semua token pasaran `due`, kemudian nilai."""
+        self.books.fetch([t["token_id"] for s in due for t in s.tokens])
+        self.requests += 1
+
+        found, touched_events = [], set()
+        for state in due:
+            prices = []
+            for t in state.tokens:
+                book = self.books.get(t["token_id"])
+                if book is not None and book.best_bid is not None and book.best_ask is not None:
+                    prices.append(round((book.best_bid + book.best_ask) / 2, 6))
+                else:
+                    prices.append(t["price"])
+            self._observe(state, prices, now)
+            self._schedule(state, now)
+
+            group = self.events.update(state.tokens[0]["token_id"], prices[0])
+            if group is not None:
+                touched_events.add(group.event_id)
+            opp = evaluate_tokens(state.market_id, state.question, state.tokens,
+                                  trade_size, self.threshold)
+            if opp and DEPTH_CHECK:
+                opp = evaluate_depth(opp, self.books)
+            if opp:
+                opp.event_id = self.events.event_of(state.market_id)
+                found.append(opp)
+
+        if EVENT_ARBS:
+            event_opps = [opp for opp in (
+                self.events.check(self.events.events[event_id], trade_size, self.threshold)
+                for event_id in touched_events) if opp]
+            if event_opps and DEPTH_CHECK:
+                # Kaki event merentas pasaran lain dalam batch ini — book segar
+                # untuk semua ahli (satu request) sebelum semakan kedalaman
+                self.books.fetch(list({o.token_id for opp in event_opps for o in opp.outcomes}))
+                self.requests += 1
+                self._budget  -= 1.0
+                event_opps = [c for c in (evaluate_depth(opp, self.books)
+                                          for opp in event_opps) if c]
+            found.extend(event_opps)
+        return found
+
+    def scan(self, trade_size: float) -> List[ArbitrageOpportunity]:
+        """Satu detik penjadual: sapuan universe jika lapuk, kemudian segar pasaran due."""
+        now = time.time()
+        self._refill(now)
+        found = []
+
+        if now - self._universe_at >= self.universe_seconds:
+            markets = fetch_negrisk_markets()
+            self._budget -= math.ceil(len(markets) / PAGE_SIZE) or 1   # boleh berhutang
+            hinted = self.load_universe(markets, trade_size, now)
+            logger.info("🗓️  Universe: %d pasaran dijadualkan | %d calon didahulukan",
+                        len(self.states), hinted)
+
+        refreshed = 0
+        while self._budget >= 1.0:
+            due = self._pop_due(now, self.batch_tokens)
+            if not due:
+                break
+            self._budget -= 1.0
+            try:
+                found.extend(self.refresh(due, trade_size, now))
+            except Exception as e:
+                logger.warning("⚠️  Gagal segar %d pasaran: %s", len(due), e)
+                for state in due:
+                    self._schedule(state, now)
+                break
+            refreshed += len(due)
+
+        if refreshed:
+            metrics.inc("scheduler_refreshed_total", refreshed)
+            hot = sum(1 for s in self.states.values() if s.interval <= self.min_interval * 2)
+            logger.info("🗓️  %d pasaran disegarkan | %d panas | %d peluang | bajet %.1f req",
+                        refreshed, hot, len(found), self._budget)
+        return found
+
+    def sleep_time(self) -> float:
+        """Masa hingga pasaran seterusnya due dan bajet tersedia."""
+        now = time.time()
+        wait_due    = (self._heap[0][0] - now) if self._heap else self.min_interval
+        wait_budget = max(0.0, (1.0 - self._budget) / self.budget_rps)
+        wait_univ   = self._universe_at + self.universe_seconds - now
+        return max(0.2, min(max(wait_due, wait_budget), wait_univ, self.max_interval))
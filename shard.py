@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# ============================================================
+#  shard.py — SCAN BERSHARD (BERBILANG PROSES / HOS) + BAS PELUANG
+#  Mod scan: setiap pekerja ambil halaman /markets sendiri (giliran
+#  halaman); mod stream: universe dipecah ikut event NegRisk. Setiap
+#  pekerja hantar peluang ke satu penyelaras yang memiliki
+#  RiskManager & pelaksanaan. Pekerja hos lain:
+#    python shard.py worker --connect 10.0.0.5:7450 --shard 2 --shards 4
+# ============================================================
+
+import os
+import time
+import queue
+import socket
+import asyncio
+import logging
+import argparse
+import threading
+import zlib
+import ipaddress
+import multiprocessing
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable, Dict, List, Optional, Tuple
+from config import (
+    DEPTH_CHECK, SHARD_WORKERS, SHARD_ADDRESS, SHARD_AUTHKEY,
+    SHARD_SPAWN_LOCAL, SHARD_TIMEOUT, LOG_FILE, SCAN_CONCURRENCY
+)
+from log_setup import setup_logging
+from rate_limit import get_limiter
+from scanner import (
+    ArbitrageOpportunity, evaluate_markets, fetch_negrisk_markets,
+    listing_tokens, negrisk_event_id
+)
+from market_table import fetch_market_table
+
+logger = logging.getLogger(__name__)
+
+# Mesej (tuple, pickle oleh multiprocessing.connection):
+#   pekerja → penyelaras: ("hello", shard, hos, pid)
+#                         ("opps", kitaran, [ArbitrageOpportunity], statistik)
+#                         kitaran None = peluang stream (tanpa diminta)
+#   penyelaras → pekerja: ("fetch", kitaran, slot, slots, trade_size)
+#                         — ambil halaman slot, slot+slots, ... sendiri
+#                         ("scan", kitaran, [pasaran], trade_size)
+#                         ("stream", [pasaran], trade_size)
+#                         ("stop",)
+
+
+def shard_of(market: dict, shards: int) -> int:
+    """Shard tetap bagi pasaran — semua pasaran satu event dalam shard yang sama."""
+    return zlib.crc32(negrisk_event_id(market).encode()) % shards
+
+
+def _parse_address(value: str) -> Tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+# Kunci contoh config.example.py — diketahui umum
+PLACEHOLDER_AUTHKEY = "TUKAR_KUNCI_SHARD"
+
+
+def is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def check_authkey(host: str, authkey: str):
+    """
+    Mesej bas ialah pickle — sesiapa yang tahu kunci boleh jalankan kod
+    sewenang-wenangnya. Kunci contoh / kosong hanya dibenarkan pada loopback.
+    """
+    if authkey in ("", PLACEHOLDER_AUTHKEY) and not is_loopback(host):
+        raise RuntimeError(f"SHARD_AUTHKEY masih kunci contoh — enggan guna {host} "
+                           f"(tetapkan kunci rawak panjang yang sama di semua hos)")
+
+
+# ─── PEKERJA ───────────────────────────────────────────────
+
+class ShardWorker:
+    """
+    Nilai satu shard universe. Mod scan: ("fetch", ...) = ambil halaman
+    /markets milik pekerja ini terus ke MarketTable; ("scan", ...) = pasaran
+    diberi penyelaras. Kedua-duanya dinilai dengan kod yang sama seperti
+    scan_all (termasuk semakan kedalaman) dan keputusan dipulangkan. Mod stream: MarketStream sendiri untuk token
+    shard ini; setiap peluang terus diterbitkan ke penyelaras.
+    """
+
+    def __init__(self, conn: Connection, shard: int, shards: int):
+        self.conn   = conn
+        self.shard  = shard
+        self.shards = shards
+        self._send_lock = threading.Lock()
+
+    def _send(self, msg: tuple):
+        with self._send_lock:
+            self.conn.send(msg)
+
+    def run(self):
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = msg[0]
+            if kind == "fetch":
+                _, cycle, slot, slots, trade_size = msg
+                self._send(("opps", cycle) + self.fetch_scan(slot, slots, trade_size))
+            elif kind == "scan":
+                _, cycle, markets, trade_size = msg
+                self._send(("opps", cycle) + self.scan(markets, trade_size))
+            elif kind == "stream":
+                self.stream(msg[1], msg[2])
+                break
+            elif kind == "stop":
+                break
+        logger.info(f"👋 Shard {self.shard}/{self.shards} berhenti")
+
+    def fetch_scan(self, slot: int, slots: int, trade_size: float) -> Tuple[list, dict]:
+        start = time.perf_counter()
+        # Gelombang setiap pekerja = bahagian SCAN_CONCURRENCY — jumlah serentak kekal
+        table = fetch_market_table(-(-SCAN_CONCURRENCY // slots), start=slot, stride=slots)
+        fetched = time.perf_counter() - start
+        opps, stats = self.scan(table, trade_size)
+        stats["fetch_seconds"] = fetched
+        return opps, stats
+
+    def scan(self, markets, trade_size: float) -> Tuple[list, dict]:
+        start = time.perf_counter()
+        opps  = evaluate_markets(markets, trade_size)
+        if DEPTH_CHECK:
+            from orderbook import confirm_with_depth
+            opps = confirm_with_depth(opps)
+        return opps, {"markets": len(markets), "seconds": time.perf_counter() - start}
+
+    def stream(self, markets: List[dict], trade_size: float):
+        from stream import MarketStream
+
+        # Seorang penulis sahaja untuk TAPE_FILE — pekerja tidak merakam
+        stream = MarketStream(trade_size, lambda opp: self._send(("opps", None, [opp], {})),
+                              record=False)
+        stream.set_markets(markets)
+        loop = asyncio.new_event_loop()
+
+        def _listen():
+            # Mesej penyelaras sampai di thread ini; ubah stream dalam loop asyncio
+            while True:
+                try:
+                    msg = self.conn.recv()
+                except (EOFError, OSError):
+                    msg = ("stop",)
+                if msg[0] == "stream":
+                    loop.call_soon_threadsafe(stream.set_markets, msg[1])
+                elif msg[0] == "stop":
+                    asyncio.run_coroutine_threadsafe(stream.stop(), loop)
+                    return
+
+        threading.Thread(target=_listen, name=f"shard-{self.shard}-listen",
+                         daemon=True).start()
+        try:
+            loop.run_until_complete(stream.run())
+        finally:
+            loop.close()
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes, shard: int, shards: int):
+    """Titik masuk proses pekerja (tempatan atau hos lain)."""
+    # Proses sendiri → fail log sendiri (bot.log.shard2); bot.log milik penyelaras
+    setup_logging(path=f"{LOG_FILE}.shard{shard}" if LOG_FILE else "",
+                  tag=f"[shard {shard}] ")
+    # Setiap pekerja ambil halaman & book sendiri — bahagi bajet RATE_LIMITS
+    # supaya N pekerja tidak menghantar N kali kadar yang dibenarkan
+    get_limiter().share(1 / max(1, shards))
+    conn = Client(address, authkey=authkey)
+    conn.send(("hello", shard, socket.gethostname(), os.getpid()))
+    try:
+        ShardWorker(conn, shard, shards).run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+# ─── PENYELARAS ────────────────────────────────────────────
+
+class ShardCoordinator:
+    """
+    Dengar sambungan pekerja (multiprocessing.connection — soket + HMAC),
+    edar pasaran setiap shard dan kumpul peluang ke satu bas (queue.Queue).
+
+    Pasaran shard yang pekerjanya terputus diserah kepada pekerja lain
+    (giliran) supaya tiada pasaran tertinggal; setiap pasaran tetap
+    dinilai oleh tepat seorang pekerja, jadi tiada peluang berganda.
+    """
+
+    def __init__(self, shards: int = SHARD_WORKERS,
+                 address: Tuple[str, int] = SHARD_ADDRESS,
+                 authkey: str = SHARD_AUTHKEY,
+                 spawn_local: bool = SHARD_SPAWN_LOCAL,
+                 timeout: float = SHARD_TIMEOUT):
+        self.shards      = max(1, shards)
+        self.address     = tuple(address)
+        self.spawn_local = spawn_local
+        if spawn_local:
+            # Pekerja tempatan terima kunci rawak sekali guna melalui hujah proses
+            self.authkey = os.urandom(32)
+        else:
+            check_authkey(self.address[0], authkey)
+            self.authkey = authkey.encode()
+        self.timeout     = timeout
+        self.bus: "queue.Queue[tuple]" = queue.Queue()
+        self.conns: Dict[int, Connection] = {}
+        self.asset_ids: List[str] = []
+        self.processes: List[multiprocessing.Process] = []
+        self._cycle     = 0
+        self._ready     = threading.Condition()
+        self._listener: Optional[Listener] = None
+        self._closed    = False
+
+    # ─── SAMBUNGAN ─────────────────────────────────────────
+
+    def start(self) -> "ShardCoordinator":
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self.address   = self._listener.address       # port 0 → port sebenar
+        threading.Thread(target=self._accept, name="shard-accept", daemon=True).start()
+        logger.info(f"🧩 Penyelaras shard dengar di {self.address[0]}:{self.address[1]} "
+                    f"({self.shards} shard)")
+
+        if self.spawn_local:
+            # spawn (bukan fork) — thread & sambungan HTTP induk tidak diwarisi
+            ctx = multiprocessing.get_context("spawn")
+            for i in range(self.shards):
+                p = ctx.Process(target=run_worker, name=f"shard-{i}", daemon=True,
+                                args=(self.address, self.authkey, i, self.shards))
+                p.start()
+                self.processes.append(p)
+
+        deadline = time.time() + self.timeout
+        with self._ready:
+            while len(self.conns) < self.shards and time.time() < deadline:
+                self._ready.wait(deadline - time.time())
+        missing = [i for i in range(self.shards) if i not in self.conns]
+        if missing:
+            logger.warning(f"⚠️  Shard belum bersambung: {missing} — diserah kepada pekerja lain")
+        return self
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+                kind, shard, host, pid = conn.recv()
+            except Exception as e:
+                if self._closed:
+                    return
+                logger.warning(f"⚠️  Sambungan pekerja ditolak: {e}")
+                continue
+            if kind != "hello" or not 0 <= shard < self.shards:
+                conn.close()
+                continue
+            with self._ready:
+                old = self.conns.get(shard)
+                self.conns[shard] = conn
+                self._ready.notify_all()
+            if old is not None:
+                old.close()
+            logger.info(f"🧩 Shard {shard} bersambung dari {host} (pid {pid})")
+            threading.Thread(target=self._read, args=(shard, conn),
+                             name=f"shard-{shard}-read", daemon=True).start()
+
+    def _read(self, shard: int, conn: Connection):
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg[0] == "opps":
+                self.bus.put((shard,) + tuple(msg[1:]))
+        with self._ready:
+            if self.conns.get(shard) is conn:
+                del self.conns[shard]
+        if not self._closed:
+            logger.warning(f"⚠️  Shard {shard} terputus")
+
+    # ─── EDARAN ────────────────────────────────────────────
+
+    def partition(self, markets: List[dict]) -> Dict[int, List[dict]]:
+        """Pasaran setiap pekerja yang bersambung (shard tanpa pekerja → giliran)."""
+        with self._ready:
+            live = sorted(self.conns)
+        if not live:
+            raise RuntimeError("Tiada pekerja shard bersambung")
+        parts: Dict[int, List[dict]] = {shard: [] for shard in live}
+        owner = {i: (i if i in parts else live[i % len(live)]) for i in range(self.shards)}
+        for m in markets:
+            parts[owner[shard_of(m, self.shards)]].append(m)
+        return parts
+
+    def _send(self, shard: int, msg: tuple) -> bool:
+        conn = self.conns.get(shard)
+        try:
+            conn.send(msg)
+            return True
+        except (AttributeError, OSError, ValueError) as e:
+            logger.warning(f"⚠️  Gagal hantar ke shard {shard}: {e}")
+            return False
+
+    def scan(self, trade_size: float,
+             markets: Optional[List[dict]] = None) -> List[ArbitrageOpportunity]:
+        """
+        Satu kitaran. Lalai: setiap pekerja ambil halaman /markets sendiri
+        (halaman slot, slot+N, ...) — penyelaras tidak ambil atau pickle
+        senarai. Dengan `markets` (atau TAPE_FILE, yang perlukan senarai
+        dalam satu proses penulis) penyelaras edar pasaran ikut event.
+        """
+        logger.info(f"\n🔍 MULA SCAN BERSHARD | {len(self.conns)} pekerja | Trade: ${trade_size}")
+        start = time.perf_counter()
+        from tape import get_recorder
+        recorder = get_recorder()
+        if markets is None and recorder:
+            markets = [m for m in fetch_negrisk_markets() if m.get("id")]
+        if recorder and markets is not None:
+            recorder.record_markets(markets)
+
+        self._cycle += 1
+        cycle = self._cycle
+        if markets is None:
+            with self._ready:
+                live = sorted(self.conns)
+            if not live:
+                raise RuntimeError("Tiada pekerja shard bersambung")
+            pending = {shard for slot, shard in enumerate(live)
+                       if self._send(shard, ("fetch", cycle, slot, len(live), trade_size))}
+        else:
+            pending = {shard for shard, part in self.partition(markets).items()
+                       if self._send(shard, ("scan", cycle, part, trade_size))}
+
+        found, scanned = [], 0
+        deadline = time.time() + self.timeout
+        while pending:
+            try:
+                shard, got, opps, stats = self.bus.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                logger.warning(f"⚠️  Shard {sorted(pending)} tiada jawapan dalam {self.timeout}s")
+                break
+            if got != cycle:
+                continue                     # jawapan lewat kitaran lepas
+            pending.discard(shard)
+            found.extend(opps)
+            scanned += stats["markets"]
+            logger.info(f"  🧩 Shard {shard}: {len(opps)} peluang / {stats['markets']} pasaran "
+                        f"({stats['seconds']:.2f}s)")
+
+        logger.info(f"✅ Scan bershard selesai: {len(found)} peluang dari {scanned} pasaran "
+                    f"({time.perf_counter() - start:.2f}s)")
+        return found
+
+    def stream(self, markets: List[dict], trade_size: float):
+        """Mulakan / kemas kini stream setiap pekerja dengan pasaran shardnya."""
+        self.asset_ids = [t["token_id"] for m in markets for t in listing_tokens(m) or []
+                          if t.get("token_id")]
+        for shard, part in self.partition(markets).items():
+            self._send(shard, ("stream", part, trade_size))
+
+    def dispatch(self, on_opportunity: Callable[[ArbitrageOpportunity], None]):
+        """Thread yang menghantar setiap peluang dari bas ke `on_opportunity`."""
+        def _loop():
+            while not self._closed:
+                try:
+                    _, _, opps, _ = self.bus.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                for opp in opps:
+                    on_opportunity(opp)
+
+        threading.Thread(target=_loop, name="shard-dispatch", daemon=True).start()
+
+    def stop(self):
+        self._closed = True
+        for shard in list(self.conns):
+            self._send(shard, ("stop",))
+        for p in self.processes:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        for conn in list(self.conns.values()):
+            conn.close()
+        if self._listener:
+            self._listener.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pekerja shard (sambung ke penyelaras main.py)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("worker")
+    w.add_argument("--connect", default=f"{SHARD_ADDRESS[0]}:{SHARD_ADDRESS[1]}",
+                   help="host:port penyelaras")
+    w.add_argument("--shard", type=int, required=True)
+    w.add_argument("--shards", type=int, default=SHARD_WORKERS)
+    args = ap.parse_args()
+    address = _parse_address(args.connect)
+    check_authkey(address[0], SHARD_AUTHKEY)
+    run_worker(address, SHARD_AUTHKEY.encode(), args.shard, args.shards)
+
+
+if __name__ == "__main__":
+    main()
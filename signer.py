@@ -0,0 +1,147 @@
+# ============================================================
+#  signer.py — KOLAM TANDATANGAN ORDER + TEMPLAT ORDER
+#  Tick size, neg_risk & fee setiap token disediakan lebih awal;
+#  semasa keputusan hanya harga & jumlah diisi, kemudian ditandatangan
+# ============================================================
+
+import math
+import time
+import logging
+import threading
+import metrics
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from config import SIGNING_WORKERS, TEMPLATE_WORKERS, ORDER_TEMPLATE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+try:
+    from py_clob_client.clob_types import (
+        MarketOrderArgs, CreateOrderOptions, PartialCreateOrderOptions, OrderType
+    )
+    CLOB_AVAILABLE = True
+except ImportError:
+    CLOB_AVAILABLE = False
+
+
+@dataclass
+class OrderTemplate:
+    token_id: str
+    tick_size: str
+    neg_risk: bool
+    fee_rate_bps: int
+    prepared_at: float
+
+
+def round_to_tick(price: float, tick_size: str, side: str) -> float:
+    """BUY dibundar ke atas, SELL ke bawah (menjauhi mid) — had FOK tidak lebih ketat
+    dari paras terburuk yang perlu disapu."""
+    tick  = float(tick_size)
+    steps = price / tick
+    steps = math.ceil(steps - 1e-9) if side == "BUY" else math.floor(steps + 1e-9)
+    return round(min(max(steps * tick, tick), 1.0 - tick), len(tick_size))
+
+
+class OrderSigner:
+    """
+    Tandatangan order EIP-712 dalam thread pool, di luar laluan kritikal.
+
+    prepare() mengambil metadata token (HTTP) lebih awal. sign() kemudian
+    hanya isi harga & jumlah dan tandatangan secara tempatan — tiada
+    request tick size / neg_risk / order book semasa keputusan.
+
+    Prefetch guna kolam SENDIRI (`template_workers` thread): ribuan token
+    yang dijejak mod stream tidak pernah beratur di depan sign_all().
+    Setiap token hanya dibaris gilir sekali hingga templatnya siap.
+    """
+
+    def __init__(self, client, workers: int = SIGNING_WORKERS,
+                 template_workers: int = TEMPLATE_WORKERS,
+                 ttl: float = ORDER_TEMPLATE_TTL_SECONDS):
+        self.client    = client
+        self.ttl       = ttl
+        self.pool      = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="signer")
+        self.prefetch_pool = ThreadPoolExecutor(max_workers=max(1, template_workers),
+                                                thread_name_prefix="template")
+        self.templates: Dict[str, OrderTemplate] = {}
+        self._pending: Set[str] = set()        # token dalam baris gilir prefetch
+        self._lock     = threading.Lock()
+
+    # ─── TEMPLAT ───────────────────────────────────────────
+
+    def _build_template(self, token_id: str) -> OrderTemplate:
+        tpl = OrderTemplate(
+            token_id=token_id,
+            tick_size=str(self.client.get_tick_size(token_id)),
+            neg_risk=bool(self.client.get_neg_risk(token_id)),
+            fee_rate_bps=int(self.client.get_fee_rate_bps(token_id) or 0),
+            prepared_at=time.time(),
+        )
+        with self._lock:
+            self.templates[token_id] = tpl
+        return tpl
+
+    def template(self, token_id: str) -> OrderTemplate:
+        tpl = self.templates.get(token_id)
+        if tpl is None or time.time() - tpl.prepared_at > self.ttl:
+            tpl = self._build_template(token_id)
+        return tpl
+
+    def prepare(self, token_ids: Iterable[str]) -> List[Future]:
+        """Sediakan templat di latar belakang (kolam prefetch) untuk token yang dijejak."""
+        now = time.time()
+        with self._lock:
+            stale = [t for t in set(token_ids) if t not in self._pending and (
+                     t not in self.templates or now - self.templates[t].prepared_at > self.ttl)]
+            self._pending.update(stale)
+        return [self.prefetch_pool.submit(self._safe_build, t) for t in stale]
+
+    def _safe_build(self, token_id: str):
+        try:
+            self._build_template(token_id)
+        except Exception as e:
+            logger.debug("Gagal sediakan templat %s: %s", token_id, e)
+        finally:
+            with self._lock:
+                self._pending.discard(token_id)
+
+    # ─── TANDATANGAN ───────────────────────────────────────
+
+    def sign(self, token_id: str, amount: float, side: str, price: Optional[float]):
+        """Isi harga & jumlah pada templat dan tandatangan (tanpa HTTP jika templat sedia).
+
+        price = had FOK: paras terburuk book yang perlu disapu (Outcome.limit_price),
+        BUKAN VWAP / mid — order dengan had itu tidak dapat mengisi paras terakhir.
+        None = klien CLOB kira harga boleh-pasaran dari book (satu request HTTP).
+        """
+        with metrics.timer("order_sign_seconds"):
+            return self._sign(token_id, amount, side, price)
+
+    def _sign(self, token_id: str, amount: float, side: str, price: Optional[float]):
+        tpl  = self.template(token_id)
+        if not price:
+            price = self.client.calculate_market_price(token_id, side, amount, OrderType.FOK)
+        args = MarketOrderArgs(
+            token_id=token_id,
+            amount=amount,
+            side=side,
+            price=round_to_tick(price, tpl.tick_size, side),
+            fee_rate_bps=tpl.fee_rate_bps,
+        )
+        builder = getattr(self.client, "builder", None)
+        if builder is not None:
+            return builder.create_market_order(
+                args, CreateOrderOptions(tick_size=tpl.tick_size, neg_risk=tpl.neg_risk))
+        return self.client.create_market_order(
+            args, PartialCreateOrderOptions(tick_size=tpl.tick_size, neg_risk=tpl.neg_risk))
+
+    def sign_all(self, legs: List[Tuple[str, float, str, float]]) -> list:
+        """Tandatangan semua kaki serentak: legs = [(token_id, amount, "BUY"/"SELL", had harga)]."""
+        futures = [self.pool.submit(self.sign, *leg) for leg in legs]
+        return [f.result() for f in futures]
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
+        self.prefetch_pool.shutdown(wait=False, cancel_futures=True)
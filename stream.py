@@ -0,0 +1,230 @@
+# ============================================================
+#  stream.py — HARGA MASA NYATA DARI WEBSOCKET CLOB
+#  Semak arbitrage serta-merta bila harga token berubah
+# ============================================================
+
+import json
+import asyncio
+import time
+import logging
+import metrics
+from log_setup import SAMPLED
+from typing import Callable, Dict, Iterable, List, Set
+from config import CLOB_WS_URL, DEPTH_CHECK, EVENT_ARBS, MIN_PROFIT_THRESHOLD
+from scanner import ArbitrageOpportunity
+from orderbook import BookStore, evaluate_depth
+from event_index import EventIndex
+from market_table import MarketTable
+from tape import get_recorder
+
+logger = logging.getLogger(__name__)
+
+try:
+    import websockets
+    from websockets.exceptions import WebSocketException
+    WS_AVAILABLE = True
+except ImportError:
+    WS_AVAILABLE = False
+    logger.warning("⚠️  Jalankan: pip install websockets")
+
+PING_INTERVAL   = 10      # Polymarket tutup sambungan tanpa PING ~10 saat
+RECONNECT_MIN   = 1.0
+RECONNECT_MAX   = 30.0
+
+
+class MarketStream:
+    """
+    Langgan channel `market` CLOB untuk semua token yang dijejak.
+
+    Setiap mesej hanya menyentuh beberapa token; harga diubah di tempat dalam
+    MarketTable (tick integer) dan pasaran yang tersentuh sahaja dinilai
+    semula — peluang terus dihantar ke `on_opportunity`.
+    Sambungan yang putus akan disambung & dilanggan semula (backoff).
+    """
+
+    def __init__(self, trade_size: float,
+                 on_opportunity: Callable[[ArbitrageOpportunity], None],
+                 url: str = CLOB_WS_URL, record: bool = True):
+        self.url            = url
+        self.trade_size     = trade_size
+        self.threshold      = MIN_PROFIT_THRESHOLD
+        self.on_opportunity = on_opportunity
+        self.table      = MarketTable()
+        self.token_ix: Dict[str, int] = {}              # token_id → indeks token dalam jadual
+        self.books      = BookStore()
+        self.events     = EventIndex()
+        self.messages   = 0
+        self.reconnects = 0
+        self._ws        = None
+        self._stopped   = False
+        self._touched_events: Set[str] = set()
+        self.recorder   = get_recorder() if record else None
+
+    # ─── UNIVERSE ──────────────────────────────────────────
+
+    def set_markets(self, markets: Iterable[dict]):
+        """Tetapkan pasaran yang dijejak (payload senarai Gamma /markets)."""
+        markets = list(markets)
+        table   = MarketTable.from_markets(markets)
+        index   = table.token_index()
+
+        changed = set(index) != set(self.token_ix)
+        self.table, self.token_ix = table, index
+        self.events = EventIndex.build(markets)
+        if self.recorder:
+            self.recorder.record_markets(markets)
+        logger.info(f"📡 Stream menjejak {len(table)} pasaran / {len(index)} token")
+
+        # Token baru → sambung semula supaya langganan dihantar semula
+        if changed and self._ws is not None:
+            asyncio.ensure_future(self._ws.close())
+
+    @property
+    def asset_ids(self) -> List[str]:
+        return list(self.token_ix)
+
+    # ─── MESEJ ─────────────────────────────────────────────
+
+    def apply_price(self, asset_id: str, price: float,
+                    touched: Set[int]):
+        """Ubah satu harga di tempat (O(1)); `touched` terima indeks pasaran yang berubah."""
+        if price <= 0:
+            return
+        m = self.table.update(asset_id, price)
+        if m is None:
+            return
+        touched.add(m)
+        if self.recorder:
+            self.recorder.record(asset_id, price)
+        group = self.events.update(asset_id, price)
+        if group is not None:
+            self._touched_events.add(group.event_id)
+
+    def handle_message(self, raw: str) -> List[ArbitrageOpportunity]:
+        """Proses satu mesej WebSocket; pulangkan peluang pada pasaran tersentuh."""
+        if raw in ("PONG", ""):
+            return []
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            logger.debug("Mesej WS bukan JSON: %.80s", raw)
+            return []
+
+        touched: Set[int] = set()
+        self._touched_events = set()
+        for ev in payload if isinstance(payload, list) else [payload]:
+            try:
+                self._apply_event(ev, touched)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                # Satu acara rosak (cth. size bukan nombor) — langkau, teruskan yang lain
+                metrics.inc("stream_bad_events_total")
+                logger.warning("⚠️  Acara WS rosak dilangkau (%s): %.120s", e, ev,
+                               extra=SAMPLED)
+        self.messages += 1
+        return self.evaluate(touched)
+
+    def evaluate(self, touched: Set[int],
+                 depth_check: bool = DEPTH_CHECK) -> List[ArbitrageOpportunity]:
+        """Nilai pasaran (indeks jadual) & event yang tersentuh sejak penilaian terakhir."""
+        eval_start = time.perf_counter()
+        candidates = self.table.evaluate(self.trade_size, self.threshold, markets=touched)
+        if EVENT_ARBS:
+            for event_id in self._touched_events:
+                candidates.append(self.events.check(self.events.events[event_id],
+                                                    self.trade_size, self.threshold))
+
+        found = []
+        for opp in candidates:
+            # Harga tengah hanya penapis kasar — sahkan dengan kedalaman book
+            if opp and depth_check:
+                opp = evaluate_depth(opp, self.books)
+            if opp:
+                found.append(opp)
+        metrics.observe("scan_evaluate_seconds", time.perf_counter() - eval_start,
+                        mode="stream")
+        return found
+
+    def _apply_event(self, ev: dict, touched: Set[int]):
+        etype = ev.get("event_type")
+
+        if etype == "book":
+            asset_id = ev.get("asset_id", "")
+            self.books.apply_snapshot(asset_id, ev.get("bids", []), ev.get("asks", []))
+            book = self.books.get(asset_id)
+            if book.best_bid is not None and book.best_ask is not None:
+                self.apply_price(asset_id,
+                                round((book.best_bid + book.best_ask) / 2, 6), touched)
+
+        elif etype == "price_change":
+            changes = ev.get("price_changes") or ev.get("changes") or []
+            for c in changes:
+                asset_id = c.get("asset_id") or ev.get("asset_id", "")
+                if c.get("side") and c.get("size") is not None:
+                    self.books.apply_delta(asset_id, c["side"],
+                                           float(c.get("price", 0)), float(c["size"]))
+                best_bid, best_ask = c.get("best_bid"), c.get("best_ask")
+                if best_bid and best_ask:
+                    price = (float(best_bid) + float(best_ask)) / 2
+                else:
+                    price = float(c.get("price", 0))
+                self.apply_price(asset_id, round(price, 6), touched)
+
+        elif etype == "last_trade_price":
+            self.apply_price(ev.get("asset_id", ""),
+                            float(ev.get("price", 0)), touched)
+
+    # ─── SAMBUNGAN ─────────────────────────────────────────
+
+    async def _pinger(self, ws):
+        while True:
+            await asyncio.sleep(PING_INTERVAL)
+            await ws.send("PING")
+
+    async def _session(self):
+        async with websockets.connect(self.url, ping_interval=None) as ws:
+            self._ws = ws
+            await ws.send(json.dumps({"assets_ids": self.asset_ids,
+                                      "type": "market"}))
+            logger.info(f"✅ Stream disambung: {self.url} ({len(self.token_ix)} token)")
+            pinger = asyncio.ensure_future(self._pinger(ws))
+            try:
+                async for raw in ws:
+                    try:
+                        opps = self.handle_message(raw)
+                    except Exception as e:
+                        metrics.inc("stream_bad_events_total")
+                        logger.warning("⚠️  Gagal proses mesej WS (%s): %.120s", e, raw,
+                                       extra=SAMPLED)
+                        continue
+                    for opp in opps:
+                        logger.info("  ⚡ [%s] %.50s... | Spread: %.2f%%",
+                                    opp.arb_type, opp.market_question,
+                                    opp.expected_profit_pct * 100, extra=SAMPLED)
+                        self.on_opportunity(opp)
+            finally:
+                pinger.cancel()
+                self._ws = None
+
+    async def run(self):
+        """Jalankan stream sehingga stop() dipanggil — sambung semula bila putus."""
+        if not WS_AVAILABLE:
+            raise RuntimeError("websockets tidak dipasang")
+        delay = RECONNECT_MIN
+        while not self._stopped:
+            try:
+                await self._session()
+                delay = RECONNECT_MIN
+            except (WebSocketException, OSError, asyncio.TimeoutError) as e:
+                # Termasuk jabat tangan ditolak (InvalidStatus 429/503) — cuba semula
+                logger.warning(f"⚠️  Stream terputus: {e}")
+            if self._stopped:
+                break
+            self.reconnects += 1
+            logger.info(f"🔄 Sambung semula dalam {delay:.0f}s...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    async def stop(self):
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
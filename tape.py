@@ -0,0 +1,330 @@
+# ============================================================
+#  tape.py — PERAKAM PITA HARGA (BINARI KOLUMNAR) + MAIN SEMULA
+#  Setiap pemerhatian harga (masa, token, harga, kedalaman) ditulis
+#  ke fail binari oleh thread latar belakang; main semula guna mmap
+#  tanpa salinan dan suap kod penilaian yang sama seperti mod stream
+# ============================================================
+
+import os
+import json
+import math
+import mmap
+import time
+import atexit
+import struct
+import logging
+import threading
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config import TAPE_FILE, TAPE_FLUSH_SECONDS, TAPE_CHANGES_ONLY
+from scanner import (
+    SCALE, ArbitrageOpportunity, listing_tokens, negrisk_event_id, negrisk_event_size,
+    to_ticks
+)
+
+logger = logging.getLogger(__name__)
+
+# ─── FORMAT ────────────────────────────────────────────────
+# Fail = blok berturutan. Setiap blok:
+#   kepala 16 bait: magic "PTAP", versi u16, rizab u16, baris u32, rizab u32
+#   lajur:  masa f64[n] | token u32[n] | harga i32[n] (tick mikro, scanner.SCALE) | kedalaman f32[n]
+#   pad hingga gandaan 8 bait (lajur f64 blok seterusnya kekal sejajar)
+#   lajur dalam susunan bait natif (little-endian pada x86/ARM)
+# Jadual simbol (indeks token → token id, pasaran, event) dalam fail
+# sisi "<pita>.sym", satu baris JSON setiap token.
+
+MAGIC   = b"PTAP"
+VERSION = 1
+HEADER  = struct.Struct("<4sHHII")
+ROW_BYTES = 8 + 4 + 4 + 4
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+@dataclass
+class Symbol:
+    ix: int
+    token_id: str
+    market_id: str = ""
+    question: str = ""
+    outcome: str = ""
+    event_id: str = ""
+    event_size: int = 0
+
+
+def load_symbols(path: str) -> List[Symbol]:
+    symbols = []
+    if os.path.exists(path + ".sym"):
+        with open(path + ".sym", encoding="utf-8") as f:
+            symbols = [Symbol(**json.loads(line)) for line in f if line.strip()]
+    return symbols
+
+
+# ─── PERAKAM ───────────────────────────────────────────────
+
+class TapeRecorder:
+    """
+    Perakam pita tambah-sahaja.
+
+    record() / record_markets() hanya menambah ke deque (O(1), selamat
+    thread) — penghuraian, pengekodan & tulisan cakera berlaku dalam
+    thread latar belakang setiap `flush_seconds`.
+    changes_only=True = langkau token yang harganya sama dengan rekod terakhir.
+    """
+
+    def __init__(self, path: str, flush_seconds: float = TAPE_FLUSH_SECONDS,
+                 changes_only: bool = TAPE_CHANGES_ONLY):
+        self.path          = path
+        self.flush_seconds = flush_seconds
+        self.changes_only  = changes_only
+        self.rows          = 0
+        self.symbols: Dict[str, int] = {s.token_id: s.ix for s in load_symbols(path)}
+        self._new_symbols: List[Symbol] = []
+        self._last: Dict[int, int] = {}
+        self._queue: deque = deque()
+        self._stop  = threading.Event()
+        self._io_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="tape-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"📼 Rakam pita harga ke {path}")
+
+    # ─── LALUAN PANAS ──────────────────────────────────────
+
+    def record(self, token_id: str, price: float, depth: float = math.nan,
+               ts: Optional[float] = None):
+        """Satu pemerhatian harga (cth. dari WebSocket)."""
+        self._queue.append((ts or time.time(), token_id, price, depth))
+
+    def record_markets(self, markets: List[dict], ts: Optional[float] = None):
+        """Semua harga dalam payload senarai /markets — dihurai di thread penulis."""
+        self._queue.append((ts or time.time(), None, markets, None))
+
+    # ─── THREAD PENULIS ────────────────────────────────────
+
+    def _symbol(self, token_id: str, market: Optional[dict] = None,
+                outcome: str = "") -> int:
+        ix = self.symbols.get(token_id)
+        if ix is None:
+            ix = self.symbols[token_id] = len(self.symbols)
+            sym = Symbol(ix, token_id)
+            if market is not None:
+                sym.market_id = market.get("id", "")
+                sym.question  = market.get("question", "")
+                sym.outcome   = outcome
+                sym.event_id  = negrisk_event_id(market)
+                sym.event_size = negrisk_event_size(market)
+            self._new_symbols.append(sym)
+        return ix
+
+    def _encode(self, items) -> Tuple[array, array, array, array]:
+        ts, tok, px, dp = array("d"), array("I"), array("i"), array("f")
+
+        def _row(t, ix, price, depth):
+            micro = to_ticks(price)
+            if self.changes_only and self._last.get(ix) == micro and math.isnan(depth):
+                return
+            self._last[ix] = micro
+            ts.append(t)
+            tok.append(ix)
+            px.append(micro)
+            dp.append(depth)
+
+        for t, token_id, payload, depth in items:
+            if token_id is not None:
+                _row(t, self._symbol(token_id), payload, depth)
+                continue
+            for m in payload:
+                for tk in listing_tokens(m) or []:
+                    if tk.get("token_id"):
+                        ix = self._symbol(tk["token_id"], m, tk.get("outcome", ""))
+                        _row(t, ix, float(tk.get("price") or 0), math.nan)
+        return ts, tok, px, dp
+
+    def flush(self):
+        with self._io_lock:
+            items = [self._queue.popleft() for _ in range(len(self._queue))]
+            if not items:
+                return
+            ts, tok, px, dp = self._encode(items)
+            if self._new_symbols:
+                with open(self.path + ".sym", "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(s.__dict__) + "\n" for s in self._new_symbols)
+                self._new_symbols = []
+            n = len(ts)
+            if not n:
+                return
+            body = HEADER.size + n * ROW_BYTES
+            with open(self.path, "ab") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, 0, n, 0))
+                for column in (ts, tok, px, dp):
+                    f.write(column)
+                f.write(b"\0" * (_padded(body) - body))
+            self.rows += n
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ Gagal tulis pita: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+
+_recorder: Optional[TapeRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder() -> Optional[TapeRecorder]:
+    """Perakam bersama jika TAPE_FILE ditetapkan, jika tidak None."""
+    global _recorder
+    if not TAPE_FILE:
+        return None
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = TapeRecorder(TAPE_FILE)
+            atexit.register(_recorder.close)
+    return _recorder
+
+
+# ─── PEMBACA (MMAP, TANPA SALINAN) ─────────────────────────
+
+@dataclass
+class TapeBlock:
+    """Lajur satu blok sebagai memoryview atas mmap — tiada salinan data."""
+    ts: memoryview
+    token: memoryview
+    price: memoryview
+    depth: memoryview
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+class TapeReader:
+    """
+    Baca pita melalui mmap. blocks() memberi memoryview setiap lajur
+    (boleh terus dibungkus numpy.frombuffer); iterasi baris memberi
+    (masa, indeks token, harga, kedalaman).
+    """
+
+    def __init__(self, path: str):
+        self.path    = path
+        self.symbols = load_symbols(path)
+        self._file   = open(path, "rb")
+        size         = os.fstat(self._file.fileno()).st_size
+        self._mmap   = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view   = memoryview(self._mmap) if self._mmap else memoryview(b"")
+
+    def blocks(self) -> Iterator[TapeBlock]:
+        view, offset = self._view, 0
+        while offset + HEADER.size <= len(view):
+            magic, version, _, n, _ = HEADER.unpack_from(view, offset)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Pita rosak pada bait {offset}")
+            o = offset + HEADER.size
+            if o + n * ROW_BYTES > len(view):
+                logger.warning(f"⚠️  Blok terakhir tidak lengkap pada bait {offset}")
+                return
+            yield TapeBlock(ts=view[o:o + 8 * n].cast("d"),
+                            token=view[o + 8 * n:o + 12 * n].cast("I"),
+                            price=view[o + 12 * n:o + 16 * n].cast("i"),
+                            depth=view[o + 16 * n:o + 20 * n].cast("f"))
+            offset += _padded(HEADER.size + n * ROW_BYTES)
+
+    def __iter__(self) -> Iterator[Tuple[float, int, float, float]]:
+        for block in self.blocks():
+            for t, ix, micro, depth in zip(block.ts, block.token, block.price, block.depth):
+                yield t, ix, micro / SCALE, depth
+
+    @property
+    def rows(self) -> int:
+        return sum(len(b) for b in self.blocks())
+
+    def markets(self) -> List[dict]:
+        """Bina semula payload senarai /markets (harga kosong) dari jadual simbol."""
+        by_market: Dict[str, dict] = {}
+        for s in self.symbols:
+            if not s.market_id:
+                continue
+            m = by_market.setdefault(s.market_id, {
+                "id": s.market_id, "question": s.question,
+                "negRiskMarketID": s.event_id, "negRiskEventSize": s.event_size,
+                "tokens": []})
+            m["tokens"].append({"outcome": s.outcome, "token_id": s.token_id, "price": 0.0})
+        return list(by_market.values())
+
+    def close(self):
+        try:
+            self._view.release()
+            if self._mmap:
+                self._mmap.close()
+        except BufferError:
+            logger.debug("Pita masih dirujuk oleh memoryview — mmap ditutup oleh GC")
+        self._file.close()
+
+
+# ─── MAIN SEMULA KE PENILAI ────────────────────────────────
+
+def replay(path: str, trade_size: float,
+           on_opportunity: Callable[[ArbitrageOpportunity], None],
+           speed: float = 0.0, threshold: Optional[float] = None) -> dict:
+    """
+    Suap pita ke penilai MarketStream (kod yang sama dengan mod stream).
+    Baris dengan masa yang sama (satu scan / satu mesej) dinilai bersama.
+    speed=0 = selaju mungkin; speed=10 = 10x masa sebenar.
+    threshold = ganti MIN_PROFIT_THRESHOLD (cth. nilai terendah dalam sapuan backtest).
+    detected_at setiap peluang = masa dalam pita.
+    """
+    from stream import MarketStream      # import lewat — stream mengimport modul ini
+
+    reader = TapeReader(path)
+    stream = MarketStream(trade_size, on_opportunity, url="", record=False)
+    if threshold is not None:
+        stream.threshold = threshold
+    stream.set_markets(reader.markets())
+    token_ids = [s.token_id for s in reader.symbols]
+
+    start, found, rows = time.perf_counter(), 0, 0
+    first_ts, group_ts = None, None
+    touched: set = set()
+
+    def _evaluate(ts):
+        nonlocal found
+        for opp in stream.evaluate(touched, depth_check=False):
+            opp.detected_at = ts
+            on_opportunity(opp)
+            found += 1
+        touched.clear()
+        stream._touched_events = set()
+
+    for ts, ix, price, _ in reader:
+        if ts != group_ts:
+            if group_ts is not None:
+                _evaluate(group_ts)
+            if speed and first_ts is not None:
+                lag = (ts - first_ts) / speed - (time.perf_counter() - start)
+                if lag > 0:
+                    time.sleep(lag)
+            first_ts = first_ts if first_ts is not None else ts
+            group_ts = ts
+        stream.apply_price(token_ids[ix], price, touched)
+        rows += 1
+    if group_ts is not None:
+        _evaluate(group_ts)
+    reader.close()
+
+    elapsed = time.perf_counter() - start
+    span    = (group_ts - first_ts) if first_ts is not None else 0.0
+    return {"rows": rows, "opportunities": found, "seconds": elapsed,
+            "tape_seconds": span, "speedup": span / elapsed if elapsed else 0.0}
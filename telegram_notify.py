@@ -3,10 +3,18 @@
 #  Semua notifikasi bot dihantar melalui fail ini
 # ============================================================
 
-import requests
+import re
+import time
+import atexit
 import logging
+import threading
+import http_client
+from collections import deque
 from datetime import datetime
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from config import (
+    TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_QUEUE_SIZE,
+    TELEGRAM_MIN_INTERVAL, TELEGRAM_COALESCE_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,17 +34,122 @@ EMOJI = {
     "dryrun":    "🔵",
 }
 
+# Keutamaan mesej — LOW dibuang dahulu bila baris gilir penuh
+HIGH = 0
+LOW  = 1
 
-def send_telegram(message: str, silent: bool = False) -> bool:
+TELEGRAM_MAX_CHARS = 4000   # Had Telegram 4096 aksara setiap mesej
+
+_TAG = re.compile(r"<(/?)([a-zA-Z]+)[^>]*>")
+
+
+def truncate_html(message: str, limit: int = TELEGRAM_MAX_CHARS) -> str:
     """
-    Hantar mesej ke Telegram.
-    silent=True = notifikasi tanpa bunyi (untuk update biasa)
+    Potong mesej parse_mode=HTML tanpa merosakkannya: buang tag / entiti
+    (&amp; ...) yang terpotong separuh, kemudian tutup tag yang masih terbuka.
     """
-    if TELEGRAM_BOT_TOKEN == "ISI_TOKEN_BOT_TELEGRAM_ANDA":
-        logger.warning("Telegram belum dikonfigurasikan dalam config.py")
-        return False
+    if len(message) <= limit:
+        return message
+    cut = message[:limit - 20]                    # ruang untuk "…" + tag penutup
+    if cut.rfind("<") > cut.rfind(">"):
+        cut = cut[:cut.rfind("<")]
+    if cut.rfind("&") > cut.rfind(";"):
+        cut = cut[:cut.rfind("&")]
+    open_tags = []
+    for m in _TAG.finditer(cut):
+        closing, name = m.group(1), m.group(2).lower()
+        if not closing:
+            open_tags.append(name)
+        elif name in open_tags:
+            del open_tags[len(open_tags) - 1 - open_tags[::-1].index(name)]
+    return cut + "…" + "".join(f"</{t}>" for t in reversed(open_tags))
+
+
+class TelegramSender:
+    """
+    Penghantar Telegram tak-menyekat: mesej masuk baris gilir terhad dan
+    dihantar oleh satu thread latar belakang melalui transport HTTP bersama.
+
+    - Mesej yang tiba hampir serentak (cth. semua kaki satu trade)
+      digabung menjadi satu mesej.
+    - Jarak minimum antara mesej & `retry_after` (HTTP 429) dipatuhi.
+    - Bila baris gilir penuh, mesej LOW dibuang dan diringkaskan.
+    """
+
+    def __init__(self, maxsize: int = TELEGRAM_QUEUE_SIZE,
+                 min_interval: float = TELEGRAM_MIN_INTERVAL,
+                 coalesce: float = TELEGRAM_COALESCE_SECONDS):
+        self.queues       = {HIGH: deque(), LOW: deque()}
+        self.maxsize      = maxsize
+        self.min_interval = min_interval
+        self.coalesce     = coalesce
+        self.dropped      = 0
+        self._cond        = threading.Condition()
+        self._thread      = None
+        self._last_sent   = 0.0
+        self._busy        = False
+
+    def submit(self, message: str, silent: bool, priority: int) -> bool:
+        with self._cond:
+            if sum(len(q) for q in self.queues.values()) >= self.maxsize:
+                if priority == LOW or not self.queues[LOW]:
+                    self.dropped += 1
+                    return False
+                self.queues[LOW].popleft()      # beri ruang kepada mesej penting
+                self.dropped += 1
+            self.queues[priority].append((message, silent))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="telegram",
+                                                daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return True
+
+    def _next_batch(self):
+        """Ambil mesej tertunda dengan keutamaan sama & gabungkan (≤ had aksara)."""
+        for priority in (HIGH, LOW):
+            q = self.queues[priority]
+            if not q:
+                continue
+            parts, silent = [], True
+            size = 0
+            while q and size + len(q[0][0]) < TELEGRAM_MAX_CHARS:
+                msg, msg_silent = q.popleft()
+                parts.append(msg)
+                size  += len(msg) + 2
+                silent = silent and msg_silent
+            if not parts:                       # satu mesej melebihi had
+                msg, silent = q.popleft()
+                parts.append(truncate_html(msg))
+            return "\n\n".join(parts), silent
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not any(self.queues.values()):
+                    self._busy = False
+                    self._cond.notify_all()
+                    self._cond.wait()
+                self._busy = True
+
+            # Tunggu sekejap supaya letusan mesej dapat digabung
+            time.sleep(self.coalesce)
+            wait = self._last_sent + self.min_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
 
-    try:
+            with self._cond:
+                batch   = self._next_batch()
+                dropped, self.dropped = self.dropped, 0
+            if batch is None:
+                continue
+            message, silent = batch
+            if dropped:
+                message += f"\n\n{EMOJI['warning']} {dropped} notifikasi kecil dilangkau (baris gilir penuh)"
+            self._post(message, silent)
+
+    def _post(self, message: str, silent: bool):
         url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         payload = {
             "chat_id": TELEGRAM_CHAT_ID,
@@ -44,13 +157,55 @@ def send_telegram(message: str, silent: bool = False) -> bool:
             "parse_mode": "HTML",
             "disable_notification": silent
         }
-        response = requests.post(url, json=payload, timeout=10)
-        return response.status_code == 200
+        for _ in range(3):
+            try:
+                response = http_client.post(url, json=payload, timeout=10)
+                self._last_sent = time.time()
+                if response.status_code != 429:
+                    return response.status_code == 200
+                # Had kadar Telegram — patuhi retry_after
+                retry = response.json().get("parameters", {}).get("retry_after", 1)
+                logger.warning(f"Telegram had kadar — tunggu {retry}s")
+                time.sleep(float(retry))
+            except Exception as e:
+                logger.warning(f"Gagal hantar Telegram: {e}")
+                return False
+        return False
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Tunggu baris gilir kosong (cth. sebelum bot berhenti)."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while any(self.queues.values()) or self._busy:
+                remaining = deadline - time.time()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+_sender = TelegramSender()
+atexit.register(_sender.flush, 5.0)
 
-    except Exception as e:
-        logger.warning(f"Gagal hantar Telegram: {e}")
+
+def send_telegram(message: str, silent: bool = False,
+                  priority: int = HIGH) -> bool:
+    """
+    Hantar mesej ke Telegram (tak-menyekat — masuk baris gilir).
+    silent=True = notifikasi tanpa bunyi (untuk update biasa)
+    priority=LOW = boleh dibuang bila baris gilir penuh
+    """
+    if TELEGRAM_BOT_TOKEN == "ISI_TOKEN_BOT_TELEGRAM_ANDA":
+        logger.warning("Telegram belum dikonfigurasikan dalam config.py")
         return False
 
+    return _sender.submit(message, silent, priority)
+
+
+def flush_telegram(timeout: float = 10.0) -> bool:
+    """Hantar semua mesej tertunda sebelum keluar."""
+    return _sender.flush(timeout)
+
 
 # ─── NOTIFIKASI SPESIFIK ───────────────────────────────────
 
@@ -83,7 +238,7 @@ def notify_opportunity_found(question: str, arb_type: str,
         f"{'━' * 28}\n"
         f"<b>Outcomes:</b>\n{outcome_lines}"
     )
-    send_telegram(msg)
+    send_telegram(msg, priority=LOW)
 
 
 def notify_order_executing(question: str, arb_type: str,
@@ -98,7 +253,7 @@ def notify_order_executing(question: str, arb_type: str,
         f"💵 Saiz    : <b>${trade_size:.2f} USDC</b>\n"
         f"⏰ {datetime.now().strftime('%H:%M:%S')}"
     )
-    send_telegram(msg)
+    send_telegram(msg, priority=LOW)
 
 
 def notify_limit_order_placed(question: str, outcome_name: str,
@@ -116,7 +271,26 @@ def notify_limit_order_placed(question: str, outcome_name: str,
         f"{'━' * 28}\n"
         f"⏳ Menunggu order untuk diisi..."
     )
-    send_telegram(msg)
+    send_telegram(msg, priority=LOW)
+
+
+def notify_legs_placed(question: str, side: str, legs: list,
+                       amount: float, dry_run: bool):
+    """Satu mesej untuk semua kaki trade (mod selari)."""
+    emoji = EMOJI['dryrun'] if dry_run else EMOJI['limit']
+    mode  = "[SIMULASI]" if dry_run else "[LIVE]"
+    leg_lines = "\n".join(
+        [f"   • {side} {name}: <b>${price:.4f}</b>" for name, price in legs]
+    )
+    msg = (
+        f"{emoji} <b>{mode} {len(legs)} ORDER DIHANTAR SERENTAK</b>\n"
+        f"{'━' * 28}\n"
+        f"📌 {question[:50]}...\n"
+        f"💵 Jumlah  : <b>${amount:.2f} USDC</b> setiap kaki\n"
+        f"{leg_lines}\n"
+        f"⏰ {datetime.now().strftime('%H:%M:%S')}"
+    )
+    send_telegram(msg, priority=LOW)
 
 
 def notify_trade_success(question: str, arb_type: str,
@@ -153,7 +327,7 @@ def notify_risk_rejected(question: str, reason: str):
         f"🛡️  Sebab  : {reason}\n"
         f"⏰ {datetime.now().strftime('%H:%M:%S')}"
     )
-    send_telegram(msg, silent=True)
+    send_telegram(msg, silent=True, priority=LOW)
 
 
 def notify_hourly_report(scan_count: int, opportunities_found: int,
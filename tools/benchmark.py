@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# ============================================================
+#  tools/benchmark.py — BENCHMARK SCANNER + EXECUTOR TANPA INTERNET
+#  Jalankan scan_all / scan inkremental / execute_opportunity terhadap
+#  pelayan palsu (tools/mock_polymarket.py) dan laporkan throughput,
+#  latency p50/p99 & memori:
+#    python tools/benchmark.py --sizes 1000 10000 50000 --latency 0.02
+#    python tools/benchmark.py --json baru.json --baseline lama.json
+#    python tools/benchmark.py --rate-limits   # kekalkan had kadar sebenar
+# ============================================================
+
+import os
+import sys
+import json
+import time
+import base64
+import logging
+import argparse
+import resource
+import tracemalloc
+from concurrent.futures import wait
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scanner
+import metrics
+import executor
+import orderbook
+import rate_limit
+import market_cache
+import telegram_notify
+from tools.mock_polymarket import MockPolymarket, synthetic_gamma_markets
+
+logger = logging.getLogger("benchmark")
+
+# Kunci ujian sahaja — order ditandatangan tetapi hanya dihantar ke pelayan palsu
+BENCH_KEY = "0x" + "11" * 32
+
+# Kadar/letusan baldi bila had kadar dimatikan — pelayan palsu tempatan tiada had
+UNLIMITED = 1e9
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summary(samples: List[float]) -> Dict[str, float]:
+    return {"p50_ms": percentile(samples, 50) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "runs": len(samples)}
+
+
+def point_at(url: str):
+    """Halakan semua modul ke pelayan palsu (modul import URL terus dari config)."""
+    scanner.GAMMA_API_URL      = url
+    market_cache.GAMMA_API_URL = url
+    orderbook.POLYMARKET_HOST  = url
+
+
+def unthrottle():
+    """Buka semua baldi had kadar — masa scan ukur kod, bukan pendikit RATE_LIMITS."""
+    for bucket in rate_limit.get_limiter().buckets.values():
+        bucket.base_rate = bucket.rate   = UNLIMITED
+        bucket.burst     = bucket.tokens = UNLIMITED
+
+
+def throttle_wait_s() -> float:
+    """Jumlah masa menunggu baldi had kadar setakat ini (histogram ratelimit_wait_seconds).
+    Dijumlah merentas benang fetch selari — boleh melebihi masa dinding scan."""
+    with metrics.REGISTRY._lock:
+        return sum(hist.total for (name, _), hist in metrics.REGISTRY.histograms.items()
+                   if name == "ratelimit_wait_seconds")
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+# ─── PERINGKAT ─────────────────────────────────────────────
+
+def bench_scan(server: MockPolymarket, repeat: int, trade_size: float) -> dict:
+    """scan_all penuh: masa setiap scan, pasaran/s, request/scan, tunggu had kadar, memori puncak."""
+    n = len(server.markets)
+    times, waits, opps = [], [], []
+    for _ in range(repeat):
+        before, waited = sum(server.requests.values()), throttle_wait_s()
+        t0 = time.perf_counter()
+        opps = scanner.scan_all(trade_size)
+        times.append(time.perf_counter() - t0)
+        waits.append(throttle_wait_s() - waited)
+        requests = sum(server.requests.values()) - before
+
+    tracemalloc.start()
+    scanner.scan_all(trade_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50 = percentile(times, 50)
+    return dict(summary(times), markets_per_s=n / p50 if p50 else 0.0,
+                requests_per_scan=requests, opportunities=len(opps),
+                throttle_ms=percentile(waits, 50) * 1000,
+                peak_alloc_mb=peak / (1024 * 1024)), opps
+
+
+def bench_incremental(server: MockPolymarket, repeat: int, trade_size: float,
+                      churn: float) -> dict:
+    """IncrementalScanner: scan sejuk sekali, kemudian scan panas dengan `churn` pasaran berubah."""
+    inc = market_cache.IncrementalScanner()
+    t0 = time.perf_counter()
+    inc.scan(trade_size)
+    cold = time.perf_counter() - t0
+
+    times = []
+    for _ in range(repeat):
+        server.mutate(churn)
+        t0 = time.perf_counter()
+        inc.scan(trade_size)
+        times.append(time.perf_counter() - t0)
+    return dict(summary(times), cold_ms=cold * 1000, churn_pct=churn * 100)
+
+
+def bench_execute(server: MockPolymarket, opps: list, count: int) -> Optional[dict]:
+    """execute_opportunity sebenar (sign + hantar) terhadap endpoint order palsu."""
+    try:
+        from py_clob_client.client import ClobClient
+        from py_clob_client.clob_types import ApiCreds
+    except ImportError:
+        logger.warning("⚠️  Jalankan: pip install py-clob-client — langkau benchmark executor")
+        return None
+    if not opps:
+        logger.warning("⚠️  Tiada peluang untuk dilaksanakan — langkau benchmark executor")
+        return None
+
+    secret = base64.urlsafe_b64encode(b"benchmark-secret").decode()
+    client = ClobClient(host=server.url, chain_id=137, key=BENCH_KEY,
+                        creds=ApiCreds(api_key="bench", api_secret=secret,
+                                       api_passphrase="bench"))
+    executor.DRY_RUN = False
+    # Sahkan kedalaman seperti bot (DEPTH_CHECK) — peluang bawa limit_price, jadi
+    # masa yang diukur ialah tandatangan + hantar, bukan GET /book setiap kaki
+    opps = orderbook.confirm_with_depth(opps[:count])
+    if not opps:
+        logger.warning("⚠️  Tiada peluang lulus semakan kedalaman — langkau benchmark executor")
+        return None
+    # Templat disediakan sebelum keputusan (seperti bot sebenar) — tidak dikira dalam masa
+    wait(executor.get_signer(client).prepare(o.token_id for opp in opps for o in opp.outcomes))
+
+    times, filled, legs = [], 0, 0
+    for i in range(count):
+        opp = opps[i % len(opps)]
+        t0 = time.perf_counter()
+        filled += executor.execute_opportunity(client, opp)
+        times.append(time.perf_counter() - t0)
+        legs += len(opp.outcomes)
+    total = sum(times)
+    return dict(summary(times), legs_per_s=legs / total if total else 0.0,
+                fill_rate=filled / count, mode="selari" if executor.PARALLEL_LEGS else "berjujukan")
+
+
+def run(sizes: List[int], latency: float, jitter: float, repeat: int, executions: int,
+        churn: float, trade_size: float) -> dict:
+    results = {}
+    for n in sizes:
+        server = MockPolymarket(synthetic_gamma_markets(n), port=0,
+                                latency=latency, jitter=jitter).start()
+        point_at(server.url)
+        try:
+            scan, opps = bench_scan(server, repeat, trade_size)
+            results[str(n)] = {
+                "scan_all":    scan,
+                "incremental": bench_incremental(server, repeat, trade_size, churn),
+                "execute":     bench_execute(server, opps, executions),
+            }
+        finally:
+            server.stop()
+        results[str(n)]["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+# ─── LAPORAN ───────────────────────────────────────────────
+
+def _delta(new: float, old: Optional[float]) -> str:
+    if not old:
+        return ""
+    return f" ({(new - old) / old * 100:+.0f}%)"
+
+
+def report(results: dict, baseline: Optional[dict] = None) -> str:
+    lines = []
+    for n, r in results.items():
+        base = (baseline or {}).get(n, {})
+        lines.append(f"── {int(n):,} pasaran ──")
+        for stage in ("scan_all", "incremental", "execute"):
+            s = r.get(stage)
+            if not s:
+                lines.append(f"  {stage:<12} (dilangkau)")
+                continue
+            b = base.get(stage) or {}
+            extra = ""
+            if stage == "scan_all":
+                extra = (f" | {s['markets_per_s']:,.0f} pasaran/s | {s['requests_per_scan']} req"
+                         f" | tunggu had Σ{s.get('throttle_ms', 0.0):.0f}ms"
+                         f" | {s['opportunities']} peluang | alloc {s['peak_alloc_mb']:.1f}MB")
+            elif stage == "incremental":
+                extra = f" | sejuk {s['cold_ms']:.0f}ms | churn {s['churn_pct']:.1f}%"
+            elif stage == "execute":
+                extra = (f" | {s['legs_per_s']:.1f} kaki/s | isi {s['fill_rate']*100:.0f}%"
+                         f" | {s['mode']}")
+            lines.append(f"  {stage:<12} p50 {s['p50_ms']:8.1f}ms{_delta(s['p50_ms'], b.get('p50_ms'))}"
+                         f" | p99 {s['p99_ms']:8.1f}ms{_delta(s['p99_ms'], b.get('p99_ms'))}{extra}")
+        lines.append(f"  RSS puncak   {r['peak_rss_mb']:.0f}MB")
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark scanner & executor terhadap pelayan palsu")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    ap.add_argument("--latency", type=float, default=0.02, help="kelewatan setiap request (saat)")
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--executions", type=int, default=50)
+    ap.add_argument("--churn", type=float, default=0.01, help="pecahan pasaran berubah antara scan")
+    ap.add_argument("--trade-size", type=float, default=10.0)
+    ap.add_argument("--sequential", action="store_true", help="executor: kaki satu demi satu")
+    ap.add_argument("--rate-limits", action="store_true",
+                    help="kekalkan RATE_LIMITS sebenar (lalai: dimatikan untuk pelayan palsu)")
+    ap.add_argument("--json", help="simpan keputusan ke fail JSON (jadikan baseline)")
+    ap.add_argument("--baseline", help="bandingkan dengan fail JSON terdahulu")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format="%(asctime)s | %(message)s", datefmt="%H:%M:%S")
+    logger.setLevel(logging.INFO)
+
+    # Jangan hantar notifikasi Telegram sebenar semasa benchmark
+    telegram_notify.send_telegram = lambda *a, **kw: False
+    if args.sequential:
+        executor.PARALLEL_LEGS = False
+    if not args.rate_limits:
+        unthrottle()
+
+    results = run(args.sizes, args.latency, args.jitter, args.repeat,
+                  args.executions, args.churn, args.trade_size)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(report(results, baseline))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# ============================================================
+#  tools/fake_ws_server.py — PELAYAN WEBSOCKET CLOB PALSU
+#  Uji mod stream tanpa internet:
+#    python tools/fake_ws_server.py --demo
+#    python tools/fake_ws_server.py --port 8765   (set CLOB_WS_URL = "ws://127.0.0.1:8765")
+# ============================================================
+
+import os
+import sys
+import json
+import random
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+
+logger = logging.getLogger("fake_ws")
+
+
+class FakeMarketServer:
+    """
+    Tiru channel `market` CLOB: terima mesej langganan, hantar snapshot
+    `book` untuk setiap token, kemudian `price_change` rawak.
+    drop_every > 0 = putuskan sambungan selepas N mesej (uji reconnect).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765,
+                 interval: float = 0.05, drop_every: int = 0, seed: int = 1):
+        self.host       = host
+        self.port       = port
+        self.interval   = interval
+        self.drop_every = drop_every
+        self.rng        = random.Random(seed)
+        self.prices     = {}
+        self.subscriptions = 0
+        self._server    = None
+
+    def _book(self, asset_id: str) -> dict:
+        mid = self.prices.setdefault(asset_id, round(self.rng.uniform(0.1, 0.6), 2))
+        return {
+            "event_type": "book", "asset_id": asset_id,
+            "bids": [{"price": f"{mid - 0.01:.2f}", "size": "100"}],
+            "asks": [{"price": f"{mid + 0.01:.2f}", "size": "100"}],
+        }
+
+    def _price_change(self, asset_id: str) -> dict:
+        mid = self.prices.get(asset_id, 0.5)
+        mid = min(0.97, max(0.03, round(mid + self.rng.choice((-0.01, 0.01)), 2)))
+        self.prices[asset_id] = mid
+        return {
+            "event_type": "price_change",
+            "price_changes": [
+                {"asset_id": asset_id, "price": f"{mid + off:.2f}", "size": "100",
+                 "side": side, "best_bid": f"{mid - 0.01:.2f}",
+                 "best_ask": f"{mid + 0.01:.2f}"}
+                for side, off in (("BUY", -0.01), ("SELL", 0.01))
+            ],
+        }
+
+    async def _handler(self, ws):
+        sub = json.loads(await ws.recv())
+        assets = sub.get("assets_ids", [])
+        self.subscriptions += 1
+        logger.info(f"langganan #{self.subscriptions}: {len(assets)} token")
+
+        await ws.send(json.dumps([self._book(a) for a in assets]))
+        sent = 0
+
+        async def _pongs():
+            async for msg in ws:
+                if msg == "PING":
+                    await ws.send("PONG")
+
+        reader = asyncio.ensure_future(_pongs())
+        try:
+            while assets:
+                await asyncio.sleep(self.interval)
+                await ws.send(json.dumps(self._price_change(self.rng.choice(assets))))
+                sent += 1
+                if self.drop_every and sent >= self.drop_every:
+                    logger.info("putuskan sambungan (uji reconnect)")
+                    await ws.close()
+                    return
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            reader.cancel()
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        # port=0 → OS pilih port kosong
+        self.port = list(self._server.sockets)[0].getsockname()[1]
+        logger.info(f"pelayan palsu: ws://{self.host}:{self.port}")
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+
+def synthetic_markets(n: int, outcomes: int = 3) -> list:
+    """Pasaran sintetik dalam format senarai Gamma /markets."""
+    markets = []
+    for i in range(n):
+        ids = [f"{i}-{k}" for k in range(outcomes)]
+        markets.append({
+            "id": str(i), "question": f"Pasaran ujian #{i}?",
+            "outcomes": json.dumps([f"O{k}" for k in range(outcomes)]),
+            "outcomePrices": json.dumps(["0.33"] * outcomes),
+            "clobTokenIds": json.dumps(ids),
+        })
+    return markets
+
+
+async def demo(seconds: float, markets: int, drop_every: int):
+    from stream import MarketStream
+
+    server = FakeMarketServer(port=0, drop_every=drop_every)
+    await server.start()
+
+    found = []
+    stream = MarketStream(10.0, found.append, url=server.url)
+    stream.set_markets(synthetic_markets(markets))
+    task = asyncio.ensure_future(stream.run())
+    await asyncio.sleep(seconds)
+    await stream.stop()
+    await asyncio.wait_for(task, 5)
+    await server.stop()
+
+    print(f"mesej: {stream.messages} | peluang: {len(found)} | "
+          f"sambung semula: {stream.reconnects} | langganan: {server.subscriptions}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pelayan WebSocket CLOB palsu")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--interval", type=float, default=0.05)
+    ap.add_argument("--drop-every", type=int, default=0)
+    ap.add_argument("--demo", action="store_true",
+                    help="jalankan MarketStream terhadap pelayan palsu dan cetak ringkasan")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--markets", type=int, default=50)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(message)s",
+                        datefmt="%H:%M:%S")
+
+    if args.demo:
+        asyncio.run(demo(args.seconds, args.markets, args.drop_every or 40))
+        return
+
+    async def _serve():
+        server = FakeMarketServer(args.host, args.port, args.interval, args.drop_every)
+        await server.start()
+        await asyncio.Future()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
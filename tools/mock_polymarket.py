@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# ============================================================
+#  tools/mock_polymarket.py — PELAYAN GAMMA + CLOB PALSU (HTTP)
+#  Hidangkan /markets, /markets/{id}, /book, /books dan endpoint order
+#  dengan latency & saiz boleh ditetapkan — untuk benchmark tanpa internet:
+#    python tools/mock_polymarket.py --markets 10000 --latency 0.02
+#    (set GAMMA_API_URL & POLYMARKET_HOST = "http://127.0.0.1:8780")
+# ============================================================
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logger = logging.getLogger("mock_polymarket")
+
+
+def synthetic_gamma_markets(n: int, event_size: int = 4, arb_ratio: float = 0.01,
+                            seed: int = 1) -> List[dict]:
+    """
+    n pasaran binari NegRisk dalam format senarai Gamma /markets,
+    dikumpul `event_size` pasaran setiap event. Kira-kira `arb_ratio`
+    pasaran diberi jumlah YES+NO < 1 (peluang LONG).
+    """
+    rng = random.Random(seed)
+    markets = []
+    for first in range(0, n, event_size):
+        size    = min(event_size, n - first)
+        weights = [rng.uniform(0.5, 1.5) for _ in range(size)]
+        total   = sum(weights)
+        event_id = f"0xevent{first // event_size:08x}"
+        members  = [{"id": str(100000 + first + k), "active": True, "closed": False}
+                    for k in range(size)]
+        for k in range(size):
+            i   = first + k
+            yes = min(0.95, max(0.05, round(weights[k] / total, 3)))
+            no  = round(1.0 - yes, 3)
+            if rng.random() < arb_ratio:
+                no = round(no - 0.03, 3)
+            markets.append({
+                "id": str(100000 + i),
+                "question": f"Pasaran ujian #{i}?",
+                "outcomes": json.dumps(["Yes", "No"]),
+                "outcomePrices": json.dumps([f"{yes}", f"{no}"]),
+                "clobTokenIds": json.dumps([str(10**20 + 2 * i), str(10**20 + 2 * i + 1)]),
+                "negRisk": True,
+                "negRiskMarketID": event_id,
+                "events": [{"id": str(first // event_size), "title": f"Event #{first // event_size}",
+                            "markets": members}],
+                "volumeNum": n - i,
+            })
+    return markets
+
+
+class MockPolymarket:
+    """
+    Pelayan HTTP tempatan yang meniru Gamma API + CLOB.
+
+    latency   = kelewatan setiap request (saat), + jitter rawak hingga `jitter`
+    fill_rate = kebarangkalian setiap order FOK diisi ("matched")
+    Halaman /markets ada ETag; If-None-Match yang sepadan → 304.
+    """
+
+    def __init__(self, markets: List[dict], host: str = "127.0.0.1", port: int = 8780,
+                 latency: float = 0.0, jitter: float = 0.0, fill_rate: float = 1.0,
+                 seed: int = 1):
+        self.markets   = markets
+        self.by_id     = {m["id"]: i for i, m in enumerate(markets)}
+        self.token_price: Dict[str, float] = {}
+        for m in markets:
+            for t, p in zip(json.loads(m["clobTokenIds"]), json.loads(m["outcomePrices"])):
+                self.token_price[t] = float(p)
+        self.host      = host
+        self.port      = port
+        self.latency   = latency
+        self.jitter    = jitter
+        self.fill_rate = fill_rate
+        self.rng       = random.Random(seed)
+        self.requests: Dict[str, int] = {}
+        self._pages: Dict[Tuple[int, int], Tuple[bytes, str]] = {}
+        self._lock     = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # ─── DATA ──────────────────────────────────────────────
+
+    def page(self, offset: int, limit: int) -> Tuple[bytes, str]:
+        key = (offset, limit)
+        cached = self._pages.get(key)
+        if cached is None:
+            body = json.dumps(self.markets[offset:offset + limit]).encode()
+            cached = self._pages[key] = (body, '"%s"' % hashlib.md5(body).hexdigest())
+        return cached
+
+    def detail(self, market_id: str) -> Optional[dict]:
+        i = self.by_id.get(market_id)
+        if i is None:
+            return None
+        m = self.markets[i]
+        return dict(m, tokens=[
+            {"outcome": o, "token_id": t, "price": float(p)}
+            for o, t, p in zip(json.loads(m["outcomes"]), json.loads(m["clobTokenIds"]),
+                               json.loads(m["outcomePrices"]))])
+
+    def book(self, token_id: str) -> dict:
+        price = self.token_price.get(token_id, 0.5)
+        # Medan penuh OrderBookSummary — GET /book dihurai oleh py_clob_client
+        return {
+            "market": "", "asset_id": token_id, "timestamp": str(int(time.time() * 1000)),
+            "last_trade_price": f"{price:.3f}", "min_order_size": "5",
+            "neg_risk": True, "tick_size": "0.001", "hash": "",
+            "bids": [{"price": f"{max(0.01, price - d):.3f}", "size": "500"} for d in (0.01, 0.02)],
+            "asks": [{"price": f"{min(0.99, price + d):.3f}", "size": "500"} for d in (0.0, 0.01)],
+        }
+
+    def order_result(self) -> dict:
+        matched = self.rng.random() < self.fill_rate
+        return {"success": matched, "errorMsg": "" if matched else "FOK tidak diisi",
+                "orderID": f"0x{self.rng.getrandbits(64):016x}",
+                "status": "matched" if matched else "unmatched"}
+
+    def mutate(self, fraction: float):
+        """Ubah harga sebahagian pasaran (uji scan inkremental). Halaman terlibat dapat ETag baru."""
+        count = max(1, int(len(self.markets) * fraction))
+        with self._lock:
+            for i in self.rng.sample(range(len(self.markets)), count):
+                m = self.markets[i]
+                yes, no = (float(p) for p in json.loads(m["outcomePrices"]))
+                step = self.rng.choice((-0.001, 0.001))
+                m["outcomePrices"] = json.dumps([f"{yes + step:.3f}", f"{no - step:.3f}"])
+                for t, p in zip(json.loads(m["clobTokenIds"]), (yes + step, no - step)):
+                    self.token_price[t] = round(p, 3)
+                for key in [k for k in self._pages if k[0] <= i < k[0] + k[1]]:
+                    del self._pages[key]
+
+    # ─── PELAYAN ───────────────────────────────────────────
+
+    def _count(self, route: str):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"       # keep-alive — sama seperti API sebenar
+
+            def _reply(self, status: int, payload=None, body: bytes = b"",
+                       headers: Optional[dict] = None):
+                if payload is not None:
+                    body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _delay(self):
+                if mock.latency or mock.jitter:
+                    time.sleep(mock.latency + random.uniform(0, mock.jitter))
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"null")
+
+            def do_GET(self):
+                self._delay()
+                url   = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                parts = url.path.strip("/").split("/")
+
+                if parts == ["markets"]:
+                    mock._count("GET /markets")
+                    with mock._lock:
+                        body, etag = mock.page(int(query.get("offset", 0)),
+                                               int(query.get("limit", 100)))
+                    if self.headers.get("If-None-Match") == etag:
+                        self._reply(304, headers={"ETag": etag})
+                    else:
+                        self._reply(200, body=body, headers={"ETag": etag})
+                elif len(parts) == 2 and parts[0] == "markets":
+                    mock._count("GET /markets/{id}")
+                    detail = mock.detail(parts[1])
+                    self._reply(200 if detail else 404, detail or {"error": "not found"})
+                elif parts == ["book"]:
+                    # calculate_market_price klien CLOB (order tanpa had harga)
+                    mock._count("GET /book")
+                    self._reply(200, mock.book(query.get("token_id", "")))
+                elif parts == ["tick-size"]:
+                    mock._count("GET /tick-size")
+                    self._reply(200, {"minimum_tick_size": 0.001})
+                elif parts == ["neg-risk"]:
+                    mock._count("GET /neg-risk")
+                    self._reply(200, {"neg_risk": True})
+                elif parts == ["fee-rate"]:
+                    mock._count("GET /fee-rate")
+                    self._reply(200, {"base_fee": 0})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                self._delay()
+                path = urlsplit(self.path).path.rstrip("/")
+                body = self._body()
+                if path == "/books":
+                    mock._count("POST /books")
+                    self._reply(200, [mock.book(b.get("token_id", "")) for b in body or []])
+                elif path == "/order":
+                    mock._count("POST /order")
+                    self._reply(200, mock.order_result())
+                elif path == "/orders":
+                    mock._count("POST /orders")
+                    self._reply(200, [mock.order_result() for _ in body or []])
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockPolymarket":
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        # port=0 → OS pilih port kosong
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="mock-polymarket",
+                         daemon=True).start()
+        logger.info(f"pelayan palsu: {self.url} ({len(self.markets)} pasaran)")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pelayan Gamma/CLOB palsu")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8780)
+    ap.add_argument("--markets", type=int, default=1000)
+    ap.add_argument("--latency", type=float, default=0.0, help="kelewatan setiap request (saat)")
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--fill-rate", type=float, default=1.0)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(message)s",
+                        datefmt="%H:%M:%S")
+
+    server = MockPolymarket(synthetic_gamma_markets(args.markets), args.host, args.port,
+                            args.latency, args.jitter, args.fill_rate).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
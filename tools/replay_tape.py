@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# ============================================================
+#  tools/replay_tape.py — MAIN SEMULA PITA HARGA
+#  Suap pita rakaman (TAPE_FILE) ke penilai arbitrage:
+#    python tools/replay_tape.py tapes/harga.tape
+#    python tools/replay_tape.py tapes/harga.tape --speed 60 --verbose
+# ============================================================
+
+import os
+import sys
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TRADE_SIZE_USDC
+from tape import TapeReader, replay
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Main semula pita harga ke penilai arbitrage")
+    ap.add_argument("path")
+    ap.add_argument("--trade-size", type=float, default=TRADE_SIZE_USDC)
+    ap.add_argument("--speed", type=float, default=0.0,
+                    help="gandaan masa sebenar (0 = selaju mungkin)")
+    ap.add_argument("--info", action="store_true", help="cetak ringkasan pita sahaja")
+    ap.add_argument("--verbose", action="store_true", help="cetak setiap peluang")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s | %(message)s",
+                        datefmt="%H:%M:%S")
+
+    if args.info:
+        reader = TapeReader(args.path)
+        blocks = list(reader.blocks())
+        rows   = sum(len(b) for b in blocks)
+        span   = (blocks[-1].ts[-1] - blocks[0].ts[0]) if blocks else 0.0
+        print(f"{rows:,} baris | {len(blocks):,} blok | {len(reader.symbols):,} token | "
+              f"{span / 3600:.1f} jam | {os.path.getsize(args.path) / 1e6:.1f}MB")
+        del blocks
+        reader.close()
+        return
+
+    def _show(opp):
+        if args.verbose:
+            print(f"{opp.detected_at:.3f} [{opp.arb_type}] {opp.market_question[:60]} | "
+                  f"{opp.expected_profit_pct*100:.2f}%")
+
+    stats = replay(args.path, args.trade_size, _show, args.speed)
+    print(f"{stats['rows']:,} baris | {stats['opportunities']:,} peluang | "
+          f"{stats['seconds']:.2f}s ({stats['rows'] / max(stats['seconds'], 1e-9):,.0f} baris/s) | "
+          f"{stats['speedup']:,.0f}x masa sebenar")
+
+
+if __name__ == "__main__":
+    main()